@@ -1,7 +1,9 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 
+import ECMO_Rules as rules
+from ECMO_Tables import text_table
+
 st.set_page_config(page_title="ECMO Candidacy Checker", layout="wide")
 
 st.title("🫀 ECMO Candidacy Checker with SAVE + SOFA + Criteria")
@@ -11,11 +13,11 @@ note = "SOAP Note\n===========\n"
 # --------------------- Patient Info ---------------------
 st.header("📝 Patient Info")
 name = st.text_input("Patient Name")
-age = st.number_input("Age", min_value=0, max_value=120, value=40)
-weight = st.number_input("Weight (kg)", min_value=0.0, max_value=300.0, value=70.0)
-height = st.number_input("Height (cm)", min_value=0.0, max_value=250.0, value=170.0)
+age = st.number_input("Age", **rules.widget_limits('age'), value=40)
+weight = st.number_input("Weight (kg)", **rules.widget_limits('weight'), value=70.0)
+height = st.number_input("Height (cm)", **rules.widget_limits('height'), value=170.0)
 sex = st.selectbox("Sex", ["Male", "Female"])
-bmi = weight / ((height/100) ** 2) if height > 0 else 0
+bmi = rules.calc_bmi(weight, height)
 
 # --------------------- SAVE Score ---------------------
 st.header("📊 SAVE Score")
@@ -66,7 +68,7 @@ with col2:
 
 with col3:
     # Duration of intubation
-    intubation_duration = st.number_input("Duration of Intubation (hours)", min_value=0, value=0)
+    intubation_duration = st.number_input("Duration of Intubation (hours)", **rules.widget_limits('intubation_duration'), value=0)
     intubation_points = 0
     if intubation_duration < 10:
         intubation_points = 0
@@ -77,7 +79,7 @@ with col3:
     st.metric("Intubation Duration Points", intubation_points)
     
     # Diastolic blood pressure
-    dbp = st.number_input("Diastolic BP (mmHg)", min_value=0, value=80)
+    dbp = st.number_input("Diastolic BP (mmHg)", **rules.widget_limits('dbp'), value=80)
     dbp_points = 0
     if dbp < 20:
         dbp_points = 11
@@ -118,7 +120,7 @@ sofa_col1, sofa_col2, sofa_col3 = st.columns(3)
 
 with sofa_col1:
     # Respiratory
-    pao2_fio2 = st.number_input("PaO₂/FiO₂ ratio", min_value=0, value=300)
+    pao2_fio2 = st.number_input("PaO₂/FiO₂ ratio", **rules.widget_limits('pao2_fio2'), value=300)
     if pao2_fio2 >= 400:
         resp_points = 0
     elif pao2_fio2 >= 300:
@@ -132,7 +134,7 @@ with sofa_col1:
     st.metric("Respiratory Points", resp_points)
     
     # Coagulation
-    platelets = st.number_input("Platelets (×10³/μL)", min_value=0, value=150)
+    platelets = st.number_input("Platelets (×10³/μL)", **rules.widget_limits('platelets'), value=150)
     if platelets >= 150:
         coag_points = 0
     elif platelets >= 100:
@@ -147,7 +149,7 @@ with sofa_col1:
 
 with sofa_col2:
     # Liver
-    bilirubin = st.number_input("Bilirubin (mg/dL)", min_value=0.0, value=1.0)
+    bilirubin = st.number_input("Bilirubin (mg/dL)", **rules.widget_limits('bilirubin'), value=1.0)
     if bilirubin < 1.2:
         liver_points = 0
     elif bilirubin < 2.0:
@@ -161,14 +163,14 @@ with sofa_col2:
     st.metric("Liver Points", liver_points)
     
     # Cardiovascular
-    map = st.number_input("Mean Arterial Pressure (mmHg)", min_value=0, value=70)
+    map = st.number_input("Mean Arterial Pressure (mmHg)", **rules.widget_limits('map'), value=70)
     vasopressors = st.selectbox("Vasopressors", ["None", "Dopamine ≤5 or Dobutamine", "Dopamine >5 or NE ≤0.1", "NE >0.1 or Epi ≤0.1", "NE >0.1 or Epi >0.1"])
     vasopressor_points = {"None": 0, "Dopamine ≤5 or Dobutamine": 1, "Dopamine >5 or NE ≤0.1": 2, "NE >0.1 or Epi ≤0.1": 3, "NE >0.1 or Epi >0.1": 4}
     st.metric("Cardiovascular Points", vasopressor_points[vasopressors])
 
 with sofa_col3:
     # CNS
-    glasgow = st.number_input("Glasgow Coma Scale", min_value=3, max_value=15, value=15)
+    glasgow = st.number_input("Glasgow Coma Scale", **rules.widget_limits('glasgow'), value=15)
     if glasgow >= 15:
         cns_points = 0
     elif glasgow >= 13:
@@ -182,8 +184,8 @@ with sofa_col3:
     st.metric("CNS Points", cns_points)
     
     # Renal
-    creatinine = st.number_input("Creatinine (mg/dL)", min_value=0.0, value=1.0)
-    urine_output = st.number_input("Urine Output (mL/day)", min_value=0, value=500)
+    creatinine = st.number_input("Creatinine (mg/dL)", **rules.widget_limits('creatinine'), value=1.0)
+    urine_output = st.number_input("Urine Output (mL/day)", **rules.widget_limits('urine_output'), value=500)
     if creatinine < 1.2 and urine_output >= 500:
         renal_points = 0
     elif creatinine < 2.0 or urine_output < 500:
@@ -341,8 +343,7 @@ summary_data = {
              "Acceptable" if exclusion_count <= 1 else "Concerning", recommendation.split("**")[1]]
 }
 
-summary_df = pd.DataFrame(summary_data)
-st.dataframe(summary_df, use_container_width=True)
+st.dataframe(text_table(summary_data), width="stretch")
 
 # --------------------- Notes Section ---------------------
 st.header("📝 Clinical Notes")
@@ -93,7 +93,7 @@ if weight > 0 and height > 0:
         height=300
     )
 
-    st.altair_chart(chart, use_container_width=False)
+    st.altair_chart(chart, width="content")
 
     st.markdown("⚙️ **Initial RPM Estimate:** `2500 - 3200`")
     st.caption("Blue shows ECMO support meeting CI goal. Green shows ECMO CI exceeding goal. Gray is full CI target.")
@@ -0,0 +1,320 @@
+"""Stateless JSON API for ECMO candidacy scoring and cannula sizing.
+
+A small asyncio HTTP/1.1 server (standard library only) with keep-alive
+connections, a bounded worker pool and an LRU response cache keyed on the
+normalized inputs. Scoring goes through ECMO_Rules, the same rules as the
+Streamlit workflow.
+
+    POST /v1/assess    one patient object, or a list / {"patients": [...]}
+    POST /v1/cannula   {"bsa": 1.9, "ecmo_mode": "VA"} (or height/weight), single or batched
+    POST /v1/triage    referral update {"id": "R17", ...reported fields} or {"id": "R17", "resolved": true}
+    GET  /v1/triage    ranked referral list (?top=20)
+    GET  /health
+
+    python ECMO_API.py serve --port 8600
+    python ECMO_API.py loadtest --clients 32 --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ECMO_Rules as rules
+from ECMO_Cache import LRUCache
+from ECMO_Sites import load_site
+from ECMO_Triage import TriageQueue, summary
+
+MAX_BODY = 1 << 20  # 1 MiB
+MAX_BSA = rules.calc_bsa(rules.INPUT_RANGES['height'][1], rules.INPUT_RANGES['weight'][1])  # widest Step 1 patient
+KEEP_ALIVE_TIMEOUT = 15.0
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def finite_float(text):
+    """json.loads parse_float/parse_constant hook: NaN, Infinity and overflowing numbers are rejected"""
+    value = float(text)
+    if not math.isfinite(value):
+        raise BadRequest(f"{text} is not a finite number")
+    return value
+
+
+# --------------------- Scoring ---------------------
+def assess_json(inputs, cache):
+    """Encoded assessment for one patient, served from the cache when possible"""
+    try:
+        normalized = rules.normalize_inputs(inputs)
+    except ValueError as e:
+        raise BadRequest(str(e))
+    key = ('assess',) + rules.input_key(normalized)
+    return cache.get_or_compute(key, lambda: json.dumps(rules.assess(normalized), allow_nan=False).encode())
+
+
+def cannula_json(inputs, cache):
+    """Encoded Step 7 flow target and cannula sizes for one patient"""
+    if 'bsa' in inputs:
+        bsa = inputs['bsa']
+        if isinstance(bsa, bool) or not isinstance(bsa, (int, float)) or not 0 < bsa <= MAX_BSA:
+            raise BadRequest(f"bsa must be a positive number up to {MAX_BSA:.2f}")
+    elif 'height' in inputs and 'weight' in inputs:
+        try:
+            normalized = rules.normalize_inputs({'height': inputs['height'], 'weight': inputs['weight']})
+        except ValueError as e:
+            raise BadRequest(str(e))
+        bsa = rules.calc_bsa(normalized['height'], normalized['weight'])
+    else:
+        raise BadRequest("cannula sizing needs bsa, or height and weight")
+    ecmo_mode = inputs.get('ecmo_mode', "VV")
+    if ecmo_mode not in rules.CHOICES['ecmo_mode']:
+        raise BadRequest("ecmo_mode must be VV or VA")
+
+    def compute():
+        required_flow = rules.calc_required_flow(bsa)
+        return json.dumps({
+            'bsa': bsa, 'ecmo_mode': ecmo_mode, 'required_flow': required_flow,
+            'cannula_recs': rules.get_specific_cannula_recommendations(required_flow, bsa, ecmo_mode),
+        }, allow_nan=False).encode()
+    return cache.get_or_compute(('cannula', float(bsa), ecmo_mode), compute)
+
+
+def score_payload(payload, score, cache):
+    """Score a single patient object or a batch; batch rows fail independently"""
+    if isinstance(payload, dict) and isinstance(payload.get('patients'), list):
+        payload = payload['patients']
+    if isinstance(payload, dict):
+        return score(payload, cache)
+    if not isinstance(payload, list):
+        raise BadRequest("body must be a patient object or a list of patients")
+    parts = []
+    for i, item in enumerate(payload):
+        try:
+            if not isinstance(item, dict):
+                raise BadRequest("each patient must be an object")
+            parts.append(score(item, cache))
+        except BadRequest as e:
+            parts.append(json.dumps({'index': i, 'error': str(e)}).encode())
+    return b'{"results": [' + b", ".join(parts) + b"]}"
+
+
+ROUTES = {
+    '/v1/assess': assess_json,
+    '/v1/cannula': cannula_json,
+}
+
+
+# --------------------- HTTP server ---------------------
+class ScoringServer:
+    def __init__(self, workers=4, cache_size=50_000):
+        self.cache = LRUCache(cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.slots = asyncio.Semaphore(workers)
+        self.requests = 0
+        self.triage = TriageQueue(load_site())
+        self.routes = {**ROUTES, '/v1/triage': self.triage_json}
+
+    def triage_json(self, message, cache):
+        """Apply one referral update; returns the referral's new standing"""
+        referral_id = message.get('id')
+        if not isinstance(referral_id, (str, int)) or isinstance(referral_id, bool):
+            raise BadRequest("referral needs an id (string or integer)")
+        fields = {key: value for key, value in message.items() if key not in ('id', 'resolved')}
+        if message.get('resolved'):
+            return json.dumps({'id': referral_id, 'resolved': self.triage.resolve(referral_id) is not None}).encode()
+        try:
+            referral = self.triage.update(referral_id, fields)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return json.dumps(summary(referral), allow_nan=False).encode()
+
+    async def dispatch(self, method, path, body, query=""):
+        if path == '/health':
+            return 200, json.dumps({'status': 'ok', 'cache_entries': len(self.cache),
+                                    'requests': self.requests, 'referrals': len(self.triage)}).encode()
+        if path == '/v1/triage' and method == 'GET':
+            top = dict(part.partition("=")[::2] for part in query.split("&") if part).get('top', "20")
+            if not top.isdigit():
+                return 400, b'{"error": "top must be a positive integer"}'
+            return 200, json.dumps({'referrals': [summary(r) for r in self.triage.ranked(int(top))]},
+                                   ensure_ascii=False).encode()
+        if path not in self.routes:
+            return 404, b'{"error": "not found"}'
+        if method != 'POST':
+            return 405, b'{"error": "use POST"}'
+        try:
+            payload = json.loads(body, parse_float=finite_float, parse_constant=finite_float)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return 400, b'{"error": "body is not valid JSON"}'
+        except BadRequest as e:
+            return 400, json.dumps({'error': str(e)}).encode()
+        try:
+            # Bounded concurrency: at most `workers` requests are scored at once
+            async with self.slots:
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(self.executor, score_payload, payload, self.routes[path], self.cache)
+        except BadRequest as e:
+            return 400, json.dumps({'error': str(e)}).encode()
+        return 200, data
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, path, version = parts
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                content_length = headers.get('content-length', "0") or "0"
+                length = int(content_length) if content_length.isascii() and content_length.isdecimal() else -1
+                if length < 0:
+                    status, data, keep_alive = 400, b'{"error": "invalid Content-Length"}', False
+                elif length > MAX_BODY:
+                    status, data, keep_alive = 413, b'{"error": "body too large"}', False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    self.requests += 1
+                    try:
+                        path, _, query = path.partition("?")
+                        status, data = await self.dispatch(method, path, body, query)
+                    except Exception as e:  # keep the connection's other requests alive
+                        status, data = 500, json.dumps({'error': repr(e)}).encode()
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    f"Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT:.0f}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8600):
+        return await asyncio.start_server(self.handle, host, port, backlog=1024)
+
+
+# --------------------- Load test ---------------------
+async def http_post(reader, writer, path, body, host):
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def load_test(host, port, clients=32, requests=20_000, batch=1, distinct=1000, path='/v1/assess', seed=0):
+    """Drive the server over keep-alive connections; returns throughput and latency stats"""
+    from ECMO_Equivalence_Check import generate_patients
+    from ECMO_Scoring import validate_columns
+
+    columns = generate_patients(distinct, seed)
+    rows = validate_columns(columns)[1].nonzero()[0]  # only requests the server accepts
+    patients = [{key: values[i].item() for key, values in columns.items()} for i in rows]
+    bodies = [json.dumps(patients[i:i + batch] if batch > 1 else patients[i]).encode()
+              for i in range(0, len(patients) - batch + 1 or 1)]
+
+    latencies = []
+    errors = 0
+    remaining = [requests]
+
+    async def client(index):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        i = index
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            body = bodies[i % len(bodies)]
+            i += clients
+            start = time.perf_counter()
+            status = await http_post(reader, writer, path, body, host)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000
+
+    return {'requests': len(latencies), 'patients': len(latencies) * batch, 'errors': errors,
+            'elapsed': elapsed, 'rps': len(latencies) / elapsed,
+            'p50_ms': pct(0.50), 'p99_ms': pct(0.99), 'max_ms': latencies[-1] * 1000}
+
+
+async def serve(args):
+    server = await ScoringServer(args.workers, args.cache_size).start(args.host, args.port)
+    print(f"ECMO scoring API on http://{args.host}:{args.port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+async def run_load_test(args):
+    server = None
+    if args.url:
+        host, port = args.url.rsplit(":", 1)
+        port = int(port)
+    else:
+        # Spin up a local server in this process
+        host, port = "127.0.0.1", args.port
+        server = await ScoringServer(args.workers, args.cache_size).start(host, port)
+    stats = await load_test(host, port, args.clients, args.requests, args.batch, args.distinct, args.path)
+    if server:
+        server.close()
+        await server.wait_closed()
+    print(f"{stats['requests']:,} requests ({stats['patients']:,} patients) in {stats['elapsed']:.2f} s: "
+          f"{stats['rps']:,.0f} req/s, p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, "
+          f"max {stats['max_ms']:.2f} ms, {stats['errors']} errors")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO scoring HTTP API")
+    sub = parser.add_subparsers(dest="command", required=True)
+    srv = sub.add_parser("serve")
+    lt = sub.add_parser("loadtest", help="load test a running server (--url) or a local one")
+    for p in (srv, lt):
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8600)
+        p.add_argument("--workers", type=int, default=4)
+        p.add_argument("--cache-size", type=int, default=50_000)
+    lt.add_argument("--url", help="host:port of a running server")
+    lt.add_argument("--clients", type=int, default=32, help="concurrent keep-alive connections")
+    lt.add_argument("--requests", type=int, default=20_000)
+    lt.add_argument("--batch", type=int, default=1, help="patients per request")
+    lt.add_argument("--distinct", type=int, default=1000, help="distinct patients cycled through")
+    lt.add_argument("--path", default="/v1/assess", choices=list(ROUTES))
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args) if args.command == "serve" else run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Heparin anticoagulation dosing and titration for ECMO patients.
+
+Weight-based bolus and starting infusion from the Step 1 weight and ideal
+weight, and hourly titration against ACT or anti-Xa through nomograms
+compiled into (edges, actions) lookup arrays. Every function takes arrays,
+so a whole unit's hourly re-check is one call:
+
+    python ECMO_Anticoagulation.py titrate unit.csv
+
+where unit.csv has columns patient, weight, ideal_weight (or height and
+sex), rate (current U/h), and act or anti_xa.
+"""
+
+import argparse
+
+import numpy as np
+
+from ECMO_Rules import CIRCUIT_LIMITS
+
+INITIAL_BOLUS_PER_KG = 50  # U/kg at cannulation
+INITIAL_RATE_PER_KG = 10  # U/kg/h
+MAX_BOLUS = 10_000  # U
+MAX_RATE = 3_000  # U/h
+ADJUSTED_WEIGHT_ABOVE = 1.2  # dose on adjusted weight above 120% of ideal weight
+ADJUSTED_WEIGHT_FACTOR = 0.4
+
+ACTION_FIELDS = ['bolus_per_kg', 'rate_change_per_kg', 'hold_minutes', 'recheck_hours']
+
+# Nomograms: lower-inclusive bins (edges) and one action row per bin.
+# ACT is in whole seconds, so "<= n" is stored as "< n + 1"; anti-Xa is
+# reported to 0.01 IU/mL and "<= x" is stored as "< x + 0.01".
+ACT_LOW, ACT_HIGH = CIRCUIT_LIMITS['act_range']
+NOMOGRAMS = {
+    'act': {
+        'edges': (150, ACT_LOW, ACT_HIGH + 1, 250, 280),
+        'labels': ["< 150 s", f"150-{ACT_LOW - 1} s", f"{ACT_LOW}-{ACT_HIGH} s (target)",
+                   f"{ACT_HIGH + 1}-249 s", "250-279 s", "≥ 280 s"],
+        'actions': ((25, 3, 0, 1), (0, 2, 0, 1), (0, 0, 0, 2), (0, -1, 0, 1), (0, -2, 30, 1), (0, -3, 60, 1)),
+    },
+    'anti_xa': {
+        'edges': (0.2, 0.3, 0.71, 0.81, 1.01),
+        'labels': ["< 0.2", "0.2-0.29", "0.3-0.7 (target)", "0.71-0.8", "0.81-1.0", "> 1.0"],
+        'actions': ((25, 3, 0, 6), (0, 2, 0, 6), (0, 0, 0, 12), (0, -1, 0, 6), (0, -2, 30, 6), (0, -3, 60, 6)),
+    },
+}
+ASSAYS = list(NOMOGRAMS)
+
+
+def compile_nomogram(nomogram):
+    """(edges, actions) arrays with one actions row per bin"""
+    edges = np.asarray(nomogram['edges'], dtype=float)
+    actions = np.asarray(nomogram['actions'], dtype=float)
+    if len(actions) != len(edges) + 1:
+        raise ValueError("a nomogram needs one action row per bin")
+    return edges, actions
+
+
+COMPILED = {assay: compile_nomogram(nomogram) for assay, nomogram in NOMOGRAMS.items()}
+
+
+def round_to(values, step):
+    """Round half up to a multiple of step (np.round would round halves to even)"""
+    return np.floor(np.asarray(values, dtype=float) / step + 0.5) * step
+
+
+# --------------------- Dosing ---------------------
+def dosing_weight(weight, ideal_weight):
+    """Actual weight, or adjusted weight (IBW + 0.4 × excess) above 120% of ideal"""
+    weight = np.asarray(weight, dtype=float)
+    ideal_weight = np.asarray(ideal_weight, dtype=float)
+    adjusted = ideal_weight + ADJUSTED_WEIGHT_FACTOR * (weight - ideal_weight)
+    return np.where((ideal_weight > 0) & (weight > ADJUSTED_WEIGHT_ABOVE * ideal_weight), adjusted, weight)
+
+
+def initial_dose(weight, ideal_weight):
+    """Cannulation bolus (U) and starting infusion (U/h)"""
+    dw = dosing_weight(weight, ideal_weight)
+    return {
+        'dosing_weight': dw,
+        'bolus': np.minimum(round_to(INITIAL_BOLUS_PER_KG * dw, 100), MAX_BOLUS),
+        'rate': np.minimum(round_to(INITIAL_RATE_PER_KG * dw, 10), MAX_RATE),
+    }
+
+
+# --------------------- Titration ---------------------
+def nomogram_actions(assay, level):
+    """Bin index and action columns for each level under one assay's nomogram"""
+    edges, actions = COMPILED[assay]
+    bins = np.searchsorted(edges, np.asarray(level, dtype=float), side="right")
+    return bins, actions[bins]
+
+
+def titrate(weight, ideal_weight, rate, level, assay="act"):
+    """New infusion rate (U/h), rebolus (U), hold and recheck time for each patient.
+
+    assay may be a single name or an array naming each patient's assay; a
+    NaN level leaves that patient's rate unchanged.
+    """
+    dw = dosing_weight(weight, ideal_weight)
+    rate = np.asarray(rate, dtype=float)
+    level = np.asarray(level, dtype=float)
+    shape = np.broadcast(dw, rate, level).shape
+    assay = np.broadcast_to(np.asarray(assay), shape)
+
+    actions = np.zeros(shape + (len(ACTION_FIELDS),))
+    bins = np.zeros(shape, dtype=int)
+    for name in ASSAYS:
+        rows = assay == name
+        assay_bins, assay_actions = nomogram_actions(name, np.broadcast_to(level, shape)[rows])
+        actions[rows] = assay_actions
+        bins[rows] = assay_bins
+    unknown = ~np.isin(assay, ASSAYS)
+    if unknown.any():
+        raise ValueError(f"unknown assay {assay[unknown][0]!r}; expected one of {', '.join(ASSAYS)}")
+
+    missing = np.isnan(np.broadcast_to(level, shape))
+    actions[missing] = 0
+    bolus_per_kg, change_per_kg, hold_minutes, recheck_hours = np.moveaxis(actions, -1, 0)
+    return {
+        'dosing_weight': np.broadcast_to(dw, shape),
+        'bin': np.where(missing, -1, bins),
+        'bolus': np.minimum(round_to(bolus_per_kg * dw, 100), MAX_BOLUS),
+        'rate': np.clip(round_to(rate + change_per_kg * dw, 10), 0, MAX_RATE),
+        'hold_minutes': hold_minutes,
+        'recheck_hours': np.where(missing, 1, recheck_hours),
+    }
+
+
+def nomogram_columns(assay):
+    """Display columns (level, bolus, rate change, hold, recheck) for one nomogram"""
+    nomogram = NOMOGRAMS[assay]
+    columns = {'Level': [], 'Bolus': [], 'Rate Change': [], 'Hold': [], 'Recheck': []}
+    for label, (bolus, change, hold, recheck) in zip(nomogram['labels'], nomogram['actions']):
+        columns['Level'].append(label)
+        columns['Bolus'].append(f"{bolus} U/kg" if bolus else "-")
+        columns['Rate Change'].append(f"{change:+d} U/kg/h" if change else "no change")
+        columns['Hold'].append(f"{hold} min" if hold else "-")
+        columns['Recheck'].append(f"{recheck} h")
+    return columns
+
+
+# --------------------- Unit review ---------------------
+def invalid_rows(frame):
+    """Invalid-row masks (with messages) for a unit's columns; weight, height and sex use the Step 1 ranges"""
+    import pandas as pd
+    from ECMO_Scoring import describe_invalid, validate_columns
+
+    body = {key: frame[key].to_numpy() for key in ('weight', 'height', 'sex') if key in frame}
+    invalid, _ = validate_columns(body)
+    cells = describe_invalid(body, invalid, limit=len(frame))
+    ideal_weight, rate, level = (pd.to_numeric(frame[key], errors="coerce").to_numpy(dtype=float)
+                                 for key in ('ideal_weight', 'rate', 'level'))
+    checks = {
+        'ideal_weight': (~(ideal_weight > 0), "ideal_weight must be positive"),
+        'rate': (~((rate >= 0) & (rate <= MAX_RATE)), f"rate must be between 0 and {MAX_RATE} U/h"),
+        'assay': (~frame['assay'].isin(ASSAYS).to_numpy(), f"assay must be one of: {', '.join(ASSAYS)}"),
+        'level': (frame['level'].notna().to_numpy() & ~(level >= 0), "level must be a non-negative number"),
+    }
+    for key, (bad, message) in checks.items():
+        invalid[key] = bad
+        cells += [(int(row), key, frame[key].tolist()[row], message) for row in np.flatnonzero(bad)]
+    return invalid, sorted(cells, key=lambda cell: cell[0])
+
+
+def load_unit(path):
+    """Columns for a unit's hourly check from CSV, filling ideal weight from height and sex.
+
+    Rows with an invalid weight, height, sex, rate, assay or level are
+    reported and dropped.
+    """
+    import pandas as pd
+    from ECMO_Scoring import body_metrics, report_dropped
+
+    frame = pd.read_csv(path)
+    if 'ideal_weight' not in frame:
+        _, ideal_weight, _ = body_metrics(pd.to_numeric(frame['weight'], errors="coerce"),
+                                          pd.to_numeric(frame['height'], errors="coerce"), frame['sex'] == "Male")
+        frame['ideal_weight'] = ideal_weight
+    if 'assay' not in frame:
+        frame['assay'] = np.where(frame['act'].notna(), "act", "anti_xa") if 'act' in frame else "anti_xa"
+    frame['level'] = np.where(frame['assay'] == "act", frame.get('act', np.nan), frame.get('anti_xa', np.nan))
+    invalid, cells = invalid_rows(frame)
+    valid = ~np.logical_or.reduce(list(invalid.values()))
+    if not valid.all():
+        report_dropped(len(frame), int((~valid).sum()), cells[:5])
+    frame = frame[valid].reset_index(drop=True)
+    for key in ('weight', 'ideal_weight', 'rate', 'level'):
+        frame[key] = frame[key].astype(float)
+    return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Heparin dosing and ACT/anti-Xa titration for ECMO")
+    sub = parser.add_subparsers(dest="command", required=True)
+    titrate_cmd = sub.add_parser("titrate", help="hourly re-check for every patient in a CSV")
+    titrate_cmd.add_argument("unit")
+    titrate_cmd.add_argument("--out", help="write the new rates to this CSV")
+    sub.add_parser("nomograms", help="print the ACT and anti-Xa nomograms")
+    args = parser.parse_args(argv)
+
+    if args.command == "nomograms":
+        for assay in ASSAYS:
+            print(f"{assay}:")
+            for row in zip(*nomogram_columns(assay).values()):
+                print("  " + "  ".join(f"{value:<18}" for value in row))
+        return
+
+    frame = load_unit(args.unit)
+    result = titrate(frame['weight'].to_numpy(), frame['ideal_weight'].to_numpy(), frame['rate'].to_numpy(),
+                     frame['level'].to_numpy(), frame['assay'].to_numpy())
+    for key in ('dosing_weight', 'bolus', 'rate', 'hold_minutes', 'recheck_hours'):
+        frame['new_' + key if key == 'rate' else key] = result[key]
+    columns = [c for c in ('patient', 'assay', 'level', 'rate', 'bolus', 'hold_minutes', 'new_rate', 'recheck_hours')
+               if c in frame]
+    print(frame[columns].to_string(index=False))
+    if args.out:
+        frame.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
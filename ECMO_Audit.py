@@ -0,0 +1,243 @@
+"""Structured audit log of assessments and timeouts.
+
+Events are put on a bounded in-memory queue and written as JSON lines by a
+background thread, so a Streamlit rerun never waits on disk I/O. The log is
+append-only: when the active file reaches max_bytes it is renamed with a
+timestamp and a new one is started; rotated files are never deleted.
+
+When the queue is full, emit() blocks for up to block_timeout seconds
+(backpressure) and then writes the event itself, so events are never dropped
+for lack of queue space. If the writer thread has stopped, emit() writes
+synchronously straight away. A write that fails (disk full, permissions)
+loses its events: stats() reports the count and the error, and the count is
+recorded in an "audit_gap" event once a write succeeds again.
+
+    python ECMO_Audit.py bench --events 200000 --producers 4
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import ECMO_Rules as rules
+
+DEFAULT_PATH = os.path.join("audit", "ecmo_audit.jsonl")
+STOP = object()
+
+
+class AuditLog:
+    """Bounded queue of events drained to a rotating JSON-line file by a writer thread"""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=16 << 20, queue_size=10_000, block_timeout=0.05,
+                 batch_size=512, flush_interval=0.25, fsync=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.write_lock = threading.Lock()
+        self.enqueued = self.written = self.dropped = self.blocked = self.spilled = self.rotations = 0
+        self.unreported_drops = 0
+        self.error = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        self.bytes = self.file.tell()
+        self.thread = threading.Thread(target=self.run, name="ecmo-audit-writer", daemon=True)
+        self.thread.start()
+
+    # --------------------- Producers ---------------------
+    def emit(self, event, **fields):
+        """Queue an event, or write it here when the queue stays full or the writer has stopped.
+
+        Returns False only if that write failed and the event was lost.
+        """
+        with self.lock:
+            self.seq += 1
+            record = {'seq': self.seq, 'ts': datetime.now().isoformat(timespec="milliseconds"),
+                      'event': event, **fields}
+        if self.thread.is_alive():
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                with self.lock:
+                    self.blocked += 1
+                try:
+                    self.queue.put(record, timeout=self.block_timeout)
+                except queue.Full:
+                    pass
+                else:
+                    with self.lock:
+                        self.enqueued += 1
+                    return True
+            else:
+                with self.lock:
+                    self.enqueued += 1
+                return True
+        with self.lock:
+            self.spilled += 1
+        return self.write_records([record])
+
+    # --------------------- Writer ---------------------
+    def run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is STOP for record in batch)
+            records = [record for record in batch if record is not STOP]
+            if records:
+                self.write_records(records)
+            if stop:
+                with self.write_lock:
+                    self.file.close()
+                return
+
+    def write_records(self, records):
+        """Write records (plus an audit_gap for earlier losses); False if the write failed"""
+        events = len(records)
+        with self.lock:
+            drops, self.unreported_drops = self.unreported_drops, 0
+        if drops:
+            records = records + [{'seq': None, 'ts': datetime.now().isoformat(timespec="milliseconds"),
+                                  'event': "audit_gap", 'dropped': drops}]
+        try:
+            self.write("".join(json.dumps(record, default=str) + "\n" for record in records), len(records))
+        except Exception as exc:  # keep the writer alive; the next write may succeed
+            with self.lock:
+                self.dropped += events
+                self.unreported_drops += drops + events
+                self.error = f"{type(exc).__name__}: {exc}"
+            return False
+        return True
+
+    def write(self, text, count):
+        data = text.encode("utf-8")
+        with self.write_lock:
+            if self.bytes and self.bytes + len(data) > self.max_bytes:
+                self.rotate()
+            self.file.write(text)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.bytes += len(data)
+        with self.lock:
+            self.written += count
+            self.error = None
+
+    def rotate(self):
+        self.file.close()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        n = 0
+        while os.path.exists(f"{self.path}.{stamp}.{n}"):
+            n += 1
+        os.rename(self.path, f"{self.path}.{stamp}.{n}")
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.bytes = 0
+        self.rotations += 1
+
+    def close(self, timeout=5.0):
+        """Write everything queued so far and stop the writer"""
+        self.queue.put(STOP)
+        self.thread.join(timeout)
+
+    def stats(self):
+        """Counters, whether the writer thread is running, and the last write error (None once writes succeed)"""
+        with self.lock:
+            return {'enqueued': self.enqueued, 'written': self.written, 'dropped': self.dropped,
+                    'blocked': self.blocked, 'spilled': self.spilled, 'queued': self.queue.qsize(),
+                    'rotations': self.rotations, 'writer_alive': self.thread.is_alive(), 'error': self.error}
+
+
+# --------------------- Workflow events ---------------------
+def assessment_event(inputs, result):
+    """Fields of an 'assessment' event: scoring inputs (no patient name), scores and recommendation"""
+    cannula_recs = result['cannula_recs']
+    return {
+        'inputs': {key: inputs[key] for key in rules.SCORING_FIELDS if key in inputs},
+        'mode_score_name': result['mode_score_name'], 'mode_score': result['mode_score'],
+        'sofa_score': result['sofa_score'], 'ecpr_criteria_met': result['ecpr_criteria_met'],
+        'inclusion_score': result['inclusion_score'], 'exclusion_count': result['exclusion_count'],
+        'candidacy_score': result['candidacy_score'], 'tier': rules.TIER_NAMES[result['tier']],
+        'required_flow': round(result['required_flow'], 3),
+        'cannula': {'drainage': cannula_recs['drainage'], 'return': cannula_recs['return']},
+    }
+
+
+def timeout_event(state):
+    """Fields of a 'timeout' event from an ECMO_Checklist state"""
+    checklist = state.checklist
+    return {
+        'checklist': checklist.name, 'passed': state.passed,
+        'checked': state.total, 'max_checks': checklist.max_checks,
+        'groups': state.group_counts(),
+        'items': [item.key for item in checklist.items if state.is_checked(item.bit)],
+    }
+
+
+# --------------------- Benchmark ---------------------
+def bench(events, producers, path, queue_size, block_timeout):
+    log = AuditLog(path, queue_size=queue_size, block_timeout=block_timeout)
+    result = rules.assess(rules.normalize_inputs({}))
+    fields = assessment_event(rules.DEFAULT_INPUTS, result)
+    latencies = [[] for _ in range(producers)]
+
+    def produce(index):
+        for _ in range(events // producers):
+            started = time.perf_counter()
+            log.emit("assessment", session=f"bench-{index}", **fields)
+            latencies[index].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    emitted = time.perf_counter() - started
+    log.close(timeout=60)
+    drained = time.perf_counter() - started
+
+    samples = sorted(s for per_thread in latencies for s in per_thread)
+    stats = log.stats()
+    print(f"{len(samples):,} events from {producers} producers: emitted in {emitted:.2f} s "
+          f"({len(samples) / emitted:,.0f} events/s), written in {drained:.2f} s "
+          f"({stats['written'] / drained:,.0f} events/s)")
+    print(f"emit latency p50 {samples[len(samples) // 2] * 1e6:.1f} µs, "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1e6:.1f} µs, max {samples[-1] * 1e3:.2f} ms")
+    print(f"blocked {stats['blocked']:,}, written by producers {stats['spilled']:,}, dropped {stats['dropped']:,}, "
+          f"rotations {stats['rotations']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO audit log")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_cmd = sub.add_parser("bench", help="throughput and emit latency under load")
+    bench_cmd.add_argument("--events", type=int, default=200_000)
+    bench_cmd.add_argument("--producers", type=int, default=4)
+    bench_cmd.add_argument("--path", default=os.path.join("audit", "bench_audit.jsonl"))
+    bench_cmd.add_argument("--queue-size", type=int, default=10_000)
+    bench_cmd.add_argument("--block-timeout", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    bench(args.events, args.producers, args.path, args.queue_size, args.block_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Bounded LRU cache for assessment results.
+
+Entries are evicted least-recently-used first once the cache holds maxsize
+entries, and expire ttl seconds after they were stored. Hit/miss/eviction
+counters are kept for the workflow's debug panel.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import ECMO_Rules as rules
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional per-entry time-to-live"""
+
+    def __init__(self, maxsize=4096, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] is not None and entry[0] <= self.clock():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            now = self.clock()
+            self.entries[key] = (now + self.ttl if self.ttl is not None else None, value)
+            self.entries.move_to_end(key)
+            # Drop expired entries sitting at the cold end, then enforce the size bound
+            while self.entries:
+                expires_at = next(iter(self.entries.values()))[0]
+                if expires_at is None or expires_at > now:
+                    break
+                self.entries.popitem(last=False)
+                self.expirations += 1
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries), 'maxsize': self.maxsize, 'ttl': self.ttl,
+            'hits': self.hits, 'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions, 'expirations': self.expirations,
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def cached_assess(cache, inputs, assess=rules.assess):
+    """assess (ECMO_Rules' by default) memoized on the canonical input key; the result is shared, do not mutate it"""
+    normalized = rules.normalize_inputs(inputs)
+    return cache.get_or_compute(rules.input_key(normalized), lambda: assess(normalized))
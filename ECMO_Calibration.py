@@ -0,0 +1,253 @@
+"""Survival calibration of the SAVE, RESP and SOFA scores from local outcomes.
+
+Replaces the published survival bands (ECMO_Rules.SAVE_BANDS, RESP_BANDS,
+SOFA_MORTALITY) with curves fitted to our own population. Outcomes are a
+CSV with one row per patient and score:
+
+    score_name,score,survived
+    SAVE,-3,1
+    SOFA,11,0
+
+Scores are integers, so each fit works on per-score counts: a logistic
+curve (batched Newton iterations) or an isotonic one (pool-adjacent-
+violators in its max-min closed form, increasing in SAVE/RESP, decreasing
+in SOFA). Bootstrap resamples are drawn as multinomial counts and fitted
+many at a time, in chunks spread over worker processes, for percentile
+confidence intervals.
+
+The result is written as a compact table of survival (and CI) per integer
+score, which the app loads once per process; a prediction is an index into
+that table:
+
+    python ECMO_Calibration.py fit outcomes.csv --method isotonic --bootstrap 2000
+    python ECMO_Calibration.py show
+"""
+
+import argparse
+import functools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "survival_calibration.json")
+SCORE_NAMES = ["SAVE", "RESP", "SOFA"]
+DECREASING = {'SOFA'}  # survival falls as the score rises
+METHODS = ["logistic", "isotonic"]
+NEWTON_ITERATIONS = 25
+RIDGE = 1e-3  # keeps the slope finite when outcomes separate perfectly
+CHUNK = 250  # bootstrap draws fitted together
+
+
+# --------------------- Fitting ---------------------
+def bin_counts(scores, survived):
+    """Lowest score, and trials and survivors per integer score from there up"""
+    scores = np.asarray(scores, dtype=np.int64)
+    low = scores.min()
+    trials = np.bincount(scores - low)
+    survivors = np.bincount(scores - low, weights=np.asarray(survived, dtype=float), minlength=len(trials))
+    return int(low), trials.astype(float), survivors
+
+
+def fit_logistic(x, trials, survivors):
+    """Survival per bin for each row of (draws × bins) counts, by batched Newton steps"""
+    weight = trials.sum(axis=-1, keepdims=True)
+    mean = (trials * x).sum(axis=-1, keepdims=True) / weight
+    spread = np.sqrt((trials * (x - mean) ** 2).sum(axis=-1, keepdims=True) / weight) + 1e-9
+    z = (x - mean) / spread
+    b0 = np.zeros(trials.shape[:-1] + (1,))
+    b1 = np.zeros_like(b0)
+    for _ in range(NEWTON_ITERATIONS):
+        p = 1 / (1 + np.exp(-(b0 + b1 * z)))
+        residual = survivors - trials * p
+        w = trials * p * (1 - p)
+        g0 = residual.sum(axis=-1, keepdims=True)
+        g1 = (residual * z).sum(axis=-1, keepdims=True) - RIDGE * b1
+        h00 = w.sum(axis=-1, keepdims=True) + 1e-9
+        h01 = (w * z).sum(axis=-1, keepdims=True)
+        h11 = (w * z * z).sum(axis=-1, keepdims=True) + RIDGE
+        det = h00 * h11 - h01 ** 2
+        b0 = b0 + (h11 * g0 - h01 * g1) / det
+        b1 = b1 + (h00 * g1 - h01 * g0) / det
+    return 1 / (1 + np.exp(-(b0 + b1 * z)))
+
+
+def fit_isotonic(trials, survivors, decreasing=False):
+    """Survival per bin for each row of (draws × bins) counts, monotone in the score.
+
+    Uses the max-min form of isotonic regression, f(i) = max over j <= i of
+    min over k >= i of mean(j..k), on cumulative sums; empty intervals never
+    bind, so bins without data take their neighbours' level.
+    """
+    if decreasing:
+        return fit_isotonic(trials[..., ::-1], survivors[..., ::-1])[..., ::-1]
+    pad = [(0, 0)] * (trials.ndim - 1) + [(1, 0)]
+    total_trials = np.cumsum(np.pad(trials, pad), axis=-1)
+    total_survivors = np.cumsum(np.pad(survivors, pad), axis=-1)
+    bins = trials.shape[-1]
+    start, stop = np.arange(bins)[:, None], np.arange(bins)[None, :]
+    interval_trials = total_trials[..., None, 1:] - total_trials[..., :-1, None]  # (…, j, k)
+    interval_survivors = total_survivors[..., None, 1:] - total_survivors[..., :-1, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.where((interval_trials > 0) & (stop >= start), interval_survivors / interval_trials, np.inf)
+    lowest_after = np.minimum.accumulate(means[..., ::-1], axis=-1)[..., ::-1]  # min over k >= i
+    return np.where(stop >= start, lowest_after, -np.inf).max(axis=-2)
+
+
+def fit_curve(method, x, trials, survivors, decreasing):
+    if method == "logistic":
+        return fit_logistic(x, trials, survivors)
+    return fit_isotonic(trials, survivors, decreasing)
+
+
+def bootstrap_chunk(method, x, trials, survivors, decreasing, draws, seed):
+    """Curves fitted to `draws` resamples of the (score, outcome) counts"""
+    rng = np.random.default_rng(seed)
+    cells = np.concatenate([survivors, trials - survivors])
+    n = int(trials.sum())
+    counts = rng.multinomial(n, cells / n, size=draws)
+    resampled_survivors = counts[:, :len(trials)].astype(float)
+    resampled_trials = resampled_survivors + counts[:, len(trials):]
+    return fit_curve(method, x, resampled_trials, resampled_survivors, decreasing)
+
+
+def bootstrap(method, x, trials, survivors, decreasing, draws, seed=0, workers=None):
+    """(draws × bins) bootstrap curves, chunks fitted in parallel"""
+    seeds = np.random.SeedSequence(seed).spawn(-(-draws // CHUNK))
+    sizes = [min(CHUNK, draws - i * CHUNK) for i in range(len(seeds))]
+    args = [(method, x, trials, survivors, decreasing, size, s) for size, s in zip(sizes, seeds)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(args) == 1:
+        return np.concatenate([bootstrap_chunk(*a) for a in args])
+    with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+        return np.concatenate(list(pool.map(bootstrap_chunk, *zip(*args))))
+
+
+def calibrate(scores, survived, method="logistic", draws=1000, level=0.95, seed=0, workers=None, decreasing=False):
+    """Survival table with percentile bootstrap CI for one score"""
+    low, trials, survivors = bin_counts(scores, survived)
+    x = low + np.arange(len(trials), dtype=float)
+    curve = fit_curve(method, x, trials, survivors, decreasing)
+    table = {'n': int(trials.sum()), 'low': low, 'survival': curve}
+    if draws:
+        curves = bootstrap(method, x, trials, survivors, decreasing, draws, seed, workers)
+        tail = (1 - level) / 2 * 100
+        table['ci_low'], table['ci_high'] = np.percentile(curves, [tail, 100 - tail], axis=0)
+    return table
+
+
+def fit_file(path, method="logistic", draws=1000, level=0.95, seed=0, workers=None):
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    missing = {'score_name', 'score', 'survived'} - set(frame)
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+    unknown = set(frame['score_name']) - set(SCORE_NAMES)
+    if unknown:
+        raise ValueError(f"{path}: unknown score_name(s) {', '.join(sorted(map(str, unknown)))}")
+    scores = {}
+    for name in SCORE_NAMES:
+        rows = frame[frame['score_name'] == name]
+        if len(rows):
+            scores[name] = calibrate(rows['score'].to_numpy(), rows['survived'].to_numpy(), method, draws, level,
+                                     seed, workers, name in DECREASING)
+    return {'method': method, 'bootstrap': draws, 'level': level,
+            'fitted': datetime.now().isoformat(timespec="seconds"), 'source': os.path.basename(path),
+            'scores': scores}
+
+
+# --------------------- Coefficient file ---------------------
+TABLE_KEYS = ('survival', 'ci_low', 'ci_high')
+
+
+def save_calibration(calibration, path=DEFAULT_PATH):
+    scores = {name: {key: (np.round(value, 4).tolist() if key in TABLE_KEYS else value)
+                     for key, value in table.items()}
+              for name, table in calibration['scores'].items()}
+    with open(path, "w") as f:
+        json.dump({**calibration, 'scores': scores}, f, separators=(",", ":"))
+
+
+def read_calibration(path):
+    with open(path) as f:
+        calibration = json.load(f)
+    for table in calibration['scores'].values():
+        for key in TABLE_KEYS:
+            if key in table:
+                table[key] = np.asarray(table[key])
+    return calibration
+
+
+@functools.lru_cache(maxsize=None)
+def load_calibration(path=None):
+    """The fitted tables (ECMO_SURVIVAL_CALIBRATION or the bundled file), read once; None if there is none"""
+    path = path or os.environ.get('ECMO_SURVIVAL_CALIBRATION') or DEFAULT_PATH
+    if not os.path.exists(path):
+        return None
+    return read_calibration(path)
+
+
+def predict(calibration, name, score):
+    """Survival, CI low and CI high (nan without bootstrap) for scores; a table lookup"""
+    table = calibration['scores'][name]
+    index = np.clip(np.asarray(score, dtype=np.int64) - table['low'], 0, len(table['survival']) - 1)
+    nan = np.full(np.shape(index), np.nan)
+    return (table['survival'][index],
+            table['ci_low'][index] if 'ci_low' in table else nan,
+            table['ci_high'][index] if 'ci_high' in table else nan)
+
+
+def describe(calibration, name, score, mortality=False):
+    """Display text like "62% (95% CI 55-69%)", or None when this score is not calibrated"""
+    if calibration is None or name not in calibration['scores']:
+        return None
+    survival, low, high = (float(v) for v in predict(calibration, name, score))
+    if mortality:
+        survival, low, high = 1 - survival, 1 - high, 1 - low
+    if low != low:
+        return f"{survival:.0%}"
+    return f"{survival:.0%} ({calibration['level']:.0%} CI {low:.0%}-{high:.0%})"
+
+
+# --------------------- CLI ---------------------
+def show(path):
+    calibration = read_calibration(path)
+    print(f"{calibration['method']} fit of {calibration['source']} ({calibration['fitted']}), "
+          f"{calibration['bootstrap']} bootstrap draws, {calibration['level']:.0%} CI")
+    for name, table in calibration['scores'].items():
+        print(f"\n{name} (n={table['n']})")
+        for i, survival in enumerate(table['survival']):
+            ci = (f"  [{table['ci_low'][i]:.1%}, {table['ci_high'][i]:.1%}]" if 'ci_low' in table else "")
+            print(f"  {table['low'] + i:>4}  {survival:>6.1%}{ci}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local survival calibration of SAVE/RESP/SOFA")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fit_cmd = sub.add_parser("fit", help="fit survival curves to an outcomes CSV (score_name, score, survived)")
+    fit_cmd.add_argument("outcomes")
+    fit_cmd.add_argument("--method", choices=METHODS, default="logistic")
+    fit_cmd.add_argument("--bootstrap", type=int, default=1000, help="resamples for the CI (0 for none)")
+    fit_cmd.add_argument("--level", type=float, default=0.95)
+    fit_cmd.add_argument("--seed", type=int, default=0)
+    fit_cmd.add_argument("--workers", type=int, help="processes for the bootstrap (default: all cores)")
+    fit_cmd.add_argument("--out", default=DEFAULT_PATH)
+    show_cmd = sub.add_parser("show", help="print a fitted calibration file")
+    show_cmd.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+    if args.command == "show":
+        show(args.path)
+        return
+    started = time.perf_counter()
+    calibration = fit_file(args.outcomes, args.method, args.bootstrap, args.level, args.seed, args.workers)
+    save_calibration(calibration, args.out)
+    fitted = ", ".join(f"{name} (n={table['n']})" for name, table in calibration['scores'].items())
+    print(f"fitted {fitted} in {time.perf_counter() - started:.2f} s -> {args.out} ({os.path.getsize(args.out):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Unit census: many patients' inputs and scores in one columnar table.
+
+Each input field (ECMO_Rules.DEFAULT_INPUTS) is one NumPy column, so the
+board is scored with ECMO_Scoring.score_batch in one vectorized pass under
+the site's settings. Edits are diffed against the stored columns and only
+the rows that actually changed are validated and re-scored; the rest keep
+their results.
+
+    python ECMO_Census.py bench --rows 200 --edits 1
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import ECMO_Rules as rules
+from ECMO_Scoring import CANNULA_SIZES, describe_invalid, validate_columns
+from ECMO_Sites import score_cohort
+
+BOARD_COLUMNS = ["ID", "Patient", "Mode", "SAVE/RESP", "SOFA", "Candidacy", "Tier", "Target Flow (L/min)",
+                 "Drainage", "Return"]
+RESULT_KEYS = ('mode_score', 'sofa_score', 'candidacy_score', 'tier', 'required_flow', 'drainage', 'return')
+
+
+def column_dtype(default):
+    if isinstance(default, bool):
+        return bool
+    if isinstance(default, (int, float)):
+        return float
+    return object
+
+
+class Census:
+    """Patients' inputs (one array per field) and their scores, re-scored incrementally"""
+
+    def __init__(self, site, capacity=64):
+        self.site = site
+        self.ids = []
+        self.next_id = 1
+        self.inputs = {key: np.empty(capacity, dtype=column_dtype(default))
+                       for key, default in rules.DEFAULT_INPUTS.items()}
+        self.results = {}
+        self.dirty = np.zeros(capacity, dtype=bool)
+        self.rescored = 0  # rows scored by the last rescore()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, key):
+        return self.inputs[key][:len(self.ids)]
+
+    def grow(self, size):
+        capacity = len(self.dirty)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for store in (self.inputs, self.results):
+            for key, values in store.items():
+                grown = np.empty(capacity, dtype=values.dtype)
+                grown[:len(self.ids)] = values[:len(self.ids)]
+                store[key] = grown
+        self.dirty = np.concatenate([self.dirty, np.zeros(capacity - len(self.dirty), dtype=bool)])
+
+    # --------------------- Records ---------------------
+    def add(self, record=None):
+        """Admit a patient (missing inputs take the workflow defaults); returns its id"""
+        inputs = rules.normalize_inputs(record or {})
+        row = len(self.ids)
+        self.grow(row + 1)
+        for key, values in self.inputs.items():
+            values[row] = inputs[key]
+        self.ids.append(self.next_id)
+        self.next_id += 1
+        self.dirty[row] = True
+        return self.ids[-1]
+
+    def remove(self, patient_ids):
+        """Discharge patients; the remaining rows keep their order and results"""
+        keep = ~np.isin(self.ids, list(patient_ids))
+        n = int(keep.sum())
+        for store in (self.inputs, self.results, {'dirty': self.dirty}):
+            for values in store.values():
+                values[:n] = values[:len(self.ids)][keep]
+        self.ids = [patient_id for patient_id, kept in zip(self.ids, keep) if kept]
+
+    def apply(self, columns):
+        """Write edited columns (all rows, in census order) and mark the rows that changed.
+
+        Returns (changed row count, [(row, field, value, message), ...] for
+        rejected edits). A row with any invalid value keeps its old inputs.
+        """
+        n = len(self.ids)
+        changed = np.zeros(n, dtype=bool)
+        for key, values in columns.items():
+            values = np.asarray(values)
+            if len(values) != n:
+                raise ValueError(f"{key}: expected {n} rows, got {len(values)}")
+            changed |= values != self.column(key)
+        rows = np.flatnonzero(changed)
+        if not len(rows):
+            return 0, []
+        edits = {key: np.asarray(values)[rows] for key, values in columns.items()}
+        invalid, valid = validate_columns(edits)
+        errors = [(int(rows[i]), key, value, message) for i, key, value, message in describe_invalid(edits, invalid)]
+        for key, values in edits.items():
+            self.inputs[key][rows[valid]] = values[valid]
+        self.dirty[rows[valid]] = True
+        return int(valid.sum()), errors
+
+    # --------------------- Scoring ---------------------
+    def rescore(self):
+        """Score the rows marked dirty in one score_cohort pass; returns how many were scored"""
+        rows = np.flatnonzero(self.dirty[:len(self.ids)])
+        self.rescored = len(rows)
+        if not len(rows):
+            return 0
+        scored = score_cohort(self.site, {key: self.column(key)[rows] for key in rules.SCORING_FIELDS})
+        for key in RESULT_KEYS:
+            if key not in self.results:
+                self.results[key] = np.zeros(len(self.dirty), dtype=scored[key].dtype)
+            self.results[key][rows] = scored[key]
+        self.dirty[rows] = False
+        return len(rows)
+
+    def board(self):
+        """Display columns for every patient (call rescore() first)"""
+        n = len(self.ids)
+        if not n:
+            return {label: [] for label in BOARD_COLUMNS}
+        results = {key: values[:n] for key, values in self.results.items()}
+        return {
+            'ID': np.array(self.ids),
+            'Patient': self.column('name'),
+            "Mode": self.column('ecmo_mode'),
+            "SAVE/RESP": results['mode_score'],
+            "SOFA": results['sofa_score'],
+            "Candidacy": results['candidacy_score'],
+            "Tier": np.array(rules.TIER_NAMES)[results['tier']],
+            "Target Flow (L/min)": results['required_flow'].round(1),
+            "Drainage": np.array(CANNULA_SIZES)[results['drainage']],
+            "Return": np.array(CANNULA_SIZES)[results['return']],
+        }
+
+
+# --------------------- Benchmark ---------------------
+def bench(rows, edits, rounds, seed=0):
+    from ECMO_Equivalence_Check import generate_patients
+    from ECMO_Sites import load_site
+
+    columns = generate_patients(rows * 4, seed)
+    valid = np.flatnonzero(validate_columns(columns)[1])[:rows]
+    census = Census(load_site())
+    for row in valid:
+        census.add({key: values[row].item() for key, values in columns.items()})
+    started = time.perf_counter()
+    census.rescore()
+    full = time.perf_counter() - started
+
+    rng = np.random.default_rng(seed)
+    elapsed = 0.0
+    for _ in range(rounds):
+        edited = {key: census.column(key).copy() for key in rules.DEFAULT_INPUTS}
+        for row in rng.choice(len(census), edits, replace=False):
+            edited['age'][row] = rng.integers(18, 90)
+        started = time.perf_counter()
+        census.apply(edited)
+        census.rescore()
+        census.board()
+        elapsed += time.perf_counter() - started
+    print(f"{len(census)} patients: full score {full * 1e3:.2f} ms; "
+          f"diff + re-score {edits} edited row(s) + board {elapsed / rounds * 1e3:.2f} ms per edit")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO unit census")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_cmd = sub.add_parser("bench", help="time edits against a census of random patients")
+    bench_cmd.add_argument("--rows", type=int, default=200)
+    bench_cmd.add_argument("--edits", type=int, default=1, help="rows edited per round")
+    bench_cmd.add_argument("--rounds", type=int, default=100)
+    args = parser.parse_args(argv)
+    bench(args.rows, args.edits, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Data-driven pre-cannulation timeout checklist (Step 6).
+
+Items come from a JSON definition (timeout_checklist.json by default, or the
+file named by ECMO_TIMEOUT_CHECKLIST for an institution's own list). The
+definition is compiled once per process; each session keeps only a bitmask
+of checked items plus running group counts, so a toggle updates the counts
+and the pass/fail in O(1). A timeout passes at pass_fraction of the items
+and is complete when every item is checked; completed timeouts are appended
+to a JSON-line log with the pass time and per-item timings:
+
+    python ECMO_Checklist.py report timeout_log.jsonl
+"""
+
+import argparse
+import functools
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+DEFAULT_CHECKLIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeout_checklist.json")
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeout_log.jsonl")
+
+
+class ChecklistItem:
+    __slots__ = ('bit', 'key', 'label', 'group', 'options')
+
+    def __init__(self, bit, key, label, group, options=None):
+        self.bit = bit
+        self.key = key
+        self.label = label
+        self.group = group  # index into Checklist.groups
+        self.options = options  # selectbox items count as done when a non-empty option is chosen
+
+    @property
+    def widget_key(self):
+        return f"timeout_{self.key}"
+
+
+class Checklist:
+    """Compiled checklist definition, shared by every session"""
+
+    def __init__(self, config):
+        self.name = config.get('name', "default")
+        self.pass_fraction = config.get('pass_fraction', 0.8)
+        self.sections = []  # [(title, [group index, ...]), ...]
+        self.groups = []  # [{'key', 'title', 'metric', 'items': [ChecklistItem, ...]}, ...]
+        self.items = []
+        for section in config['sections']:
+            group_indices = []
+            for group in section['groups']:
+                index = len(self.groups)
+                items = []
+                for item in group['items']:
+                    items.append(ChecklistItem(len(self.items), item['key'], item['label'], index, item.get('options')))
+                    self.items.append(items[-1])
+                self.groups.append({'key': group['key'], 'title': group.get('title', group['key']),
+                                    'metric': group.get('metric', group['key']), 'items': items})
+                group_indices.append(index)
+            self.sections.append((section['title'], group_indices))
+
+        keys = [item.key for item in self.items]
+        if len(set(keys)) != len(keys):
+            raise ValueError(f"checklist {self.name!r} has duplicate item keys")
+        if len({group['key'] for group in self.groups}) != len(self.groups):
+            raise ValueError(f"checklist {self.name!r} has duplicate group keys")
+        self.group_sizes = [len(group['items']) for group in self.groups]
+        # Selectbox items start on their first option, so they are checked from the start
+        self.group_minimums = [sum(1 for item in group['items'] if item.options) for group in self.groups]
+        self.max_checks = len(self.items)
+        self.required = self.max_checks * self.pass_fraction
+
+    def new_state(self, now=None):
+        return ChecklistState(self, time.time() if now is None else now)
+
+
+class ChecklistState:
+    """One session's progress through a checklist"""
+
+    __slots__ = ('checklist', 'mask', 'counts', 'total', 'started_at', 'checked_at', 'passed_at', 'completed_at',
+                 'logged')
+
+    def __init__(self, checklist, now):
+        self.checklist = checklist
+        self.mask = 0
+        self.counts = [0] * len(checklist.groups)
+        self.total = 0
+        self.started_at = now
+        self.checked_at = {}  # item key -> first time it was checked
+        self.passed_at = None  # first time pass_fraction was reached
+        self.completed_at = None  # first time every item was checked
+        self.logged = False
+        for item in checklist.items:
+            if item.options:
+                self.update(item.bit, item.options[0], now)
+
+    def is_checked(self, bit):
+        return bool(self.mask >> bit & 1)
+
+    def update(self, bit, value, now=None):
+        """Apply one widget's value; True when this change first completes the timeout (every item checked)"""
+        checked = bool(value)
+        if self.is_checked(bit) == checked:
+            return False
+        now = time.time() if now is None else now
+        item = self.checklist.items[bit]
+        self.mask ^= 1 << bit
+        delta = 1 if checked else -1
+        self.counts[item.group] += delta
+        self.total += delta
+        if checked:
+            self.checked_at.setdefault(item.key, now)
+        if self.passed_at is None and self.passed:
+            self.passed_at = now
+        if self.completed_at is None and self.complete:
+            self.completed_at = now
+            return True
+        return False
+
+    @property
+    def passed(self):
+        return self.total >= self.checklist.required
+
+    @property
+    def complete(self):
+        return self.total == self.checklist.max_checks
+
+    def group_counts(self):
+        return {group['key']: count for group, count in zip(self.checklist.groups, self.counts)}
+
+    def record(self, **context):
+        """Log entry for a completed timeout; item times are seconds from the start"""
+        return {
+            'checklist': self.checklist.name,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            'completed_at': datetime.fromtimestamp(self.completed_at).isoformat(timespec="seconds"),
+            'seconds': round(self.completed_at - self.started_at, 1),
+            'passed_seconds': round(self.passed_at - self.started_at, 1),
+            'checked': self.total,
+            'max_checks': self.checklist.max_checks,
+            'groups': self.group_counts(),
+            'items': {key: round(at - self.started_at, 1) for key, at in self.checked_at.items()},
+            **context,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def load_checklist(path=None):
+    """Compiled checklist for a definition file (ECMO_TIMEOUT_CHECKLIST or the bundled default)"""
+    path = path or os.environ.get('ECMO_TIMEOUT_CHECKLIST') or DEFAULT_CHECKLIST
+    with open(path) as f:
+        return Checklist(json.load(f))
+
+
+def log_completion(state, path=None, **context):
+    """Append a completed timeout (every item checked) to the log once"""
+    if state.completed_at is None or state.logged:
+        return
+    with open(path or os.environ.get('ECMO_TIMEOUT_LOG') or DEFAULT_LOG, "a") as f:
+        f.write(json.dumps(state.record(**context)) + "\n")
+    state.logged = True
+
+
+def summarize_log(path):
+    """Median seconds to pass, to completion and to each item's first check"""
+    durations = []
+    passed = []
+    item_times = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            durations.append(entry['seconds'])
+            passed.append(entry.get('passed_seconds', entry['seconds']))
+            for key, seconds in entry['items'].items():
+                item_times.setdefault(key, []).append(seconds)
+    return {
+        'timeouts': len(durations),
+        'median_seconds': statistics.median(durations) if durations else None,
+        'median_passed_seconds': statistics.median(passed) if passed else None,
+        'items': {key: statistics.median(times) for key, times in
+                  sorted(item_times.items(), key=lambda pair: statistics.median(pair[1]))},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-cannulation timeout log report")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="where time is spent before cannulation")
+    report.add_argument("log", nargs="?", default=DEFAULT_LOG)
+    args = parser.parse_args(argv)
+
+    summary = summarize_log(args.log)
+    if not summary['timeouts']:
+        print("No completed timeouts logged")
+        return
+    print(f"{summary['timeouts']} completed timeouts, median {summary['median_passed_seconds']:.0f} s to pass, "
+          f"{summary['median_seconds']:.0f} s to complete")
+    print("Median seconds from start to first check:")
+    for key, seconds in summary['items'].items():
+        print(f"  {key:<28} {seconds:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""ECPR fast path: the Step 4 ECPR criteria and an arrest-to-flow timer.
+
+Backs pages/2_ECPR_Fast_Path.py, which is meant to render as fast as
+possible during an activation: this module and the page import only the
+standard library, Streamlit and ECMO_Rules (itself stdlib-only), never
+NumPy, pandas or the scoring engines. Criteria are evaluated as each value
+arrives; unknown values count as pending, so the page can say early whether
+the ECPR threshold is met, still open, or out of reach.
+
+The timer ticks in the browser (a requestAnimationFrame loop in an
+st.iframe), so it keeps running between Streamlit reruns without any
+server round trips.
+
+    python ECMO_ECPR.py bench --repeats 5   # time to first render vs the full workflow
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import ECMO_Rules as rules
+
+CRITERIA = [
+    ('witnessed_arrest', "Witnessed cardiac arrest"),
+    ('bystander_cpr', "Bystander CPR initiated"),
+    ('no_rosc', "No ROSC within 60 minutes"),
+    ('ph_value_ecpr', f"pH ≥ {rules.ECPR_PH_MIN}"),
+    ('lactate_ecpr', f"Lactate ≤ {rules.ECPR_LACTATE_MAX:g} mmol/L"),
+]
+# Criteria needed for the ECPR candidacy points (Step 5). A site may move this
+# edge; the fast path does not load site rules (ECMO_Sites pulls in NumPy), so
+# the workflow applies the site's edge after the handoff.
+THRESHOLD = rules.CANDIDACY_BANDS['ECPR'][0][0]
+TARGET_MINUTES = 60  # arrest to ECMO flow
+WARNING_MINUTES = 45
+MILESTONES = [('arrest', "Arrest"), ('activation', "ECPR activation"), ('cannulation', "Cannulation start"),
+              ('flow', "ECMO flow")]
+
+
+def criterion_met(key, value):
+    """True/False for a known value, None while it is pending"""
+    if value is None:
+        return None
+    if key == 'ph_value_ecpr':
+        return value >= rules.ECPR_PH_MIN
+    if key == 'lactate_ecpr':
+        return value <= rules.ECPR_LACTATE_MAX
+    return bool(value)
+
+
+def evaluate(values, threshold=THRESHOLD):
+    """Per-criterion status, counts met and pending, and the call: 'met', 'open' or 'not met'"""
+    status = {key: criterion_met(key, values.get(key)) for key, _ in CRITERIA}
+    met = sum(1 for s in status.values() if s)
+    pending = sum(1 for s in status.values() if s is None)
+    verdict = "met" if met >= threshold else "not met" if met + pending < threshold else "open"
+    return status, met, pending, verdict
+
+
+def handoff(values):
+    """Workflow inputs carried over once cannulation is done (known values only)"""
+    known = {key: value for key, value in values.items() if value is not None}
+    return {'ecmo_mode': "VA", 'ecpr_applicable': True, **known}
+
+
+def timer_html(milestones):
+    """Self-updating arrest-to-flow clock; milestones are epoch seconds"""
+    return f"""
+<div id="clock" style="font-family: -apple-system, sans-serif; text-align: center;">
+  <div id="elapsed" style="font-size: 64px; font-weight: 700; font-variant-numeric: tabular-nums;">--:--</div>
+  <div id="label" style="font-size: 16px; color: #555;"></div>
+</div>
+<script>
+const m = {json.dumps(milestones)};
+const target = {TARGET_MINUTES * 60}, warning = {WARNING_MINUTES * 60};
+const el = document.getElementById("elapsed"), label = document.getElementById("label");
+function fmt(s) {{
+  s = Math.max(0, Math.floor(s));
+  const h = Math.floor(s / 3600), mm = String(Math.floor(s / 60) % 60).padStart(2, "0");
+  return (h ? h + ":" : "") + mm + ":" + String(s % 60).padStart(2, "0");
+}}
+function tick() {{
+  if (!m.arrest) {{ label.textContent = "Start the clock at the time of arrest"; return; }}
+  const end = m.flow || Date.now() / 1000, s = end - m.arrest;
+  el.textContent = fmt(s);
+  el.style.color = s >= target ? "#c62828" : s >= warning ? "#ef6c00" : "#2e7d32";
+  label.textContent = m.flow ? "arrest to flow" : "since arrest (target < {TARGET_MINUTES} min)";
+  if (!m.flow) requestAnimationFrame(tick);
+}}
+tick();
+</script>
+"""
+
+
+# --------------------- Benchmark ---------------------
+PROBE = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+started = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+elapsed = time.perf_counter() - started
+assert not at.exception, at.exception
+print(elapsed, len(set(sys.modules) - before))
+"""
+
+
+def first_render(page, repeats):
+    """(median seconds, modules imported) for a page's first run, each in a fresh interpreter.
+
+    Streamlit itself is already imported, as in a running server; what is
+    timed is the page's own imports and script.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", PROBE, os.path.join(root, page)], cwd=root,
+                             capture_output=True, text=True, check=True).stdout.split()
+        samples.append((float(out[-2]), int(out[-1])))
+    return statistics.median(s for s, _ in samples), samples[0][1]
+
+
+def bench(repeats):
+    for page in ("pages/2_ECPR_Fast_Path.py", "ECMO_Complete_Workflow.py"):
+        seconds, modules = first_render(page, repeats)
+        print(f"{page:<32} first render {seconds * 1e3:7.0f} ms (median of {repeats}), "
+              f"{modules} modules imported")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECPR fast path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_cmd = sub.add_parser("bench", help="time to first render against the full workflow")
+    bench_cmd.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+    bench(args.repeats)
+
+
+if __name__ == "__main__":
+    main()
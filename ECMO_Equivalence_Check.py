@@ -0,0 +1,215 @@
+"""Equivalence and throughput check for the ECMO scoring engines.
+
+Generates random patients that hit every threshold boundary, checks each
+engine in ECMO_Scoring.ENGINES against the ECMO_Rules oracle and records
+ns-per-patient. Exits non-zero on any mismatch or on a throughput regression
+beyond --tolerance against the saved baseline.
+
+    python ECMO_Equivalence_Check.py --patients 2000000
+    python ECMO_Equivalence_Check.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import ECMO_Rules as rules
+import ECMO_Scoring as scoring
+
+BASELINE_FILE = "ECMO_benchmark_baseline.json"
+
+# Numeric inputs: (low, high, integer, extra boundaries beyond the band tables)
+NUMERIC_FIELDS = {
+    'age': (0, 120, True, [17, 18, 75, 76]),
+    'weight': (0.0, 300.0, False, []),
+    'height': (0.0, 250.0, False, []),
+    'intubation_duration': (0, 500, True, []),
+    'dbp': (0, 200, True, []),
+    'mech_vent_duration': (0, 1000, True, []),
+    'resp_pao2_fio2': (0, 600, True, []),
+    'ph_value': (6.0, 8.0, False, []),
+    'peep': (0, 30, True, []),
+    'plateau_pressure': (0, 50, True, []),
+    'pao2_fio2': (0, 600, True, []),
+    'platelets': (0, 500, True, []),
+    'bilirubin': (0.0, 30.0, False, []),
+    'map': (0, 200, True, []),
+    'glasgow': (3, 15, True, []),
+    'creatinine': (0.0, 15.0, False, [1.2, 2.0, 3.5, 5.0]),
+    'urine_output': (0, 5000, True, [200, 500]),
+    'ph_value_ecpr': (6.0, 8.0, False, [rules.ECPR_PH_MIN]),
+    'lactate_ecpr': (0.0, 30.0, False, [rules.ECPR_LACTATE_MAX]),
+}
+
+# Band tables whose edges become boundary values for each input
+FIELD_BANDS = {
+    'age': [rules.SAVE_AGE_BANDS, rules.RESP_AGE_BANDS],
+    'weight': [rules.SAVE_WEIGHT_BANDS],
+    'intubation_duration': [rules.SAVE_INTUBATION_BANDS],
+    'dbp': [rules.SAVE_DBP_BANDS],
+    'mech_vent_duration': [rules.RESP_VENT_BANDS],
+    'resp_pao2_fio2': [rules.RESP_OXY_BANDS],
+    'ph_value': [rules.RESP_PH_BANDS],
+    'peep': [rules.RESP_PEEP_BANDS],
+    'plateau_pressure': [rules.RESP_PLATEAU_BANDS],
+    'pao2_fio2': [rules.SOFA_RESP_BANDS],
+    'platelets': [rules.SOFA_COAG_BANDS],
+    'bilirubin': [rules.SOFA_LIVER_BANDS],
+    'glasgow': [rules.SOFA_CNS_BANDS],
+}
+
+CATEGORICAL_FIELDS = {
+    'sex': ["Male", "Female"],
+    'ecmo_mode': ["VV", "VA"],
+    'acute_etiology': list(rules.ACUTE_ETIOLOGY_POINTS),
+    'acute_diagnosis': list(rules.ACUTE_DIAGNOSIS_POINTS),
+    'vasopressors': list(rules.VASOPRESSOR_POINTS),
+}
+
+FLOAT_OUTPUTS = {'bmi', 'ideal_weight', 'bsa', 'required_flow', 'max_flow_drainage', 'max_flow_return'}
+
+
+def boundary_values(field):
+    """Values on and either side of every threshold an input is compared against"""
+    low, high, integer, extra = NUMERIC_FIELDS[field]
+    edges = list(extra)
+    for edges_, _ in FIELD_BANDS.get(field, []):
+        edges.extend(edges_)
+    values = set()
+    for edge in edges:
+        if integer:
+            values.update([edge - 1, edge, edge + 1])
+        else:
+            values.update([np.nextafter(edge, -np.inf), edge, np.nextafter(edge, np.inf)])
+    return np.array(sorted(v for v in values if low <= v <= high))
+
+
+def generate_patients(n, seed=0, boundary_fraction=0.5):
+    """Random patients, with boundary_fraction of each numeric column drawn from its thresholds"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for field, (low, high, integer, _) in NUMERIC_FIELDS.items():
+        if integer:
+            values = rng.integers(low, high + 1, n)
+        else:
+            values = np.round(rng.uniform(low, high, n), 2)
+        boundaries = boundary_values(field)
+        if len(boundaries):
+            on_boundary = rng.random(n) < boundary_fraction
+            values = np.where(on_boundary, rng.choice(boundaries, n), values)
+        columns[field] = values
+    for field, choices in CATEGORICAL_FIELDS.items():
+        columns[field] = rng.choice(np.array(choices), n)
+    for field, default in rules.DEFAULT_INPUTS.items():
+        if isinstance(default, bool):
+            columns[field] = rng.random(n) < 0.5
+    return columns
+
+
+def compare(expected, actual):
+    """Rows where actual differs from expected, per output key"""
+    mismatches = {}
+    for key, want in expected.items():
+        got = np.asarray(actual[key])
+        if key in FLOAT_OUTPUTS:
+            bad = ~np.isclose(want.astype(float), got.astype(float), rtol=1e-12, atol=0, equal_nan=True)
+        else:
+            bad = want != got
+        if bad.any():
+            mismatches[key] = np.flatnonzero(bad)
+    return mismatches
+
+
+def time_engine(engine, columns, repeat=3):
+    """Best-of-repeat ns per patient"""
+    n = len(columns['age'])
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        engine(columns)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / n
+
+
+def slice_columns(columns, start, stop):
+    return {key: values[start:stop] for key, values in columns.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=1_000_000, help="patients checked against the oracle")
+    parser.add_argument("--chunk", type=int, default=100_000)
+    parser.add_argument("--timing-patients", type=int, default=1_000_000)
+    parser.add_argument("--reference-timing-patients", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="*", default=list(scoring.ENGINES))
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+    if 'numba' in args.engines and scoring.jit_module() is None:
+        # score_batch_jit would silently time the NumPy engine under the numba name
+        print("Skipping numba: ECMO_Numba could not be imported")
+        args.engines = [name for name in args.engines if name != 'numba']
+
+    failed = False
+    fast_engines = [name for name in args.engines if name != 'python']
+
+    # --- Equivalence ---
+    columns = generate_patients(args.patients, args.seed)
+    for start in range(0, args.patients, args.chunk):
+        chunk = slice_columns(columns, start, start + args.chunk)
+        expected = scoring.score_batch_reference(chunk)
+        for name in fast_engines:
+            mismatches = compare(expected, scoring.ENGINES[name](chunk))
+            for key, rows in mismatches.items():
+                failed = True
+                row = start + rows[0]
+                inputs = {field: values[row].item() for field, values in columns.items()}
+                print(f"MISMATCH {name}.{key}: {len(rows)} rows, first row {row}: {inputs}")
+    # An empty cohort scores to empty columns under every output key
+    keys = scoring.score_batch_reference(slice_columns(columns, 0, 1))
+    for name in fast_engines:
+        empty = scoring.ENGINES[name](slice_columns(columns, 0, 0))
+        wrong = [key for key in keys if key not in empty or np.shape(empty[key]) != (0,)]
+        if wrong:
+            failed = True
+            print(f"MISMATCH {name} on an empty cohort: {', '.join(wrong)}")
+    print(f"Checked {args.patients:,} patients against the reference oracle: {'FAILED' if failed else 'OK'}")
+
+    # --- Throughput ---
+    results = {}
+    for name in args.engines:
+        n = args.reference_timing_patients if name == 'python' else args.timing_patients
+        repeat = 1 if name == 'python' else 3
+        results[name] = time_engine(scoring.ENGINES[name], generate_patients(n, args.seed + 1), repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'engine':<10}{'ns/patient':>14}{'baseline':>14}{'change':>10}")
+    for name, ns in results.items():
+        if name in baseline:
+            change = ns / baseline[name] - 1
+            regressed = change > args.tolerance
+            failed = failed or regressed
+            print(f"{name:<10}{ns:>14,.0f}{baseline[name]:>14,.0f}{change:>+10.0%}{'  REGRESSION' if regressed else ''}")
+        else:
+            print(f"{name:<10}{ns:>14,.0f}{'-':>14}{'-':>10}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Lumped-parameter VA-ECMO hemodynamics simulator.
+
+The circulation is five compartments: a time-varying-elastance left
+ventricle, systemic arteries (Windkessel), systemic veins, the right atrium
+(behind the venous return resistance) and the pulmonary circulation, with
+a Starling-like right heart and diode valves. VA-ECMO drains the right
+atrium and returns into the arteries, so flow unloads the right heart but
+raises MAP and LV afterload; when the failing LV can no longer open its
+aortic valve, blood returning through the lungs distends it.
+
+Each patient is seeded from BSA, the Step 3 MAP (systemic resistance is
+calibrated so the pre-ECMO circulation reproduces it within 1 mmHg, up to
+the ~140 mmHg the failing LV can generate) and the Step 7 required_flow. Every (patient, flow) scenario is integrated together with a
+fixed-step Heun solver over (scenarios,) arrays:
+
+    python ECMO_Hemodynamics.py --bsa 1.9 --map 55
+    python ECMO_Hemodynamics.py bench --patients 50 --flows 21
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from ECMO_Rules import CIRCUIT_LIMITS, calc_required_flow
+from ECMO_Scoring import band
+from ECMO_Simulator import MODE_PARAMS
+
+# Adult reference circulation (BSA 1.9 m²); compliances scale with BSA.
+# Units: mL, mmHg, s.
+PARAMS = {
+    'heart_rate': 100,  # bpm
+    'e_max': 0.5,  # mmHg/mL, failing LV (normal ~2.5)
+    'e_min': 0.08,  # mmHg/mL
+    'v0': 15,  # mL, LV unstressed volume
+    'r_aortic': 0.006,  # mmHg·s/mL
+    'r_mitral': 0.005,
+    'c_arterial': 1.5,  # mL/mmHg
+    'c_venous': 70,
+    'c_atrial': 3,
+    'c_pulmonary': 10,
+    'r_venous_return': 0.084,  # mmHg·s/mL, veins to right atrium
+    'g_right': 7.0,  # mL/s per mmHg of right atrial pressure, right heart output
+    'cvp': 8,  # mmHg, pre-ECMO right atrial pressure
+    'native_ci': 1.8,  # L/min/m², initial guess for the resistance calibration
+    'suction_pressure': 2,  # mmHg; drainage falls off as right atrial pressure drops below this
+}
+REFERENCE_BSA = 1.9
+DT = 0.002  # s
+BEATS = 12  # simulated beats; the last two are averaged
+RISK_LEVELS = ["Low", "Moderate", "High"]
+# Left atrial (pulmonary venous) pressure -> LV distension risk
+LA_PRESSURE_RISK_BANDS = ((18, 25), (0, 1, 2))
+MIN_PULSE_PRESSURE = 10  # mmHg; below this the LV barely ejects
+MAP_TOLERANCE = 1.0  # mmHg, resistance calibration target
+CALIBRATION_GRID = 16  # log-spaced resistances integrated up front
+CALIBRATION_STEPS = 8  # secant steps at most
+RESISTANCE_BOUNDS = (0.02, 100.0)  # mmHg·s/mL
+
+
+def activation(t, heart_rate):
+    """Half-sine systolic activation (0-1) with Bazett-like systolic duration"""
+    period = 60.0 / heart_rate
+    systole = 0.3 * np.sqrt(period)
+    phase = np.mod(t, period)
+    return np.where(phase < systole, np.sin(np.pi * phase / systole), 0.0)
+
+
+def integrate(bsa, resistance, flow, params=PARAMS, beats=BEATS, dt=DT):
+    """Integrate every scenario (1D arrays broadcast together); averages over the last two beats"""
+    bsa, resistance, flow = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (bsa, resistance, flow)))
+    scale = bsa / REFERENCE_BSA
+    c_a, c_v, c_ra, c_p = (params[key] * scale for key in ('c_arterial', 'c_venous', 'c_atrial', 'c_pulmonary'))
+    g_right = params['g_right'] * scale
+    r_vr = params['r_venous_return'] / scale
+    e_min, e_max, v0 = params['e_min'], params['e_max'], params['v0']
+    q_set = flow * 1000 / 60  # mL/s
+
+    # Start near the pre-ECMO state: LV filled to the pulmonary pressure in diastole
+    p_ra = np.full(bsa.shape, params['cvp'] + 0.0)
+    p_v = p_ra + r_vr * g_right * p_ra
+    p_p = np.full(bsa.shape, 15.0)
+    state = np.stack([v0 + p_p / e_min, np.full(bsa.shape, 70.0), p_v, p_ra, p_p])
+
+    def derivatives(state, elastance):
+        v_lv, p_a, p_v, p_ra, p_p = state
+        p_lv = elastance * (v_lv - v0)
+        q_aortic = np.maximum(p_lv - p_a, 0) / params['r_aortic']
+        q_mitral = np.maximum(p_p - p_lv, 0) / params['r_mitral']
+        q_systemic = (p_a - p_v) / resistance
+        q_return = (p_v - p_ra) / r_vr
+        q_right = g_right * np.maximum(p_ra, 0)
+        q_ecmo = q_set * np.clip(p_ra / params['suction_pressure'], 0, 1)
+        return np.stack([q_mitral - q_aortic, (q_aortic + q_ecmo - q_systemic) / c_a,
+                         (q_systemic - q_return) / c_v, (q_return - q_right - q_ecmo) / c_ra,
+                         (q_right - q_mitral) / c_p]), p_lv, q_aortic, q_ecmo
+
+    period = 60.0 / params['heart_rate']
+    steps = int(round(beats * period / dt))
+    record_from = steps - int(round(2 * period / dt))
+    elastance = e_min + (e_max - e_min) * activation(np.arange(steps + 1) * dt, params['heart_rate'])
+
+    sums = {key: np.zeros(bsa.shape) for key in ('p_a', 'p_p', 'q_aortic', 'q_ecmo')}
+    p_a_max = np.full(bsa.shape, -np.inf)
+    p_a_min = np.full(bsa.shape, np.inf)
+    v_max = np.zeros(bsa.shape)
+    edp = np.zeros(bsa.shape)
+    for i in range(steps):
+        slope, p_lv, q_aortic, q_ecmo = derivatives(state, elastance[i])
+        predicted = state + dt * slope
+        state = state + dt / 2 * (slope + derivatives(predicted, elastance[i + 1])[0])
+        if i >= record_from:
+            v_lv, p_a, p_v, p_ra, p_p = state
+            sums['p_a'] += p_a
+            sums['p_p'] += p_p
+            sums['q_aortic'] += q_aortic
+            sums['q_ecmo'] += q_ecmo
+            np.maximum(p_a_max, p_a, out=p_a_max)
+            np.minimum(p_a_min, p_a, out=p_a_min)
+            diastole = elastance[i] == e_min
+            edp = np.where(diastole & (v_lv > v_max), e_min * (v_lv - v0), edp)
+            np.maximum(v_max, v_lv, out=v_max)
+
+    samples = steps - record_from
+    return {
+        'map': sums['p_a'] / samples,
+        'pulse_pressure': p_a_max - p_a_min,
+        'la_pressure': sums['p_p'] / samples,
+        'native_output': sums['q_aortic'] / samples * 60 / 1000,  # L/min
+        'ecmo_flow': sums['q_ecmo'] / samples * 60 / 1000,
+        'lv_edv': v_max,
+        'lvedp': edp,
+    }
+
+
+def calibrate_resistance(bsa, map_value, params=PARAMS, tolerance=MAP_TOLERANCE, steps=CALIBRATION_STEPS):
+    """Systemic resistance that reproduces each patient's MAP without ECMO.
+
+    Every patient is first integrated over a log-spaced resistance grid in
+    one batch and the target MAP interpolated, then secant steps on
+    log(resistance) run until every pre-ECMO MAP is within tolerance. The
+    failing LV cannot generate every MAP (about 140 mmHg at most with
+    PARAMS); those patients stop at the closest MAP it reaches.
+    """
+    bsa, target = np.broadcast_arrays(np.atleast_1d(np.asarray(bsa, dtype=float)),
+                                      np.atleast_1d(np.asarray(map_value, dtype=float)))
+    n = bsa.size
+    grid = np.linspace(*np.log(RESISTANCE_BOUNDS), CALIBRATION_GRID)
+    maps = integrate(np.repeat(bsa, len(grid)), np.exp(np.tile(grid, n)), 0.0, params)['map'].reshape(n, -1)
+    maps = np.maximum.accumulate(maps, axis=1)  # MAP rises with resistance
+
+    def error(x, rows):
+        return integrate(bsa[rows], np.exp(x), 0.0, params)['map'] - target[rows]
+
+    x1 = np.array([np.interp(t, row, grid) for t, row in zip(target, maps)])
+    f1 = error(x1, np.arange(n))
+    # Secant from the grid point bracketing the target from below
+    below = np.clip((maps < target[:, None]).sum(axis=1) - 1, 0, len(grid) - 1)
+    x0, f0 = grid[below], maps[np.arange(n), below] - target
+    for _ in range(steps):
+        rows = np.flatnonzero((np.abs(f1) > tolerance) & (x1 != x0))
+        if not len(rows):
+            break
+        slope = (f1[rows] - f0[rows]) / (x1[rows] - x0[rows])
+        step = np.where(slope > 0, -f1[rows] / np.where(slope > 0, slope, 1.0), 0.0)
+        x0[rows], f0[rows] = x1[rows], f1[rows]
+        x1[rows] = np.clip(x1[rows] + step, grid[0], grid[-1])
+        f1[rows] = error(x1[rows], rows)
+    return np.exp(x1)
+
+
+def distension_risk(result):
+    """0 low, 1 moderate, 2 high: left atrial pressure bands, raised when the LV barely ejects"""
+    risk = band(result['la_pressure'], LA_PRESSURE_RISK_BANDS)
+    risk = np.where(result['pulse_pressure'] < MIN_PULSE_PRESSURE, np.maximum(risk, 1), risk)
+    return np.where(result['native_output'] < 0.1, 2, risk)
+
+
+def flow_scenarios(required_flow, count=21):
+    """Flows from 0 to 1.5 × required_flow (L/min)"""
+    return np.linspace(0.0, 1.5 * required_flow, count)
+
+
+def simulate(bsa, map_value, flows, params=PARAMS):
+    """Predicted hemodynamics for each patient (rows) at each ECMO flow (columns)"""
+    bsa = np.atleast_1d(np.asarray(bsa, dtype=float))
+    map_value = np.broadcast_to(np.asarray(map_value, dtype=float), bsa.shape)
+    flows = np.asarray(flows, dtype=float)
+    flows = np.broadcast_to(flows, bsa.shape + flows.shape[-1:]) if flows.ndim < 2 else flows
+    resistance = calibrate_resistance(bsa, map_value, params)
+
+    shape = flows.shape
+    result = integrate(np.repeat(bsa, shape[1]), np.repeat(resistance, shape[1]), flows.ravel(), params)
+    result = {key: value.reshape(shape) for key, value in result.items()}
+    result['flow'] = flows
+    result['rpm'] = MODE_PARAMS['VA']['rpm_base'] + MODE_PARAMS['VA']['rpm_per_flow'] * flows
+    result['distension_risk'] = distension_risk(result)
+    result['resistance'] = resistance
+    return result
+
+
+def patient_simulation(bsa, map_value, required_flow, count=21):
+    """One patient's flow sweep as display columns"""
+    result = simulate(bsa, map_value, flow_scenarios(required_flow, count))
+    return {
+        'Flow (L/min)': result['flow'][0].round(2),
+        'RPM': result['rpm'][0].round(-1),
+        'Above RPM Limit': ["Yes" if rpm > CIRCUIT_LIMITS['max_rpm'] else "No" for rpm in result['rpm'][0]],
+        'MAP (mmHg)': result['map'][0].round(1),
+        'Pulse Pressure (mmHg)': result['pulse_pressure'][0].round(1),
+        'LA Pressure (mmHg)': result['la_pressure'][0].round(1),
+        'Native Output (L/min)': result['native_output'][0].round(2),
+        'LV Distension Risk': [RISK_LEVELS[r] for r in result['distension_risk'][0]],
+    }
+
+
+# --------------------- CLI ---------------------
+def bench(patients, flows, seed=0):
+    rng = np.random.default_rng(seed)
+    bsa = rng.uniform(1.4, 2.4, patients)
+    map_value = rng.uniform(20, 200, patients)  # INPUT_RANGES['map'] has no upper bound
+    flow_grid = np.stack([flow_scenarios(calc_required_flow(b), flows) for b in bsa])
+    started = time.perf_counter()
+    result = simulate(bsa, map_value, flow_grid)
+    elapsed = time.perf_counter() - started
+    error = np.abs(result['map'][:, 0] - map_value)
+    reached = error <= MAP_TOLERANCE
+    print(f"{patients * flows:,} scenarios ({patients} patients × {flows} flows) in {elapsed:.3f} s")
+    print(f"pre-ECMO MAP {map_value.min():.0f}-{map_value.max():.0f} mmHg: {reached.sum()} of {patients} calibrated "
+          f"within {MAP_TOLERANCE:g} mmHg (worst {error[reached].max(initial=0):.2f})")
+    if not reached.all():
+        print(f"  {(~reached).sum()} outside what the failing LV can generate: asked "
+              f"{map_value[~reached].min():.0f}-{map_value[~reached].max():.0f}, reached "
+              f"{result['map'][~reached, 0].min():.0f}-{result['map'][~reached, 0].max():.0f} mmHg")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VA-ECMO lumped-parameter hemodynamics")
+    sub = parser.add_subparsers(dest="command")
+    bench_cmd = sub.add_parser("bench", help="time a batch of patients × flow scenarios")
+    bench_cmd.add_argument("--patients", type=int, default=50)
+    bench_cmd.add_argument("--flows", type=int, default=21)
+    parser.add_argument("--bsa", type=float, default=1.9)
+    parser.add_argument("--map", type=float, default=55, help="pre-ECMO MAP (mmHg)")
+    parser.add_argument("--scenarios", type=int, default=13, help="flows from 0 to 1.5 × required flow")
+    args = parser.parse_args(argv)
+    if args.command == "bench":
+        bench(args.patients, args.flows)
+        return
+    columns = patient_simulation(args.bsa, args.map, calc_required_flow(args.bsa), args.scenarios)
+    print("  ".join(f"{name:>22}" for name in columns))
+    for row in zip(*columns.values()):
+        print("  ".join(f"{value:>22}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Serial reassessment history: per-patient snapshots and the deltas between them.
+
+Each saved assessment is one JSON line appended to the patient's own file
+under history/ (or ECMO_HISTORY_DIR). A history belongs to an MRN or
+encounter ID, not to the typed name, so two patients with the same name
+never share one. Files are named by an HMAC-SHA256 of the ID under a
+deployment secret (ECMO_HISTORY_SECRET, else a random key generated once
+into the history directory), so a file name cannot be matched to an ID
+without the secret. The snapshots are still clinical data about an
+identifiable patient; protect the directory accordingly.
+
+A snapshot keeps only what reassessment compares: the component points,
+the scores, the SAVE/RESP risk band and the candidacy tier. The file is
+append-only. The previous snapshot is its last line, which is read by
+seeking back from the end of the file and then cached per process, so
+getting it costs the same however long the history grows.
+
+    python ECMO_History.py show MRN-0012345
+    python ECMO_History.py bench --snapshots 10000
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+
+import ECMO_Rules as rules
+
+DEFAULT_DIR = "history"
+KEY_FILE = ".key"  # generated deployment secret, when ECMO_HISTORY_SECRET is not set
+TAIL_BLOCK = 1024  # bytes read per step when seeking back for the last line
+SCORE_KEYS = ('sofa_score', 'candidacy_score')
+
+
+def load_secret(directory):
+    """ECMO_HISTORY_SECRET, else the directory's key file (created with a random key on first use)"""
+    secret = os.environ.get('ECMO_HISTORY_SECRET')
+    if secret:
+        return secret.encode()
+    path = os.path.join(directory, KEY_FILE)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, "rb") as f:
+            return f.read()
+    key = secrets.token_bytes(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def patient_key(patient_id, secret):
+    """File stem for an MRN or encounter ID; a keyed HMAC, so it can't be matched to IDs without the secret"""
+    normalized = "".join(patient_id.split()).casefold()
+    return hmac.new(secret, normalized.encode(), hashlib.sha256).hexdigest()
+
+
+def snapshot(result, site_name, ts=None):
+    """The parts of an assessment that reassessment compares"""
+    return {
+        'ts': round(time.time()) if ts is None else ts, 'site': site_name,
+        'mode_score_name': result['mode_score_name'], 'mode_points': result['mode_points'],
+        'mode_score': result['mode_score'], 'mode_risk': result['mode_risk'],
+        'sofa_points': result['sofa_points'], 'sofa_score': result['sofa_score'],
+        'candidacy_score': result['candidacy_score'], 'tier': result['tier'],
+    }
+
+
+def changed(before, after):
+    return {key: (before.get(key), value) for key, value in after.items() if before.get(key) != value}
+
+
+def diff(previous, current):
+    """What moved between two snapshots; keys are present only when something changed.
+
+    The SAVE/RESP points, score and risk band are compared only when the
+    mode is unchanged (SAVE and RESP are different scales); a mode switch is
+    reported as 'mode' alone.
+    """
+    delta = {'elapsed': current['ts'] - previous['ts']}
+    if previous['mode_score_name'] != current['mode_score_name']:
+        delta['mode'] = (previous['mode_score_name'], current['mode_score_name'])
+    else:
+        if changed(previous['mode_points'], current['mode_points']):
+            delta['mode_points'] = changed(previous['mode_points'], current['mode_points'])
+        for key in ('mode_score', 'mode_risk'):
+            if previous[key] != current[key]:
+                delta[key] = (previous[key], current[key])
+    if changed(previous['sofa_points'], current['sofa_points']):
+        delta['sofa_points'] = changed(previous['sofa_points'], current['sofa_points'])
+    for key in SCORE_KEYS:
+        if previous[key] != current[key]:
+            delta[key] = (previous[key], current[key])
+    if previous['tier'] != current['tier']:
+        delta['tier'] = (rules.TIER_NAMES[previous['tier']], rules.TIER_NAMES[current['tier']])
+    return delta
+
+
+def describe_diff(delta, mode_score_name, mode_labels=None, sofa_labels=None):
+    """Markdown lines for a diff (mode_score_name: the current one), most consequential first"""
+    def parts(points, labels):
+        labels = labels or {}
+        return ", ".join(f"{labels.get(key, key)} {old} → {new}" for key, (old, new) in points.items())
+
+    lines = []
+    if 'tier' in delta:
+        lines.append(f"**Tier:** {delta['tier'][0]} → **{delta['tier'][1]}**")
+    if 'candidacy_score' in delta:
+        lines.append(f"**Candidacy Score:** {delta['candidacy_score'][0]} → {delta['candidacy_score'][1]}")
+    if 'mode' in delta:
+        lines.append(f"**Mode:** {delta['mode'][0]} → {delta['mode'][1]} (SAVE and RESP are not comparable)")
+    if 'mode_score' in delta or 'mode_risk' in delta:
+        line = f"**{mode_score_name}:**"
+        if 'mode_score' in delta:
+            line += f" {delta['mode_score'][0]} → {delta['mode_score'][1]}"
+        if 'mode_risk' in delta:
+            line += f" ({delta['mode_risk'][0]} → {delta['mode_risk'][1]})"
+        if 'mode_points' in delta:
+            line += f": {parts(delta['mode_points'], mode_labels)}"
+        lines.append(line)
+    if 'sofa_score' in delta or 'sofa_points' in delta:
+        line = "**SOFA:**"
+        if 'sofa_score' in delta:
+            line += f" {delta['sofa_score'][0]} → {delta['sofa_score'][1]}"
+        if 'sofa_points' in delta:
+            line += f": {parts(delta['sofa_points'], sofa_labels)}"
+        lines.append(line)
+    return lines
+
+
+def read_last_line(path):
+    """The file's last non-empty line, read backwards from the end in TAIL_BLOCK steps"""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        tail = b""
+        while end > 0:
+            start = max(0, end - TAIL_BLOCK)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+            lines = tail.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or end == 0:
+                return lines[-1].decode() or None
+    return None
+
+
+class History:
+    """Append-only assessment history, one JSON-lines file per MRN or encounter ID"""
+
+    def __init__(self, directory=None, secret=None):
+        self.directory = directory or os.environ.get('ECMO_HISTORY_DIR') or DEFAULT_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.secret = secret or load_secret(self.directory)
+        self.latest = {}  # patient key -> last snapshot
+        self.lock = threading.Lock()
+
+    def key(self, patient_id):
+        return patient_key(patient_id, self.secret)
+
+    def path(self, patient_id):
+        return os.path.join(self.directory, self.key(patient_id) + ".jsonl")
+
+    def last(self, patient_id):
+        """The patient's most recent snapshot, or None"""
+        key = self.key(patient_id)
+        with self.lock:
+            if key not in self.latest:
+                path = self.path(patient_id)
+                line = read_last_line(path) if os.path.exists(path) else None
+                self.latest[key] = json.loads(line) if line else None
+            return self.latest[key]
+
+    def append(self, patient_id, record):
+        """Save a snapshot; returns its diff against the previous one (None for the first)"""
+        previous = self.last(patient_id)
+        with self.lock:
+            with open(self.path(patient_id), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self.latest[self.key(patient_id)] = record
+        return diff(previous, record) if previous else None
+
+    def load(self, patient_id):
+        """Every snapshot for the patient, oldest first"""
+        path = self.path(patient_id)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def timeline(snapshots):
+    """One display row per snapshot"""
+    return [{'Saved': datetime.fromtimestamp(s['ts']).strftime("%Y-%m-%d %H:%M"),
+             'Mode Score': f"{s['mode_score_name']} {s['mode_score']}", 'Risk': s['mode_risk'], 'SOFA': s['sofa_score'],
+             'Candidacy': s['candidacy_score'], 'Tier': rules.TIER_NAMES[s['tier']]}
+            for s in snapshots]
+
+
+# --------------------- CLI ---------------------
+def show(patient_id, directory):
+    snapshots = History(directory).load(patient_id)
+    for previous, current in zip([None] + snapshots, snapshots):
+        row = timeline([current])[0]
+        print(json.dumps(row, ensure_ascii=False))
+        if previous:
+            lines = describe_diff(diff(previous, current), current['mode_score_name'])
+            for line in lines or ["no change"]:
+                print("   ", line.replace("**", ""))
+
+
+def bench(snapshots, directory):
+    import shutil
+    import tempfile
+
+    scratch = directory is None
+    directory = directory or tempfile.mkdtemp(prefix="ecmo_history_")
+    history = History(directory)
+    result = rules.assess(rules.normalize_inputs({}))
+    started = time.perf_counter()
+    for i in range(snapshots):
+        history.append("BENCH-0001", snapshot(result, "default", ts=i))
+    append = (time.perf_counter() - started) / snapshots
+    rounds = 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        history.latest.clear()
+        history.last("BENCH-0001")
+    tail = (time.perf_counter() - started) / rounds
+    started = time.perf_counter()
+    history.load("BENCH-0001")
+    full = time.perf_counter() - started
+    size = os.path.getsize(history.path("BENCH-0001"))
+    print(f"{snapshots} snapshots ({size / snapshots:.0f} bytes each): append {append * 1e6:.0f} µs, "
+          f"previous from the file tail {tail * 1e6:.0f} µs, full read {full * 1e3:.1f} ms")
+    if scratch:
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO reassessment history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show_cmd = sub.add_parser("show", help="print a patient's snapshots and the changes between them")
+    show_cmd.add_argument("patient_id", help="MRN or encounter ID")
+    show_cmd.add_argument("--dir")
+    bench_cmd = sub.add_parser("bench", help="time appends and previous-snapshot reads on a long history")
+    bench_cmd.add_argument("--snapshots", type=int, default=10_000)
+    bench_cmd.add_argument("--dir", help="scratch directory (default: a temporary one, removed afterwards)")
+    args = parser.parse_args(argv)
+    if args.command == "show":
+        show(args.patient_id, args.dir)
+    else:
+        bench(args.snapshots, args.dir)
+
+
+if __name__ == "__main__":
+    main()
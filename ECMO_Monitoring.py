@@ -0,0 +1,256 @@
+"""Streaming ECMO circuit alarm engine.
+
+Consumes circuit telemetry as JSON lines, one sample per line:
+
+    {"circuit": "Bay 4", "t": 12.3, "flow": 4.4, "rpm": 3120, "dp": 210, "act": 195, "target_flow": 4.3}
+
+from a tailed file or a local TCP socket, keeps a fixed-size ring buffer
+per circuit and evaluates the Step 7 "ECMO Parameters" limits
+(ECMO_Rules.CIRCUIT_LIMITS) for all circuits at once on every tick.
+Alarms are debounced: a condition has to hold for `raise_after`
+consecutive ticks to raise and be clear for `clear_after` ticks to clear.
+
+    python ECMO_Monitoring.py --listen 127.0.0.1:9700
+    python ECMO_Monitoring.py --tail telemetry.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import warnings
+
+import numpy as np
+
+from ECMO_Rules import CIRCUIT_LIMITS
+
+CHANNELS = ['flow', 'rpm', 'dp', 'svo2', 'lactate']
+ALARMS = ['flow_low', 'flow_high', 'rpm_high', 'dp_high', 'act_low', 'act_high', 'no_signal']
+
+
+class CircuitMonitor:
+    """Ring-buffered telemetry and debounced alarm state for up to max_circuits circuits"""
+
+    def __init__(self, max_circuits=32, window=50, raise_after=3, clear_after=5,
+                 signal_timeout=2.0, limits=CIRCUIT_LIMITS):
+        self.max_circuits = max_circuits
+        self.window = window
+        self.raise_after = raise_after
+        self.clear_after = clear_after
+        self.signal_timeout = signal_timeout
+        self.limits = limits
+
+        # Fixed-size state: memory does not grow with stream length
+        self.buffer = np.full((max_circuits, window, len(CHANNELS)), np.nan, dtype=np.float32)
+        self.write_pos = np.zeros(max_circuits, dtype=np.int64)
+        self.target_flow = np.full(max_circuits, np.nan)
+        self.last_act = np.full(max_circuits, np.nan)
+        self.last_seen = np.full(max_circuits, np.nan)
+        self.active = np.zeros(max_circuits, dtype=bool)
+        self.violating = np.zeros((max_circuits, len(ALARMS)), dtype=np.int32)
+        self.clear = np.zeros((max_circuits, len(ALARMS)), dtype=np.int32)
+        self.alarm_state = np.zeros((max_circuits, len(ALARMS)), dtype=bool)
+
+        self.slots = {}
+        self.free_slots = list(range(max_circuits - 1, -1, -1))
+
+    # --------------------- Circuits ---------------------
+    def slot(self, circuit, now=None):
+        """Row for a circuit, registering it on first sight.
+
+        Registration counts as the last signal, so a circuit that never sends
+        telemetry raises NO_SIGNAL once signal_timeout has passed.
+        """
+        row = self.slots.get(circuit)
+        if row is None:
+            if not self.free_slots:
+                raise ValueError(f"Monitor is full ({self.max_circuits} circuits)")
+            row = self.free_slots.pop()
+            self.slots[circuit] = row
+            self.active[row] = True
+            self.last_seen[row] = time.monotonic() if now is None else now
+        return row
+
+    def set_target(self, circuit, target_flow, now=None):
+        self.target_flow[self.slot(circuit, now)] = target_flow
+
+    def remove(self, circuit):
+        row = self.slots.pop(circuit)
+        self.free_slots.append(row)
+        self.active[row] = False
+        self.buffer[row] = np.nan
+        self.write_pos[row] = 0
+        self.target_flow[row] = self.last_act[row] = self.last_seen[row] = np.nan
+        self.violating[row] = self.clear[row] = 0
+        self.alarm_state[row] = False
+
+    # --------------------- Ingest ---------------------
+    def ingest(self, records, now=None):
+        """Append a batch of telemetry dicts to the ring buffers"""
+        if not records:
+            return
+        now = time.monotonic() if now is None else now
+        rows = np.array([self.slot(r['circuit'], now) for r in records])
+        values = np.array([[r.get(c, np.nan) for c in CHANNELS] for r in records], dtype=np.float32)
+
+        # Position of each record within its circuit's run in this batch
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.searchsorted(sorted_rows, sorted_rows, side="left")
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - starts
+        counts = np.bincount(rows, minlength=self.max_circuits)
+
+        # Only the newest `window` samples per circuit can survive
+        keep = rank >= counts[rows] - self.window
+        pos = (self.write_pos[rows] + rank) % self.window
+        self.buffer[rows[keep], pos[keep]] = values[keep]
+        self.write_pos = (self.write_pos + counts) % self.window
+        self.last_seen[counts > 0] = now
+
+        # Latest target flow and ACT per circuit (both arrive sporadically)
+        for key, store in (('target_flow', self.target_flow), ('act', self.last_act)):
+            has = [i for i, r in enumerate(records) if r.get(key) is not None]
+            if has:
+                key_rows = rows[has][::-1]
+                key_values = np.array([records[i][key] for i in has], dtype=float)[::-1]
+                unique_rows, last = np.unique(key_rows, return_index=True)
+                store[unique_rows] = key_values[last]
+
+    # --------------------- Evaluate ---------------------
+    def conditions(self, now=None):
+        """Raw (undebounced) alarm conditions for every slot, shape (max_circuits, len(ALARMS))"""
+        now = time.monotonic() if now is None else now
+        limits = self.limits
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # empty slots are all-NaN
+            means = np.nanmean(self.buffer, axis=1)
+        flow, rpm, dp = means[:, 0], means[:, 1], means[:, 2]
+        act_low, act_high = limits['act_range']
+
+        raw = np.zeros((self.max_circuits, len(ALARMS)), dtype=bool)
+        raw[:, 0] = flow < self.target_flow - limits['flow_tolerance']
+        raw[:, 1] = flow > self.target_flow + limits['flow_tolerance']
+        raw[:, 2] = rpm >= limits['max_rpm']
+        raw[:, 3] = dp >= limits['max_delta_p']
+        raw[:, 4] = self.last_act < act_low
+        raw[:, 5] = self.last_act > act_high
+        raw[:, 6] = now - self.last_seen > self.signal_timeout
+        raw[~self.active] = False
+        return raw
+
+    def evaluate(self, now=None):
+        """Advance debounce state one tick; return (circuit, alarm, raised) transitions"""
+        raw = self.conditions(now)
+        # Counters saturate at their thresholds so they never overflow
+        self.violating = np.where(raw, np.minimum(self.violating + 1, self.raise_after), 0)
+        self.clear = np.where(raw, 0, np.minimum(self.clear + 1, self.clear_after))
+
+        raise_now = ~self.alarm_state & (self.violating >= self.raise_after)
+        clear_now = self.alarm_state & (self.clear >= self.clear_after)
+        self.alarm_state = (self.alarm_state | raise_now) & ~clear_now
+
+        names = {row: circuit for circuit, row in self.slots.items()}
+        events = []
+        for row, alarm in zip(*np.nonzero(raise_now | clear_now)):
+            events.append((names[row], ALARMS[alarm], bool(raise_now[row, alarm])))
+        return events
+
+    def active_alarms(self):
+        """{circuit: [alarm, ...]} for circuits with at least one raised alarm"""
+        return {circuit: [ALARMS[a] for a in np.flatnonzero(self.alarm_state[row])]
+                for circuit, row in self.slots.items() if self.alarm_state[row].any()}
+
+
+# --------------------- Telemetry sources ---------------------
+def parse_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return record if 'circuit' in record else None
+
+
+async def tail_file(path, pending, from_start=False, poll=0.05):
+    """Follow a telemetry file like `tail -f`, appending parsed records to pending"""
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, 2)
+        partial = ""
+        while True:
+            chunk = f.read()
+            if not chunk:
+                await asyncio.sleep(poll)
+                continue
+            lines = (partial + chunk).split("\n")
+            partial = lines.pop()
+            pending.extend(r for r in map(parse_line, lines) if r is not None)
+
+
+async def serve_socket(host, port, pending):
+    """Accept telemetry connections on a local TCP socket"""
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            record = parse_line(line.decode())
+            if record is not None:
+                pending.append(record)
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def run(monitor, pending, interval=0.1, on_events=print, stop_after=None):
+    """Drain pending records and evaluate all circuits every `interval` seconds"""
+    started = time.monotonic()
+    while stop_after is None or time.monotonic() - started < stop_after:
+        await asyncio.sleep(interval)
+        batch = pending[:]
+        del pending[:len(batch)]
+        monitor.ingest(batch)
+        events = monitor.evaluate()
+        if events:
+            on_events(events)
+
+
+def print_events(events):
+    stamp = time.strftime("%H:%M:%S")
+    for circuit, alarm, raised in events:
+        print(f"{stamp} {'RAISED ' if raised else 'CLEARED'} {circuit}: {alarm}", flush=True)
+
+
+async def main_async(args):
+    monitor = CircuitMonitor(max_circuits=args.max_circuits, window=args.window,
+                             raise_after=args.raise_after, clear_after=args.clear_after)
+    pending = []
+    if args.listen:
+        host, port = args.listen.rsplit(":", 1)
+        server = await serve_socket(host, int(port), pending)
+        print(f"Listening for telemetry on {args.listen}", flush=True)
+        async with server:
+            await run(monitor, pending, args.interval, print_events, args.duration)
+    else:
+        tail = asyncio.create_task(tail_file(args.tail, pending, args.from_start))
+        await run(monitor, pending, args.interval, print_events, args.duration)
+        tail.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO circuit alarm monitor")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--listen", help="host:port to accept telemetry on")
+    source.add_argument("--tail", help="telemetry file to follow")
+    parser.add_argument("--from-start", action="store_true", help="read the tailed file from the beginning")
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between evaluations")
+    parser.add_argument("--window", type=int, default=50, help="samples kept per circuit")
+    parser.add_argument("--max-circuits", type=int, default=32)
+    parser.add_argument("--raise-after", type=int, default=3)
+    parser.add_argument("--clear-after", type=int, default=5)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Fused Numba kernel behind ECMO_Scoring's "numba" backend.
+
+ECMO_Scoring.score_batch builds one NumPy temporary per band lookup,
+comparison and sum, so a cohort's inputs pass through memory dozens of
+times. This kernel scores each patient in a single pass over its inputs:
+BMI, BSA and ideal weight, every SAVE/RESP/SOFA component, ECPR,
+inclusion/exclusion, candidacy score, tier and cannula indices. It writes
+straight into two preallocated output blocks, and patients run in parallel
+across cores (prange).
+
+Numba is optional. Import this module only through ECMO_Scoring.score_batch_jit,
+which prepares the arguments and falls back to the NumPy engine when Numba
+is missing.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+import ECMO_Rules as rules
+
+# Band tables, passed to the kernel as a tuple of edges and a tuple of points in this order
+BAND_TABLES = [
+    rules.SAVE_AGE_BANDS, rules.SAVE_WEIGHT_BANDS, rules.SAVE_INTUBATION_BANDS, rules.SAVE_DBP_BANDS,
+    rules.RESP_AGE_BANDS, rules.RESP_VENT_BANDS, rules.RESP_OXY_BANDS, rules.RESP_PH_BANDS,
+    rules.RESP_PEEP_BANDS, rules.RESP_PLATEAU_BANDS,
+    rules.SOFA_RESP_BANDS, rules.SOFA_COAG_BANDS, rules.SOFA_LIVER_BANDS, rules.SOFA_CNS_BANDS,
+    rules.SAVE_SCORE_BANDS, rules.RESP_SCORE_BANDS, rules.SOFA_SCORE_BANDS,
+]
+(SAVE_AGE, SAVE_WEIGHT, SAVE_INTUBATION, SAVE_DBP, RESP_AGE, RESP_VENT, RESP_OXY, RESP_PH, RESP_PEEP, RESP_PLATEAU,
+ SOFA_RESP, SOFA_COAG, SOFA_LIVER, SOFA_CNS, SAVE_SCORE, RESP_SCORE, SOFA_SCORE) = range(len(BAND_TABLES))
+# A site's candidacy bands follow the fixed tables
+CANDIDACY_KEYS = ['SAVE', 'RESP', 'SOFA', 'ECPR', 'inclusion', 'exclusion', 'tier']
+(CAND_SAVE, CAND_RESP, CAND_SOFA, CAND_ECPR, CAND_INCLUSION, CAND_EXCLUSION,
+ CAND_TIER) = range(len(BAND_TABLES), len(BAND_TABLES) + len(CANDIDACY_KEYS))
+
+# Rows of the output blocks, named as in score_batch
+INT_OUTPUTS = (
+    ['save_age_points', 'save_weight_points', 'save_pre_ecmo_cardiac_arrest_points', 'save_acute_etiology_points',
+     'save_intubation_points', 'save_dbp_points',
+     'resp_age_points', 'resp_immuno_points', 'resp_vent_points', 'resp_oxy_points', 'resp_ph_points',
+     'resp_peep_points', 'resp_plateau_points', 'resp_diagnosis_points', 'resp_cns_points',
+     'sofa_resp_points', 'sofa_coag_points', 'sofa_liver_points', 'sofa_cardiovascular_points', 'sofa_cns_points',
+     'sofa_renal_points',
+     'save_score', 'resp_score', 'mode_score', 'mode_band', 'sofa_score', 'sofa_band', 'ecpr_criteria_met',
+     'inclusion_score', 'exclusion_count', 'candidacy_score', 'tier', 'drainage', 'return']
+)
+FLOAT_OUTPUTS = ['bmi', 'ideal_weight', 'bsa', 'required_flow', 'max_flow_drainage', 'max_flow_return']
+(O_SAVE_AGE, O_SAVE_WEIGHT, O_SAVE_ARREST, O_SAVE_ETIOLOGY, O_SAVE_INTUBATION, O_SAVE_DBP,
+ O_RESP_AGE, O_RESP_IMMUNO, O_RESP_VENT, O_RESP_OXY, O_RESP_PH, O_RESP_PEEP, O_RESP_PLATEAU, O_RESP_DIAGNOSIS,
+ O_RESP_CNS, O_SOFA_RESP, O_SOFA_COAG, O_SOFA_LIVER, O_SOFA_CARDIO, O_SOFA_CNS, O_SOFA_RENAL,
+ O_SAVE_SCORE, O_RESP_SCORE, O_MODE_SCORE, O_MODE_BAND, O_SOFA_SCORE, O_SOFA_BAND, O_ECPR, O_INCLUSION,
+ O_EXCLUSION, O_CANDIDACY, O_TIER, O_DRAINAGE, O_RETURN) = range(len(INT_OUTPUTS))
+O_BMI, O_IDEAL_WEIGHT, O_BSA, O_REQUIRED_FLOW, O_MAX_FLOW_DRAINAGE, O_MAX_FLOW_RETURN = range(len(FLOAT_OUTPUTS))
+
+
+def band_tables(candidacy):
+    """Edges (float64) and points (int64) tuples for the kernel, under a site's candidacy bands"""
+    tables = BAND_TABLES + [candidacy[key] for key in CANDIDACY_KEYS]
+    return (tuple(np.asarray(edges, dtype=np.float64) for edges, _ in tables),
+            tuple(np.asarray(points, dtype=np.int64) for _, points in tables))
+
+
+@njit(inline="always")
+def band(value, edges, points):
+    # np.searchsorted(edges, value, side="right") for one value
+    i = 0
+    while i < len(edges) and edges[i] <= value:
+        i += 1
+    return points[i]
+
+
+@njit(parallel=True, cache=True)
+def score_kernel(numeric, flags, category_points, included, excluded, criteria, edges, points, cannulas,
+                 ints, floats):
+    """Score every patient into ints[INT_OUTPUTS, n] and floats[FLOAT_OUTPUTS, n].
+
+    numeric: (age, weight, height, intubation_duration, dbp, mech_vent_duration, resp_pao2_fio2, ph_value,
+              peep, plateau_pressure, pao2_fio2, platelets, bilirubin, glasgow, creatinine, urine_output,
+              ph_value_ecpr, lactate_ecpr)
+    flags: (is_va, is_male, pre_ecmo_cardiac_arrest, immunocompromised, cns_dysfunction, ecpr_applicable,
+            witnessed_arrest, bystander_cpr, no_rosc)
+    category_points: (acute_etiology, acute_diagnosis, vasopressors) points
+    included / excluded: (criteria fields × n) flags counted by inclusion / exclusion
+    criteria: (inclusion min age, max age, min BMI, max BMI, exclusion max age, min BMI, max BMI)
+    cannulas: (max flows, downsize, has 19, has 21, CANNULA_SIZES index per size, 23 Fr, 21 Fr, 25 Fr positions)
+    """
+    (age, weight, height, intubation, dbp, vent, resp_pf, ph, peep, plateau, sofa_pf, platelets, bilirubin,
+     glasgow, creatinine, urine, ph_ecpr, lactate) = numeric
+    is_va, is_male, arrest, immuno, cns, ecpr_applicable, witnessed, bystander, no_rosc = flags
+    etiology_points, diagnosis_points, vasopressor_points = category_points
+    inc_min_age, inc_max_age, inc_min_bmi, inc_max_bmi, exc_max_age, exc_min_bmi, exc_max_bmi = criteria
+    flows, downsize, has_19, has_21, size_index, size_23, size_21, size_25 = cannulas
+    n_sizes = len(flows)
+
+    for i in prange(len(age)):
+        # Step 1
+        w = float(weight[i])
+        h = float(height[i])
+        bmi = w / ((h / 100) ** 2) if h > 0 else 0.0
+        bsa = 0.007184 * (h ** 0.725) * (w ** 0.425)
+        floats[O_BMI, i] = bmi
+        floats[O_IDEAL_WEIGHT, i] = (50.0 if is_male[i] else 45.5) + 2.3 * ((h - 152.4) / 2.54)
+        floats[O_BSA, i] = bsa
+
+        # Step 2
+        save = (band(age[i], edges[SAVE_AGE], points[SAVE_AGE]), band(w, edges[SAVE_WEIGHT], points[SAVE_WEIGHT]),
+                15 if arrest[i] else 0, etiology_points[i],
+                band(intubation[i], edges[SAVE_INTUBATION], points[SAVE_INTUBATION]),
+                band(dbp[i], edges[SAVE_DBP], points[SAVE_DBP]))
+        resp = (band(age[i], edges[RESP_AGE], points[RESP_AGE]), -2 if immuno[i] else 0,
+                band(vent[i], edges[RESP_VENT], points[RESP_VENT]), band(resp_pf[i], edges[RESP_OXY], points[RESP_OXY]),
+                band(ph[i], edges[RESP_PH], points[RESP_PH]), band(peep[i], edges[RESP_PEEP], points[RESP_PEEP]),
+                band(plateau[i], edges[RESP_PLATEAU], points[RESP_PLATEAU]), diagnosis_points[i],
+                -7 if cns[i] else 0)
+        save_score = 0
+        for k in range(6):
+            ints[O_SAVE_AGE + k, i] = save[k]
+            save_score += save[k]
+        resp_score = 0
+        for k in range(9):
+            ints[O_RESP_AGE + k, i] = resp[k]
+            resp_score += resp[k]
+
+        # Step 3 (renal in ECMO_Rules.sofa_renal_points' branch order)
+        c, u = creatinine[i], urine[i]
+        if c < 1.2 and u >= 500:
+            renal = 0
+        elif c < 2.0 or u < 500:
+            renal = 1
+        elif c < 3.5 or u < 200:
+            renal = 2
+        elif c < 5.0 or u < 200:
+            renal = 3
+        else:
+            renal = 4
+        sofa = (band(sofa_pf[i], edges[SOFA_RESP], points[SOFA_RESP]),
+                band(platelets[i], edges[SOFA_COAG], points[SOFA_COAG]),
+                band(bilirubin[i], edges[SOFA_LIVER], points[SOFA_LIVER]), vasopressor_points[i],
+                band(glasgow[i], edges[SOFA_CNS], points[SOFA_CNS]), renal)
+        sofa_score = 0
+        for k in range(6):
+            ints[O_SOFA_RESP + k, i] = sofa[k]
+            sofa_score += sofa[k]
+
+        mode_score = save_score if is_va[i] else resp_score
+        ints[O_SAVE_SCORE, i] = save_score
+        ints[O_RESP_SCORE, i] = resp_score
+        ints[O_MODE_SCORE, i] = mode_score
+        ints[O_MODE_BAND, i] = (band(save_score, edges[SAVE_SCORE], points[SAVE_SCORE]) if is_va[i]
+                                else band(resp_score, edges[RESP_SCORE], points[RESP_SCORE]))
+        ints[O_SOFA_SCORE, i] = sofa_score
+        ints[O_SOFA_BAND, i] = band(sofa_score, edges[SOFA_SCORE], points[SOFA_SCORE])
+
+        # Step 4
+        ecpr_met = 0
+        if ecpr_applicable[i]:
+            ecpr_met = (int(witnessed[i]) + int(bystander[i]) + int(no_rosc[i])
+                        + int(ph_ecpr[i] >= rules.ECPR_PH_MIN) + int(lactate[i] <= rules.ECPR_LACTATE_MAX))
+        inclusion = int(inc_min_age <= age[i] <= inc_max_age) + int(inc_min_bmi <= bmi <= inc_max_bmi)
+        for k in range(included.shape[0]):
+            inclusion += int(included[k, i])
+        exclusion = int(age[i] > exc_max_age) + int(bmi < exc_min_bmi or bmi > exc_max_bmi)
+        for k in range(excluded.shape[0]):
+            exclusion += int(excluded[k, i])
+        ints[O_ECPR, i] = ecpr_met
+        ints[O_INCLUSION, i] = inclusion
+        ints[O_EXCLUSION, i] = exclusion
+
+        # Step 5
+        candidacy = (band(mode_score, edges[CAND_SAVE], points[CAND_SAVE]) if is_va[i]
+                     else band(mode_score, edges[CAND_RESP], points[CAND_RESP]))
+        candidacy += band(sofa_score, edges[CAND_SOFA], points[CAND_SOFA])
+        if ecpr_applicable[i]:
+            candidacy += band(ecpr_met, edges[CAND_ECPR], points[CAND_ECPR])
+        candidacy += band(inclusion, edges[CAND_INCLUSION], points[CAND_INCLUSION])
+        candidacy += band(exclusion, edges[CAND_EXCLUSION], points[CAND_EXCLUSION])
+        ints[O_CANDIDACY, i] = candidacy
+        ints[O_TIER, i] = band(candidacy, edges[CAND_TIER], points[CAND_TIER])
+
+        # Step 7, as ECMO_Scoring.cannula_recommendations
+        required_flow = bsa * 2.4
+        safety_flow = required_flow * 1.3
+        first = 0
+        while first < n_sizes and flows[first] < safety_flow:
+            first += 1
+        drainage = first
+        returned = first if is_va[i] or first + 1 >= n_sizes else first + 1
+        small = bsa < 1.5
+        large = not small and bsa > 2.5
+        if small and downsize[drainage]:
+            drainage = size_23
+        if small and downsize[returned]:
+            returned = size_21
+        if large and has_19[drainage]:
+            drainage = size_23
+        if large and has_21[returned]:
+            returned = size_25
+        floats[O_REQUIRED_FLOW, i] = required_flow
+        floats[O_MAX_FLOW_DRAINAGE, i] = flows[drainage] if drainage < n_sizes else np.nan
+        floats[O_MAX_FLOW_RETURN, i] = flows[returned] if returned < n_sizes else np.nan
+        ints[O_DRAINAGE, i] = size_index[drainage]
+        ints[O_RETURN, i] = size_index[returned]
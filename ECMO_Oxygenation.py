@@ -0,0 +1,203 @@
+"""VV-ECMO oxygen delivery and recirculation.
+
+Estimates whether a VV flow will oxygenate the patient:
+
+- Cardiac output is an assumed cardiac index × BSA; the ECMO-flow-to-
+  cardiac-output ratio is flow / CO.
+- Recirculation (oxygenated return blood drained straight back into the
+  circuit) rises with that ratio and depends on the cannulation site picked
+  in the Step 6 timeout: Femoral-Femoral recirculates more than
+  Femoral-Jugular. Other sites are treated as Femoral-Femoral.
+- Effective flow, flow × (1 - recirculation), mixes at 100% saturation with
+  the native venous return in the right heart. The native lung then adds
+  oxygen to all but its shunt fraction, estimated from the RESP PaO₂/FiO₂.
+  With venous saturation = SaO₂ - VO₂ / (CO × O₂ capacity) (Fick), SaO₂
+  has a closed form, so every (patient, flow) pair is a few array ops:
+
+    SaO₂ = 1 - shunt·(1 - F)·k / (1 - shunt·(1 - F)),  F = min(effective flow / CO, 1)
+
+    python ECMO_Oxygenation.py cohort cohort.csv --site Femoral-Femoral
+    python ECMO_Oxygenation.py bench --patients 100000 --flows 21
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import ECMO_Rules as rules
+from ECMO_Scoring import as_columns, body_metrics, drop_invalid
+
+CARDIAC_INDEX = 3.5  # L/min/m², hyperdynamic ARDS patient on VV support
+HEMOGLOBIN = 10.0  # g/dL
+VO2_INDEX = 120  # mL O₂/min/m²
+O2_PER_GRAM_HB = 1.34  # mL O₂ per g of saturated Hb
+TARGET_SAO2 = 88  # %, VV target arterial saturation
+TARGET_DO2_VO2 = 3.0  # delivery:consumption ratio for adequate oxygenation
+
+# Step 6 cannulation site -> recirculation = base + gain × ECMO flow / CO
+SITES = ["Femoral-Femoral", "Femoral-Jugular"]
+RECIRCULATION = np.array([(0.10, 0.35), (0.05, 0.15)])
+DEFAULT_SITE = "Femoral-Jugular"  # Step 7's preferred VV placement
+MAX_RECIRCULATION = 0.9
+# RESP PaO₂/FiO₂ -> native lung shunt fraction (interpolated)
+PF_SHUNT = ((50, 100, 200, 300, 500), (0.55, 0.40, 0.25, 0.15, 0.05))
+
+
+def site_index(site):
+    """Row of RECIRCULATION for each site name (unlisted sites -> Femoral-Femoral)"""
+    return np.where(np.asarray(site) == "Femoral-Jugular", 1, 0)
+
+
+def recirculation(flow_ratio, site):
+    """Fraction of ECMO flow drained straight back into the circuit"""
+    coefficients = RECIRCULATION[site_index(site)]
+    base, gain = coefficients[..., 0], coefficients[..., 1]
+    return np.clip(base + gain * np.asarray(flow_ratio, dtype=float), 0, MAX_RECIRCULATION)
+
+
+def shunt_fraction(pao2_fio2):
+    return np.interp(np.asarray(pao2_fio2, dtype=float), *PF_SHUNT)
+
+
+def oxygenation(flow, bsa, pao2_fio2, site=DEFAULT_SITE, cardiac_index=CARDIAC_INDEX, hemoglobin=HEMOGLOBIN):
+    """Oxygen delivery at each ECMO flow (L/min); all arguments broadcast.
+
+    Pass flows as (patients × flows) and per-patient values as (patients, 1)
+    columns to evaluate every flow for every patient at once.
+    """
+    flow = np.asarray(flow, dtype=float)
+    bsa = np.asarray(bsa, dtype=float)
+    cardiac_output = cardiac_index * bsa
+    flow_ratio = flow / cardiac_output
+    recirculating = recirculation(flow_ratio, site)
+    effective_flow = flow * (1 - recirculating)
+    oxygenated = np.minimum(effective_flow / cardiac_output, 1.0)
+
+    capacity = O2_PER_GRAM_HB * hemoglobin * 10  # mL O₂ per L of fully saturated blood
+    extraction = VO2_INDEX * bsa / (cardiac_output * capacity)  # SaO₂ - SvO₂ (fraction)
+    mixed = shunt_fraction(pao2_fio2) * (1 - oxygenated)  # venous blood reaching the arteries
+    sao2 = 1 - mixed * extraction / (1 - mixed)
+    do2 = cardiac_output * capacity * sao2
+    return {
+        'flow_ratio': flow_ratio,
+        'recirculation': recirculating,
+        'effective_flow': effective_flow,
+        'sao2': sao2 * 100,
+        'svo2': np.maximum(sao2 - extraction, 0) * 100,
+        'do2': do2,
+        'do2_vo2': do2 / (VO2_INDEX * bsa),
+    }
+
+
+def adequate(result):
+    return (result['sao2'] >= TARGET_SAO2) & (result['do2_vo2'] >= TARGET_DO2_VO2)
+
+
+def minimum_flow(flows, result):
+    """Lowest flow in each row meeting the SaO₂ and DO₂:VO₂ targets (nan if none)"""
+    ok = adequate(result)
+    flows = np.broadcast_to(flows, ok.shape)
+    first = np.argmax(ok, axis=-1)
+    return np.where(ok.any(axis=-1), np.take_along_axis(flows, first[..., None], axis=-1)[..., 0], np.nan)
+
+
+def flow_scenarios(required_flow, count=21):
+    """Flows from 0.5 × to 1.5 × required_flow (L/min)"""
+    return np.linspace(0.5 * required_flow, 1.5 * required_flow, count)
+
+
+def patient_sweep(bsa, pao2_fio2, required_flow, site=DEFAULT_SITE, count=21):
+    """One patient's flow sweep as display columns"""
+    flows = flow_scenarios(required_flow, count)
+    result = oxygenation(flows, bsa, pao2_fio2, site)
+    return {
+        'Flow (L/min)': flows.round(2),
+        'Flow / CO': result['flow_ratio'].round(2),
+        'Recirculation (%)': (result['recirculation'] * 100).round(1),
+        'Effective Flow (L/min)': result['effective_flow'].round(2),
+        'SaO₂ (%)': result['sao2'].round(1),
+        'DO₂:VO₂': result['do2_vo2'].round(2),
+        'Adequate': ["✅" if ok else "❌" for ok in adequate(result)],
+    }
+
+
+def cohort_oxygenation(columns, site=DEFAULT_SITE, count=21):
+    """Oxygenation at required_flow and the minimum adequate flow for a cohort.
+
+    Uses the RESP P/F; site may be one name or a per-patient column. Rows
+    are computed for every patient; VA rows are only meaningful as VV
+    what-ifs and are flagged by 'is_vv'.
+    """
+    cols, n = as_columns(columns)
+    _, _, bsa = body_metrics(cols['weight'], cols['height'], cols['sex'] == "Male")
+    required_flow = bsa * 2.4
+    site = np.broadcast_to(np.asarray(site), (n,))
+    flows = flow_scenarios(required_flow, count).T  # (patients × flows)
+    sweep = oxygenation(flows, bsa[:, None], cols['resp_pao2_fio2'][:, None], site[:, None])
+    at_target = oxygenation(required_flow, bsa, cols['resp_pao2_fio2'], site)
+    return {
+        'is_vv': cols['ecmo_mode'] == "VV",
+        'required_flow': required_flow,
+        **{key: at_target[key] for key in ('flow_ratio', 'recirculation', 'sao2', 'do2_vo2')},
+        'adequate': adequate(at_target),
+        'minimum_flow': minimum_flow(flows, sweep),
+    }
+
+
+# --------------------- CLI ---------------------
+def bench(patients, flows, seed=0):
+    rng = np.random.default_rng(seed)
+    bsa = rng.uniform(1.4, 2.4, patients)
+    pao2_fio2 = rng.uniform(40, 300, patients)
+    site = np.array(SITES)[rng.integers(0, len(SITES), patients)]
+    flow_grid = flow_scenarios(bsa * 2.4, flows).T
+    started = time.perf_counter()
+    result = oxygenation(flow_grid, bsa[:, None], pao2_fio2[:, None], site[:, None])
+    minimum_flow(flow_grid, result)
+    elapsed = time.perf_counter() - started
+    print(f"{patients * flows:,} scenarios ({patients:,} patients × {flows} flows) in {elapsed:.3f} s "
+          f"({elapsed * 1e9 / (patients * flows):.0f} ns/scenario)")
+
+
+def report(path, site, out):
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    columns = {key: frame[key].to_numpy() for key in rules.SCORING_FIELDS if key in frame}
+    valid = drop_invalid(columns)
+    frame = frame[valid].reset_index(drop=True)
+    columns = {key: values[valid] for key, values in columns.items()}
+    if 'cannulation_site' in frame:
+        site = frame['cannulation_site'].to_numpy()
+    for key, values in cohort_oxygenation(columns, site).items():
+        frame[key] = values
+    frame = frame[frame['is_vv']]
+    shown = [c for c in ('name', 'required_flow', 'flow_ratio', 'recirculation', 'sao2', 'do2_vo2',
+                         'adequate', 'minimum_flow') if c in frame]
+    print(frame[shown].round(2).to_string(index=False))
+    if out:
+        frame.to_csv(out, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VV-ECMO oxygen delivery and recirculation")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cohort_cmd = sub.add_parser("cohort", help="oxygenation at the target flow for the VV patients of a CSV")
+    cohort_cmd.add_argument("path", help="CSV of patients (columns as in ECMO_Rules.DEFAULT_INPUTS, "
+                                         "optionally cannulation_site)")
+    cohort_cmd.add_argument("--site", default=DEFAULT_SITE, choices=SITES,
+                            help="cannulation site when the CSV has no cannulation_site column")
+    cohort_cmd.add_argument("--out", help="write the VV rows with their estimates to this CSV")
+    bench_cmd = sub.add_parser("bench", help="time the kernel over patients × flows")
+    bench_cmd.add_argument("--patients", type=int, default=100_000)
+    bench_cmd.add_argument("--flows", type=int, default=21)
+    args = parser.parse_args(argv)
+    if args.command == "cohort":
+        report(args.path, args.site, args.out)
+    else:
+        bench(args.patients, args.flows)
+
+
+if __name__ == "__main__":
+    main()
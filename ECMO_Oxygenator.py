@@ -0,0 +1,164 @@
+"""Initial sweep gas and FdO₂ settings for VV and VA ECMO.
+
+Starting points derived from the Step 2/3 gas-exchange inputs and the Step 7
+required_flow:
+
+- Sweep flow is required_flow × a sweep:blood ratio set by pH, raised in VV
+  when the lungs need resting (plateau > 30 or driving pressure > 15 cmH₂O)
+  so ventilation can be turned down. The workflow collects PEEP and plateau
+  only for VV, so VA never gets the lung-rest increment.
+- FdO₂ comes from the PaO₂/FiO₂ ratio and the mode; VA starts lower to
+  avoid post-oxygenator hyperoxia.
+
+VV uses the RESP pH and P/F inputs; VA uses the SOFA P/F and, for ECPR
+cases, the ECPR pH (neutral pH otherwise). The rules are band tables, and
+they are precomputed onto lookup grids over pH (0.01 steps), PEEP, plateau
+and P/F, so a lookup is an index computation:
+
+    python ECMO_Oxygenator.py cohort.csv --out settings.csv
+    python ECMO_Oxygenator.py --check
+"""
+
+import argparse
+
+import numpy as np
+
+import ECMO_Rules as rules
+from ECMO_Scoring import as_columns, band, body_metrics, drop_invalid
+
+# pH -> sweep:blood flow ratio (lower-inclusive bins)
+SWEEP_RATIO_BANDS = ((7.15, 7.25, 7.45), (1.5, 1.25, 1.0, 0.75))
+LUNG_REST_RATIO = 0.25  # VV only: added when plateau > 30 or driving pressure > 15 cmH₂O
+LUNG_REST_PLATEAU = 30
+LUNG_REST_DRIVING_PRESSURE = 15
+SWEEP_RANGE = (0.5, 10.0)  # L/min
+SWEEP_STEP = 0.5
+NEUTRAL_PH = 7.4
+
+# PaO₂/FiO₂ -> FdO₂ per mode
+FDO2_BANDS = {
+    'VV': ((200,), (1.0, 0.8)),
+    'VA': ((100, 200, 300), (1.0, 0.8, 0.7, 0.6)),
+}
+
+# Grid axes: (low, high, step); inputs outside are clipped to the ends
+PH_AXIS = (6.0, 8.0, 0.01)
+PRESSURE_AXIS = (0, 60, 1)
+PF_AXIS = (0, 800, 1)
+
+
+def axis_values(axis):
+    low, high, step = axis
+    return np.round(low + step * np.arange(int(round((high - low) / step)) + 1), 6)
+
+
+def axis_index(values, axis):
+    low, high, step = axis
+    index = np.rint((np.asarray(values, dtype=float) - low) / step).astype(np.int64)
+    return np.clip(index, 0, int(round((high - low) / step)))
+
+
+def build_grids():
+    """Sweep ratio over pH, lung-rest flag over (PEEP, plateau) and FdO₂ over (mode, P/F)"""
+    peep = axis_values(PRESSURE_AXIS)[:, None]
+    plateau = axis_values(PRESSURE_AXIS)[None, :]
+    pf = axis_values(PF_AXIS)
+    return {
+        'sweep_ratio': band(axis_values(PH_AXIS), SWEEP_RATIO_BANDS).astype(float),
+        'lung_rest': (plateau > LUNG_REST_PLATEAU) | (plateau - peep > LUNG_REST_DRIVING_PRESSURE),
+        'fdo2': np.stack([band(pf, FDO2_BANDS[mode]) for mode in rules.CHOICES['ecmo_mode']]).astype(float),
+    }
+
+
+GRIDS = build_grids()
+
+
+def gas_settings(required_flow, is_va, pao2_fio2, ph, peep, plateau):
+    """Sweep (L/min), sweep:blood ratio, FdO₂ and lung-rest flag; all arguments broadcast"""
+    lung_rest = GRIDS['lung_rest'][axis_index(peep, PRESSURE_AXIS), axis_index(plateau, PRESSURE_AXIS)]
+    lung_rest = lung_rest & ~np.asarray(is_va, dtype=bool)  # VA has no PEEP/plateau inputs
+    ratio = GRIDS['sweep_ratio'][axis_index(ph, PH_AXIS)] + LUNG_REST_RATIO * lung_rest
+    sweep = np.floor(np.asarray(required_flow) * ratio / SWEEP_STEP + 0.5) * SWEEP_STEP
+    mode = np.asarray(is_va, dtype=np.int64)  # CHOICES order: VV, VA
+    return {
+        'sweep': np.clip(sweep, *SWEEP_RANGE),
+        'sweep_ratio': ratio,
+        'fdo2': GRIDS['fdo2'][mode, axis_index(pao2_fio2, PF_AXIS)],
+        'lung_rest': np.broadcast_to(lung_rest, np.shape(sweep)),
+    }
+
+
+def mode_gas_inputs(cols, is_va):
+    """The P/F and pH each mode's settings are based on"""
+    pao2_fio2 = np.where(is_va, cols['pao2_fio2'], cols['resp_pao2_fio2'])
+    va_ph = np.where(cols['ecpr_applicable'].astype(bool), cols['ph_value_ecpr'], NEUTRAL_PH)
+    ph = np.where(is_va, va_ph, cols['ph_value'])
+    return pao2_fio2, ph
+
+
+def initial_settings(inputs, required_flow):
+    """Gas settings for one patient's workflow inputs"""
+    cols = {key: np.asarray(inputs.get(key, default)) for key, default in rules.DEFAULT_INPUTS.items()}
+    is_va = inputs['ecmo_mode'] == "VA"
+    pao2_fio2, ph = mode_gas_inputs(cols, is_va)
+    settings = gas_settings(required_flow, is_va, pao2_fio2, ph, cols['peep'], cols['plateau_pressure'])
+    return {key: value.item() for key, value in settings.items()}
+
+
+def settings_batch(columns):
+    """Gas settings for a cohort (columns as in ECMO_Rules.DEFAULT_INPUTS)"""
+    cols, n = as_columns(columns)
+    is_va = cols['ecmo_mode'] == "VA"
+    _, _, bsa = body_metrics(cols['weight'], cols['height'], cols['sex'] == "Male")
+    required_flow = bsa * 2.4
+    pao2_fio2, ph = mode_gas_inputs(cols, is_va)
+    settings = gas_settings(required_flow, is_va, pao2_fio2, ph, cols['peep'], cols['plateau_pressure'])
+    return {'required_flow': required_flow, **settings}
+
+
+def check(patients=100_000):
+    """Lung rest applies to VV only, in the workflow (VA inputs carry no PEEP/plateau) and in cohorts"""
+    from ECMO_Equivalence_Check import generate_patients
+
+    va = initial_settings({'ecmo_mode': "VA"}, required_flow=4.3)
+    assert not va['lung_rest'], va
+    assert va['sweep_ratio'] == GRIDS['sweep_ratio'][axis_index(NEUTRAL_PH, PH_AXIS)], va
+    vv = initial_settings({'ecmo_mode': "VV", 'peep': 10, 'plateau_pressure': 35}, required_flow=4.3)
+    assert vv['lung_rest'], vv
+    cols = generate_patients(patients)
+    is_va = cols['ecmo_mode'] == "VA"
+    settings = settings_batch(cols)
+    assert not settings['lung_rest'][is_va].any()
+    assert settings['lung_rest'][~is_va].any()
+    print(f"VA: 4.3 L/min -> sweep {va['sweep']} L/min, no lung rest; "
+          f"{patients:,} patients: lung rest in {settings['lung_rest'][~is_va].mean():.0%} of VV, 0 VA")
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Initial sweep gas and FdO₂ settings for a cohort")
+    parser.add_argument("cohort", nargs="?", help="CSV of patients (columns as in ECMO_Rules.DEFAULT_INPUTS)")
+    parser.add_argument("--out", help="write the cohort with its settings to this CSV")
+    parser.add_argument("--check", action="store_true", help="check the lung-rest rule on random patients")
+    args = parser.parse_args(argv)
+    if args.check:
+        return check()
+    if args.cohort is None:
+        parser.error("a cohort CSV is required (or --check)")
+
+    frame = pd.read_csv(args.cohort)
+    columns = {key: frame[key].to_numpy() for key in rules.SCORING_FIELDS if key in frame}
+    valid = drop_invalid(columns)
+    frame = frame[valid].reset_index(drop=True)
+    columns = {key: values[valid] for key, values in columns.items()}
+    for key, values in settings_batch(columns).items():
+        frame[key] = values
+    shown = [c for c in ('name', 'ecmo_mode', 'required_flow', 'sweep', 'sweep_ratio', 'fdo2', 'lung_rest') if c in frame]
+    print(frame[shown].round(2).to_string(index=False))
+    if args.out:
+        frame.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,642 @@
+"""Reference scoring rules for the ECMO workflow.
+
+Plain-Python copies of the branches in ECMO_Complete_Workflow.py (Steps 1-7).
+These are the reference oracle that every faster engine is checked against,
+so they intentionally keep the original if/elif structure.
+"""
+
+# --------------------- Inputs ---------------------
+# Widget defaults from ECMO_Complete_Workflow.py
+DEFAULT_INPUTS = {
+    # Step 1
+    'name': "", 'age': 40, 'sex': "Male", 'weight': 70.0, 'height': 170.0, 'ecmo_mode': "VV",
+    # Step 2 (SAVE)
+    'pre_ecmo_cardiac_arrest': False, 'acute_etiology': "Post-cardiotomy",
+    'intubation_duration': 0, 'dbp': 80,
+    # Step 2 (RESP)
+    'immunocompromised': False, 'mech_vent_duration': 0, 'resp_pao2_fio2': 100,
+    'ph_value': 7.4, 'peep': 10, 'plateau_pressure': 30,
+    'acute_diagnosis': "Viral pneumonia", 'cns_dysfunction': False,
+    # Step 3 (SOFA)
+    'pao2_fio2': 300, 'platelets': 150, 'bilirubin': 1.0, 'map': 70,
+    'vasopressors': "None", 'glasgow': 15, 'creatinine': 1.0, 'urine_output': 500,
+    # Step 4 (ECPR)
+    'ecpr_applicable': False, 'witnessed_arrest': False, 'bystander_cpr': False,
+    'no_rosc': False, 'ph_value_ecpr': 7.0, 'lactate_ecpr': 10.0,
+    # Step 4 (inclusion / exclusion)
+    'reversible_condition': False, 'no_contraindications': False,
+    'informed_consent': False, 'conventional_failure': False,
+    'irreversible_brain_damage': False, 'terminal_illness': False,
+    'severe_bleeding': False, 'severe_immunosuppression': False,
+}
+
+ACUTE_ETIOLOGY_POINTS = {"Post-cardiotomy": 0, "Acute MI": 6, "Myocarditis": 8, "Other": 4}
+ACUTE_DIAGNOSIS_POINTS = {"Viral pneumonia": 0, "Bacterial pneumonia": 0, "Asthma": 6, "Trauma/surgery": 3, "Other": 0}
+VASOPRESSOR_POINTS = {"None": 0, "Dopamine ≤5 or Dobutamine": 1, "Dopamine >5 or NE ≤0.1": 2, "NE >0.1 or Epi ≤0.1": 3, "NE >0.1 or Epi >0.1": 4}
+
+# Allowed values for the selectbox inputs
+CHOICES = {
+    'sex': ["Male", "Female"],
+    'ecmo_mode': ["VV", "VA"],
+    'acute_etiology': list(ACUTE_ETIOLOGY_POINTS),
+    'acute_diagnosis': list(ACUTE_DIAGNOSIS_POINTS),
+    'vasopressors': list(VASOPRESSOR_POINTS),
+}
+
+# Inputs that affect scoring (the patient name does not)
+SCORING_FIELDS = [key for key in DEFAULT_INPUTS if key != 'name']
+
+# Valid (min, max) for numeric inputs, inclusive; None means unbounded. These
+# are the widget limits, except that weight and height must be positive
+# (0 would make BMI and BSA zero).
+INPUT_RANGES = {
+    'age': (0, 120), 'weight': (1.0, 300.0), 'height': (30.0, 250.0),
+    'intubation_duration': (0, None), 'dbp': (0, None),
+    'mech_vent_duration': (0, None), 'resp_pao2_fio2': (0, None), 'ph_value': (6.0, 8.0),
+    'peep': (0, None), 'plateau_pressure': (0, None),
+    'pao2_fio2': (0, None), 'platelets': (0, None), 'bilirubin': (0.0, None), 'map': (0, None),
+    'glasgow': (3, 15), 'creatinine': (0.0, None), 'urine_output': (0, None),
+    'ph_value_ecpr': (6.0, 8.0), 'lactate_ecpr': (0.0, None),
+}
+
+# Interpretation bands, ordered from the lowest score upwards
+SAVE_BANDS = [("Very High Risk", "~18%"), ("High Risk", "~33%"), ("Medium Risk", "~50%"), ("Low Risk", "~75%")]
+RESP_BANDS = [("Very High Risk", "~18%"), ("High Risk", "~33%"), ("Medium Risk", "~57%"), ("Low Risk", "~76%"), ("Very Low Risk", "~92%")]
+SOFA_MORTALITY = ["~10%", "~15%", "~40%", "~60%", "~80%"]
+
+# Candidacy tiers, ordered from the lowest candidacy score upwards
+TIERS = [
+    ("🔴 **NOT RECOMMENDED for ECMO**", "error", False),
+    ("🟡 **CONSIDER ECMO** (case-by-case)", "warning", True),
+    ("🟢 **RECOMMENDED for ECMO**", "success", True),
+]
+TIER_NAMES = ["NOT RECOMMENDED", "CONSIDER", "RECOMMENDED"]
+
+# --------------------- Band tables ---------------------
+# Each table is (edges, points): a value v falls in bin i when
+# edges[i-1] <= v < edges[i], the same lower-inclusive bins the branches
+# below describe. Integer scores use "<= n" as "< n + 1".
+SAVE_AGE_BANDS = ((18, 45, 55, 65), (0, 7, 12, 18, 22))
+SAVE_WEIGHT_BANDS = ((65, 85, 95), (0, 1, 2, 3))
+SAVE_INTUBATION_BANDS = ((10, 29), (0, 3, 7))
+SAVE_DBP_BANDS = ((20, 40, 60), (11, 8, 5, 0))
+SAVE_SCORE_BANDS = ((-4, 0, 6), (0, 1, 2, 3))
+
+RESP_AGE_BANDS = ((18, 50, 65), (0, -2, -1, 0))
+RESP_VENT_BANDS = ((48, 168), (3, 0, -3))
+RESP_OXY_BANDS = ((100, 150), (-3, -1, 0))
+RESP_PH_BANDS = ((7.15,), (-2, 0))
+RESP_PEEP_BANDS = ((10,), (0, -1))
+RESP_PLATEAU_BANDS = ((30,), (0, -1))
+RESP_SCORE_BANDS = ((-3, 0, 3, 6), (0, 1, 2, 3, 4))
+
+SOFA_RESP_BANDS = ((100, 200, 300, 400), (4, 3, 2, 1, 0))
+SOFA_COAG_BANDS = ((20, 50, 100, 150), (4, 3, 2, 1, 0))
+SOFA_LIVER_BANDS = ((1.2, 2.0, 6.0, 12.0), (0, 1, 2, 3, 4))
+SOFA_CNS_BANDS = ((6, 10, 13, 15), (4, 3, 2, 1, 0))
+SOFA_SCORE_BANDS = ((7, 10, 13, 16), (0, 1, 2, 3, 4))
+
+# Step 5 candidacy contributions and the final tier cut-offs
+CANDIDACY_BANDS = {
+    'SAVE': ((-1, 5), (-1, 1, 2)),
+    'RESP': ((0, 3), (-1, 1, 2)),
+    'SOFA': ((10, 13), (2, 1, -1)),
+    'ECPR': ((4,), (-1, 1)),
+    'inclusion': ((3, 5), (-2, 1, 2)),
+    'exclusion': ((1, 2), (2, 0, -2)),
+    'tier': ((1, 4), (0, 1, 2)),
+}
+
+# Step 4 ECPR criteria: lowest pH and highest lactate (mmol/L) that still count
+ECPR_PH_MIN = 6.8
+ECPR_LACTATE_MAX = 15.0
+
+# Step 4 criteria: checkbox fields counted, plus the age and BMI windows
+INCLUSION_CRITERIA = {
+    'fields': ['reversible_condition', 'no_contraindications', 'informed_consent', 'conventional_failure'],
+    'age_range': (18, 75),
+    'bmi_range': (18, 50),
+}
+EXCLUSION_CRITERIA = {
+    'fields': ['irreversible_brain_damage', 'terminal_illness', 'severe_bleeding', 'severe_immunosuppression'],
+    'max_age': 75,
+    'bmi_range': (18, 50),
+}
+
+# Step 7 cannula capacities (L/min), smallest first
+CANNULA_DATABASE = {
+    "15 Fr": {"max_flow": 2.0, "notes": "Pediatric/small adult"},
+    "17 Fr": {"max_flow": 2.8, "notes": "Small adult"},
+    "19 Fr": {"max_flow": 3.5, "notes": "Standard adult drainage"},
+    "21 Fr": {"max_flow": 4.5, "notes": "Standard adult return"},
+    "23 Fr": {"max_flow": 5.5, "notes": "Large adult drainage"},
+    "25 Fr": {"max_flow": 6.5, "notes": "Large adult return"},
+    "27 Fr": {"max_flow": 7.5, "notes": "Very large adult"},
+    "29 Fr": {"max_flow": 8.5, "notes": "Mega cannula"}
+}
+
+# Step 7 "ECMO Parameters" limits for a running circuit
+CIRCUIT_LIMITS = {
+    'flow_tolerance': 0.5,  # L/min around the target flow
+    'max_rpm': 3500,
+    'max_delta_p': 400,  # mmHg
+    'act_range': (180, 220),  # sec
+}
+
+# The settings a site may override (see ECMO_Sites.py)
+SITE_DEFAULTS = {
+    'inclusion': INCLUSION_CRITERIA,
+    'exclusion': EXCLUSION_CRITERIA,
+    'candidacy': CANDIDACY_BANDS,
+    'cannulas': CANNULA_DATABASE,
+}
+
+# Step 6 timeout groups and their sizes
+TIMEOUT_GROUPS = {'team': 5, 'patient': 4, 'circuit': 3, 'monitoring': 3, 'emergency': 3, 'plan': 3, 'safety': 3}
+
+
+# --------------------- Step 1: Patient Information ---------------------
+def calc_bmi(weight, height):
+    return weight / ((height/100) ** 2) if height > 0 else 0
+
+
+def calc_ideal_weight(sex, height):
+    # Devine formula
+    if sex == "Male":
+        return 50 + 2.3 * ((height - 152.4) / 2.54)
+    return 45.5 + 2.3 * ((height - 152.4) / 2.54)
+
+
+def calc_bsa(height, weight):
+    # DuBois formula
+    return 0.007184 * (height ** 0.725) * (weight ** 0.425)
+
+
+# --------------------- Step 2: SAVE Score ---------------------
+def save_age_points(age):
+    if age < 18:
+        return 0
+    elif age < 45:
+        return 7
+    elif age < 55:
+        return 12
+    elif age < 65:
+        return 18
+    return 22
+
+
+def save_weight_points(weight):
+    if weight < 65:
+        return 0
+    elif weight < 85:
+        return 1
+    elif weight < 95:
+        return 2
+    return 3
+
+
+def save_intubation_points(intubation_duration):
+    if intubation_duration < 10:
+        return 0
+    elif intubation_duration < 29:
+        return 3
+    return 7
+
+
+def save_dbp_points(dbp):
+    if dbp < 20:
+        return 11
+    elif dbp < 40:
+        return 8
+    elif dbp < 60:
+        return 5
+    return 0
+
+
+def save_points(inputs):
+    """Component points of the SAVE score"""
+    return {
+        'age_points': save_age_points(inputs['age']),
+        'weight_points': save_weight_points(inputs['weight']),
+        'pre_ecmo_cardiac_arrest_points': 15 if inputs['pre_ecmo_cardiac_arrest'] else 0,
+        'acute_etiology_points': ACUTE_ETIOLOGY_POINTS[inputs['acute_etiology']],
+        'intubation_points': save_intubation_points(inputs['intubation_duration']),
+        'dbp_points': save_dbp_points(inputs['dbp']),
+    }
+
+
+def save_band(save_score):
+    if save_score <= -5:
+        return SAVE_BANDS[0]
+    elif save_score <= -1:
+        return SAVE_BANDS[1]
+    elif save_score <= 5:
+        return SAVE_BANDS[2]
+    return SAVE_BANDS[3]
+
+
+# --------------------- Step 2: RESP Score ---------------------
+def resp_age_points(age):
+    if age < 18:
+        return 0
+    elif age < 50:
+        return -2
+    elif age < 65:
+        return -1
+    return 0
+
+
+def resp_vent_points(mech_vent_duration):
+    if mech_vent_duration < 48:
+        return 3
+    elif mech_vent_duration < 168:  # 7 days
+        return 0
+    return -3
+
+
+def resp_oxy_points(pao2_fio2):
+    if pao2_fio2 >= 150:
+        return 0
+    elif pao2_fio2 >= 100:
+        return -1
+    return -3
+
+
+def resp_points(inputs):
+    """Component points of the RESP score"""
+    return {
+        'age_points': resp_age_points(inputs['age']),
+        'immuno_points': -2 if inputs['immunocompromised'] else 0,
+        'vent_points': resp_vent_points(inputs['mech_vent_duration']),
+        'oxy_points': resp_oxy_points(inputs['resp_pao2_fio2']),
+        'ph_points': 0 if inputs['ph_value'] >= 7.15 else -2,
+        'peep_points': -1 if inputs['peep'] >= 10 else 0,
+        'plateau_points': -1 if inputs['plateau_pressure'] >= 30 else 0,
+        'diagnosis_points': ACUTE_DIAGNOSIS_POINTS[inputs['acute_diagnosis']],
+        'cns_points': -7 if inputs['cns_dysfunction'] else 0,
+    }
+
+
+def resp_band(resp_score):
+    if resp_score >= 6:
+        return RESP_BANDS[4]
+    elif resp_score >= 3:
+        return RESP_BANDS[3]
+    elif resp_score >= 0:
+        return RESP_BANDS[2]
+    elif resp_score >= -3:
+        return RESP_BANDS[1]
+    return RESP_BANDS[0]
+
+
+# --------------------- Step 3: SOFA Score ---------------------
+def sofa_resp_points(pao2_fio2):
+    if pao2_fio2 >= 400:
+        return 0
+    elif pao2_fio2 >= 300:
+        return 1
+    elif pao2_fio2 >= 200:
+        return 2
+    elif pao2_fio2 >= 100:
+        return 3
+    return 4
+
+
+def sofa_coag_points(platelets):
+    if platelets >= 150:
+        return 0
+    elif platelets >= 100:
+        return 1
+    elif platelets >= 50:
+        return 2
+    elif platelets >= 20:
+        return 3
+    return 4
+
+
+def sofa_liver_points(bilirubin):
+    if bilirubin < 1.2:
+        return 0
+    elif bilirubin < 2.0:
+        return 1
+    elif bilirubin < 6.0:
+        return 2
+    elif bilirubin < 12.0:
+        return 3
+    return 4
+
+
+def sofa_cns_points(glasgow):
+    if glasgow >= 15:
+        return 0
+    elif glasgow >= 13:
+        return 1
+    elif glasgow >= 10:
+        return 2
+    elif glasgow >= 6:
+        return 3
+    return 4
+
+
+def sofa_renal_points(creatinine, urine_output):
+    if creatinine < 1.2 and urine_output >= 500:
+        return 0
+    elif creatinine < 2.0 or urine_output < 500:
+        return 1
+    elif creatinine < 3.5 or urine_output < 200:
+        return 2
+    elif creatinine < 5.0 or urine_output < 200:
+        return 3
+    return 4
+
+
+def sofa_points(inputs):
+    """Component points of the SOFA score"""
+    return {
+        'resp_points': sofa_resp_points(inputs['pao2_fio2']),
+        'coag_points': sofa_coag_points(inputs['platelets']),
+        'liver_points': sofa_liver_points(inputs['bilirubin']),
+        'cardiovascular_points': VASOPRESSOR_POINTS[inputs['vasopressors']],
+        'cns_points': sofa_cns_points(inputs['glasgow']),
+        'renal_points': sofa_renal_points(inputs['creatinine'], inputs['urine_output']),
+    }
+
+
+def sofa_band(sofa_score):
+    if sofa_score <= 6:
+        return SOFA_MORTALITY[0]
+    elif sofa_score <= 9:
+        return SOFA_MORTALITY[1]
+    elif sofa_score <= 12:
+        return SOFA_MORTALITY[2]
+    elif sofa_score <= 15:
+        return SOFA_MORTALITY[3]
+    return SOFA_MORTALITY[4]
+
+
+# --------------------- Step 4: ECMO Criteria ---------------------
+def ecpr_criteria_met(inputs):
+    ph_appropriate = inputs['ph_value_ecpr'] >= ECPR_PH_MIN
+    lactate_appropriate = inputs['lactate_ecpr'] <= ECPR_LACTATE_MAX
+    return sum([inputs['witnessed_arrest'], inputs['bystander_cpr'], inputs['no_rosc'],
+                ph_appropriate, lactate_appropriate])
+
+
+def inclusion_score(inputs, bmi, criteria=INCLUSION_CRITERIA):
+    min_age, max_age = criteria['age_range']
+    min_bmi, max_bmi = criteria['bmi_range']
+    age_appropriate = inputs['age'] >= min_age and inputs['age'] <= max_age
+    bmi_appropriate = min_bmi <= bmi <= max_bmi
+    return sum([inputs[key] for key in criteria['fields']] + [age_appropriate, bmi_appropriate])
+
+
+def exclusion_count(inputs, bmi, criteria=EXCLUSION_CRITERIA):
+    min_bmi, max_bmi = criteria['bmi_range']
+    advanced_age = inputs['age'] > criteria['max_age']
+    extreme_bmi = bmi < min_bmi or bmi > max_bmi
+    return sum([inputs[key] for key in criteria['fields']] + [advanced_age, extreme_bmi])
+
+
+# --------------------- Step 5: Final Assessment ---------------------
+def candidacy(mode_score_name, mode_score, sofa_score, inclusion_score, exclusion_count,
+              ecpr_applicable=False, ecpr_criteria_met=0):
+    """Overall candidacy score, reasons and recommendation tier"""
+    candidacy_score = 0
+    candidacy_reasons = []
+
+    # Mode-specific score assessment
+    if mode_score_name == "SAVE":
+        if mode_score >= 5:
+            candidacy_score += 2
+            candidacy_reasons.append("✅ Good SAVE score (low risk)")
+        elif mode_score >= -1:
+            candidacy_score += 1
+            candidacy_reasons.append("⚠️ Moderate SAVE score")
+        else:
+            candidacy_score -= 1
+            candidacy_reasons.append("❌ Poor SAVE score (high risk)")
+    else:  # RESP score
+        if mode_score >= 3:
+            candidacy_score += 2
+            candidacy_reasons.append("✅ Good RESP score (low risk)")
+        elif mode_score >= 0:
+            candidacy_score += 1
+            candidacy_reasons.append("⚠️ Moderate RESP score")
+        else:
+            candidacy_score -= 1
+            candidacy_reasons.append("❌ Poor RESP score (high risk)")
+
+    # SOFA score assessment
+    if sofa_score <= 9:
+        candidacy_score += 2
+        candidacy_reasons.append("✅ Acceptable SOFA score")
+    elif sofa_score <= 12:
+        candidacy_score += 1
+        candidacy_reasons.append("⚠️ Elevated SOFA score")
+    else:
+        candidacy_score -= 1
+        candidacy_reasons.append("❌ High SOFA score")
+
+    # ECPR assessment
+    if ecpr_applicable:
+        if ecpr_criteria_met >= 4:
+            candidacy_score += 1
+            candidacy_reasons.append("✅ ECPR criteria met")
+        else:
+            candidacy_score -= 1
+            candidacy_reasons.append("❌ ECPR criteria not met")
+
+    # Inclusion criteria
+    if inclusion_score >= 5:
+        candidacy_score += 2
+        candidacy_reasons.append("✅ Most inclusion criteria met")
+    elif inclusion_score >= 3:
+        candidacy_score += 1
+        candidacy_reasons.append("⚠️ Some inclusion criteria met")
+    else:
+        candidacy_score -= 2
+        candidacy_reasons.append("❌ Few inclusion criteria met")
+
+    # Exclusion criteria
+    if exclusion_count == 0:
+        candidacy_score += 2
+        candidacy_reasons.append("✅ No exclusion criteria")
+    elif exclusion_count <= 1:
+        candidacy_score += 0
+        candidacy_reasons.append("⚠️ Minor exclusion criteria")
+    else:
+        candidacy_score -= 2
+        candidacy_reasons.append("❌ Multiple exclusion criteria")
+
+    # Final recommendation
+    if candidacy_score >= 4:
+        tier = 2
+    elif candidacy_score >= 1:
+        tier = 1
+    else:
+        tier = 0
+
+    return candidacy_score, candidacy_reasons, tier
+
+
+# --------------------- Step 6: Pre-Cannulation Timeout ---------------------
+def timeout_result(group_counts):
+    """Total checks and pass/fail for the Step 6 timeout"""
+    total_checks = sum(group_counts.values())
+    max_checks = sum(TIMEOUT_GROUPS.values())
+    timeout_passed = total_checks >= (max_checks * 0.8)  # 80% threshold
+    return total_checks, max_checks, timeout_passed
+
+
+# --------------------- Step 7: Initiation Recommendations ---------------------
+def calc_required_flow(bsa):
+    return bsa * 2.4  # L/min/m²
+
+
+def get_specific_cannula_recommendations(required_flow, bsa, ecmo_mode, cannula_database=CANNULA_DATABASE):
+    """Get specific cannula recommendations based on flow requirements and patient size"""
+
+    # Add 30% safety margin for flow capacity
+    safety_flow = required_flow * 1.3
+
+    # Find appropriate cannulas for the required flow
+    suitable_cannulas = []
+    for size, specs in cannula_database.items():
+        if specs["max_flow"] >= safety_flow:
+            suitable_cannulas.append((size, specs))
+
+    # Sort by flow capacity (smallest adequate first)
+    suitable_cannulas.sort(key=lambda x: x[1]["max_flow"])
+
+    if not suitable_cannulas:
+        return {"drainage": "29+ Fr", "return": "29+ Fr", "notes": "Very high flow required"}
+
+    # Select optimal cannulas based on ECMO mode and patient size
+    if ecmo_mode == "VV":
+        # For VV, drainage needs higher flow than return
+        if len(suitable_cannulas) >= 2:
+            drainage = suitable_cannulas[0][0]  # Higher flow for drainage
+            return_cannula = suitable_cannulas[1][0] if len(suitable_cannulas) > 1 else suitable_cannulas[0][0]
+        else:
+            drainage = suitable_cannulas[0][0]
+            return_cannula = suitable_cannulas[0][0]
+    else:  # VA
+        # For VA, both need similar flow capacity
+        drainage = suitable_cannulas[0][0]
+        return_cannula = suitable_cannulas[0][0]
+
+    # Adjust for patient size considerations
+    if bsa < 1.5:  # Small patient
+        if "25" in drainage or "27" in drainage or "29" in drainage:
+            drainage = "23 Fr"  # Downsize for small patient
+        if "25" in return_cannula or "27" in return_cannula or "29" in return_cannula:
+            return_cannula = "21 Fr"  # Downsize for small patient
+    elif bsa > 2.5:  # Large patient
+        if "19" in drainage:
+            drainage = "23 Fr"  # Upsize for large patient
+        if "21" in return_cannula:
+            return_cannula = "25 Fr"  # Upsize for large patient
+
+    return {
+        "drainage": drainage,
+        "return": return_cannula,
+        "max_flow_drainage": next(specs["max_flow"] for size, specs in cannula_database.items() if size == drainage),
+        "max_flow_return": next(specs["max_flow"] for size, specs in cannula_database.items() if size == return_cannula),
+        "notes": f"Target flow: {required_flow:.1f} L/min, Safety margin: {safety_flow:.1f} L/min"
+    }
+
+
+# --------------------- Input Normalization ---------------------
+def widget_limits(key):
+    """min_value/max_value keyword arguments for a field's number_input"""
+    low, high = INPUT_RANGES[key]
+    return {'min_value': low} if high is None else {'min_value': low, 'max_value': high}
+
+
+def range_message(key):
+    low, high = INPUT_RANGES[key]
+    return f"{key} must be at least {low}" if high is None else f"{key} must be between {low} and {high}"
+
+
+def normalize_inputs(inputs):
+    """Defaults filled in and values coerced to the widget types; raises ValueError on bad fields"""
+    unknown = set(inputs) - set(DEFAULT_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    normalized = {}
+    for key, default in DEFAULT_INPUTS.items():
+        value = inputs.get(key, default)
+        if isinstance(default, bool):
+            if value not in (True, False, 0, 1):
+                raise ValueError(f"{key} must be true or false")
+            value = bool(value)
+        elif isinstance(default, (int, float)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+                raise ValueError(f"{key} must be a number")
+            low, high = INPUT_RANGES[key]
+            if not low <= value < float("inf") or (high is not None and value > high):
+                raise ValueError(range_message(key))
+            if isinstance(default, int) and float(value).is_integer():
+                value = int(value)
+            elif isinstance(default, float):
+                value = float(value)
+        elif key in CHOICES:
+            if value not in CHOICES[key]:
+                raise ValueError(f"{key} must be one of: {', '.join(CHOICES[key])}")
+        else:
+            value = str(value)
+        normalized[key] = value
+    return normalized
+
+
+def input_key(inputs):
+    """Canonical, hashable key for normalized inputs"""
+    return tuple(inputs[key] for key in SCORING_FIELDS)
+
+
+# --------------------- Full Assessment ---------------------
+def assess(inputs):
+    """Run Steps 1-5 and the Step 7 cannula sizing for one patient"""
+    inputs = {**DEFAULT_INPUTS, **inputs}
+
+    bmi = calc_bmi(inputs['weight'], inputs['height'])
+    ideal_weight = calc_ideal_weight(inputs['sex'], inputs['height'])
+    bsa = calc_bsa(inputs['height'], inputs['weight'])
+
+    if inputs['ecmo_mode'] == "VA":
+        mode_score_name = "SAVE"
+        mode_points = save_points(inputs)
+        mode_score = sum(mode_points.values())
+        mode_risk, mode_survival = save_band(mode_score)
+    else:
+        mode_score_name = "RESP"
+        mode_points = resp_points(inputs)
+        mode_score = sum(mode_points.values())
+        mode_risk, mode_survival = resp_band(mode_score)
+
+    sofa = sofa_points(inputs)
+    sofa_score = sum(sofa.values())
+
+    ecpr_met = ecpr_criteria_met(inputs) if inputs['ecpr_applicable'] else 0
+    inclusion = inclusion_score(inputs, bmi)
+    exclusion = exclusion_count(inputs, bmi)
+
+    candidacy_score, candidacy_reasons, tier = candidacy(
+        mode_score_name, mode_score, sofa_score, inclusion, exclusion,
+        inputs['ecpr_applicable'], ecpr_met)
+    recommendation, recommendation_color, is_candidate = TIERS[tier]
+
+    required_flow = calc_required_flow(bsa)
+
+    return {
+        'bmi': bmi, 'ideal_weight': ideal_weight, 'bsa': bsa,
+        'mode_score_name': mode_score_name, 'mode_points': mode_points, 'mode_score': mode_score,
+        'mode_risk': mode_risk, 'mode_survival': mode_survival,
+        'sofa_points': sofa, 'sofa_score': sofa_score, 'sofa_mortality': sofa_band(sofa_score),
+        'ecpr_criteria_met': ecpr_met, 'inclusion_score': inclusion, 'exclusion_count': exclusion,
+        'candidacy_score': candidacy_score, 'candidacy_reasons': candidacy_reasons, 'tier': tier,
+        'recommendation': recommendation, 'recommendation_color': recommendation_color,
+        'is_candidate': is_candidate,
+        'required_flow': required_flow,
+        'cannula_recs': get_specific_cannula_recommendations(required_flow, bsa, inputs['ecmo_mode']),
+    }
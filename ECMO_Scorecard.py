@@ -0,0 +1,102 @@
+"""Consolidated scorecards for the workflow, and a per-rerun payload meter.
+
+Every Streamlit element is its own delta message on every rerun, and a
+placeholder that is filled later costs two: the st.empty and its content.
+Steps 2 and 3 used to show each component's points as a separate
+st.metric in its own placeholder. A scorecard puts a whole score on one
+markdown element: the total, the risk band and a one-row table of
+component points. The same applies to runs of st.write bullets, which are
+joined into one markdown list.
+
+Only the number and size of elements shrink: Streamlit re-sends every
+element on each rerun and has no per-cell diff for built-in elements, so
+sending just the changed cells would need a custom component with its own
+frontend build, which this does not do.
+
+The meter checks the timeout items by label, so it reaches Step 7 on
+older pages too. Run every page from the same directory, because
+Streamlit reads .streamlit/config.toml from the working directory (usage
+statistics add ~10 KiB per rerun). From the repo root, with VA and Step 7
+shown:
+
+    original workflow          204 messages, 29.5 KiB per rerun
+    before the scorecards      254 messages, 41.7 KiB
+    with the scorecards        204 messages, 37.1 KiB
+
+    python ECMO_Scorecard.py measure                       # this workflow
+    python ECMO_Scorecard.py measure --page old/ECMO_Complete_Workflow.py
+"""
+
+import argparse
+import os
+
+
+def scorecard(title, points, labels, band=None):
+    """Markdown for one score: heading, band line, and one table row of component points"""
+    header = " | ".join(labels[key].removesuffix(" Points") for key in labels)
+    row = " | ".join(str(points[key]) for key in labels)
+    lines = [f"### 🎯 **{title}**"]
+    if band:
+        lines.append(band)
+    lines += ["", f"| {header} |", "|" + " :-: |" * len(labels), f"| {row} |"]
+    return "\n".join(lines)
+
+
+def bullets(*items):
+    """One markdown list for what used to be one st.write per bullet"""
+    return "\n".join(f"- {item}" for item in items if item)
+
+
+# --------------------- Payload meter ---------------------
+def measure(page, edits=10):
+    """Delta messages and bytes the script emits per rerun, with Step 7 on screen.
+
+    Counts every ForwardMsg the script enqueues, before the queue coalesces
+    deltas to the same slot; how many of those coalesce depends on when the
+    server flushes, which on a slow link is often.
+    """
+    from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+    from streamlit.testing.v1 import AppTest
+
+    from ECMO_Checklist import load_checklist
+
+    # Timeout items by label, so pages from before the keyed checklist also reach Step 7
+    timeout_labels = {item.label for item in load_checklist().items}
+    sent = []
+    ForwardMsgQueue.on_before_enqueue_msg(sent.append)
+    try:
+        at = AppTest.from_file(page, default_timeout=120).run()
+        next(box for box in at.selectbox if box.label == "ECMO Mode").set_value("VA").run()
+        for checkbox in at.checkbox:
+            if checkbox.label in timeout_labels:
+                checkbox.check()
+        at.run()
+        if not any("Step 7" in header.value for header in at.header):
+            raise RuntimeError(f"{page} did not reach Step 7")
+        age = at.number_input[0]
+        messages = size = 0
+        for i in range(edits):
+            sent.clear()
+            at.number_input[0].set_value(age.value + 1 + i % 2).run()
+            assert not at.exception, at.exception
+            messages += len(sent)
+            size += sum(msg.ByteSize() for msg in sent)
+    finally:
+        ForwardMsgQueue.on_before_enqueue_msg(None)
+    return messages / edits, size / edits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workflow scorecards and payload meter")
+    sub = parser.add_subparsers(dest="command", required=True)
+    measure_cmd = sub.add_parser("measure", help="messages and bytes per rerun after a Step 1 edit")
+    measure_cmd.add_argument("--page", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "ECMO_Complete_Workflow.py"))
+    measure_cmd.add_argument("--edits", type=int, default=10)
+    args = parser.parse_args(argv)
+    messages, size = measure(args.page, args.edits)
+    print(f"{args.page}: {messages:.0f} messages, {size / 1024:.1f} KiB per rerun")
+
+
+if __name__ == "__main__":
+    main()
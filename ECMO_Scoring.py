@@ -0,0 +1,424 @@
+"""Vectorized ECMO scoring engine.
+
+Scores whole cohorts at once with NumPy. Inputs are columns keyed like
+ECMO_Rules.DEFAULT_INPUTS; missing columns take the widget defaults.
+Every output must match ECMO_Rules row for row (see ECMO_Equivalence_Check.py).
+
+An optional "numba" backend (ECMO_Numba) runs the same pipeline as one
+fused parallel kernel. ECMO_SCORING_BACKEND picks the backend that site and
+cohort scoring use; without Numba installed, "numba" runs the NumPy engine.
+"""
+
+import functools
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+import ECMO_Rules as rules
+
+CANNULA_SIZES = list(rules.CANNULA_DATABASE) + ["29+ Fr"]
+
+
+def band(values, table):
+    """Look up band points for an array of values from an (edges, points) table"""
+    edges, points = table
+    return np.asarray(points)[np.searchsorted(edges, values, side="right")]
+
+
+def lookup(table, values):
+    """Map an array of category labels to points through a dict"""
+    values = np.asarray(values)
+    points = np.zeros(values.shape, dtype=int)
+    matched = np.zeros(values.shape, dtype=bool)
+    for label, label_points in table.items():
+        hit = values == label
+        points[hit] = label_points
+        matched |= hit
+    if not matched.all():
+        raise KeyError(values[~matched][0].item())
+    return points
+
+
+def as_columns(columns, n=None):
+    """Broadcast input columns to arrays of length n, filling widget defaults"""
+    if n is None:
+        n = max((np.size(v) for v in columns.values()), default=1)
+    cols = {}
+    for key, default in rules.DEFAULT_INPUTS.items():
+        value = columns.get(key, default)
+        cols[key] = np.broadcast_to(np.asarray(value), (n,))
+    return cols, n
+
+
+# --------------------- Validation ---------------------
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_columns(columns):
+    """Invalid-row masks per field, and the mask of fully valid rows.
+
+    Applies ECMO_Rules.normalize_inputs' checks (types, INPUT_RANGES,
+    CHOICES) to whole columns at once; only fields with a bad row appear in
+    the returned dict. Raises ValueError only for unknown columns.
+    """
+    unknown = set(columns) - set(rules.DEFAULT_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    cols, n = as_columns(columns)
+    invalid = {}
+    for key in columns:
+        default, values = rules.DEFAULT_INPUTS[key], cols[key]
+        if isinstance(default, bool):
+            if values.dtype.kind == "O":
+                bad = np.array([not (is_number(v) or isinstance(v, bool)) or v not in (0, 1) for v in values.tolist()])
+            else:
+                bad = ~np.isin(values, [0, 1]) if values.dtype.kind in "biuf" else np.ones(n, dtype=bool)
+        elif isinstance(default, (int, float)):
+            if values.dtype.kind in "iuf":
+                x = values.astype(float)
+            else:  # object or text column: anything but a number is invalid
+                x = np.array([v if is_number(v) else np.nan for v in values.tolist()], dtype=float)
+            low, high = rules.INPUT_RANGES[key]
+            with np.errstate(invalid="ignore"):
+                bad = ~np.isfinite(x) | (x < low)
+                if high is not None:
+                    bad |= x > high
+        elif key in rules.CHOICES:
+            bad = ~np.isin(values, rules.CHOICES[key])
+        else:
+            continue
+        if bad.any():
+            invalid[key] = bad
+    valid = np.ones(n, dtype=bool)
+    for bad in invalid.values():
+        valid &= ~bad
+    return invalid, valid
+
+
+def describe_invalid(columns, invalid, limit=20):
+    """(row, field, value, message) for the first `limit` bad cells, in row order"""
+    cells = sorted((row, key) for key, bad in invalid.items() for row in np.flatnonzero(bad)[:limit])[:limit]
+    cols, _ = as_columns(columns)
+    messages = []
+    for row, key in cells:
+        if key in rules.INPUT_RANGES:
+            message = rules.range_message(key)
+        elif key in rules.CHOICES:
+            message = f"{key} must be one of: {', '.join(rules.CHOICES[key])}"
+        else:
+            message = f"{key} must be true or false"
+        value = cols[key][row]
+        messages.append((int(row), key, value.item() if isinstance(value, np.generic) else value, message))
+    return messages
+
+
+def report_dropped(n, dropped, messages, file=None):
+    """Print how many of n rows a loader dropped and the first bad cells (to stderr)"""
+    file = file or sys.stderr
+    print(f"Dropped {dropped:,} of {n:,} rows with invalid inputs:", file=file)
+    for row, key, value, message in messages:
+        print(f"  row {row}: {key}={value!r} ({message})", file=file)
+
+
+def drop_invalid(columns, limit=5):
+    """Mask of the rows of a loaded cohort that pass validate_columns, reporting the rest"""
+    invalid, valid = validate_columns(columns)
+    if not valid.all():
+        report_dropped(len(valid), int((~valid).sum()), describe_invalid(columns, invalid, limit))
+    return valid
+
+
+def check_choices(cols):
+    """Raise ValueError naming every row whose category fields are not in ECMO_Rules.CHOICES"""
+    invalid = {key: ~np.isin(cols[key], choices) for key, choices in rules.CHOICES.items()}
+    invalid = {key: bad for key, bad in invalid.items() if bad.any()}
+    if invalid:
+        rows = np.flatnonzero(np.logical_or.reduce(list(invalid.values())))
+        cells = "; ".join(f"row {row}: {key}={value!r}" for row, key, value, _ in describe_invalid(cols, invalid, 5))
+        raise ValueError(f"{len(rows):,} row(s) with invalid choices ({cells}); drop them with drop_invalid first")
+
+
+# --------------------- Step 1 ---------------------
+def body_metrics(weight, height, is_male):
+    weight = np.asarray(weight, dtype=float)
+    height = np.asarray(height, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = np.where(height > 0, weight / ((height/100) ** 2), 0.0)
+    ideal_weight = np.where(is_male, 50.0, 45.5) + 2.3 * ((height - 152.4) / 2.54)
+    bsa = 0.007184 * (height ** 0.725) * (weight ** 0.425)
+    return bmi, ideal_weight, bsa
+
+
+# --------------------- Step 2 ---------------------
+def save_points(cols):
+    return {
+        'age_points': band(cols['age'], rules.SAVE_AGE_BANDS),
+        'weight_points': band(cols['weight'], rules.SAVE_WEIGHT_BANDS),
+        'pre_ecmo_cardiac_arrest_points': np.where(cols['pre_ecmo_cardiac_arrest'].astype(bool), 15, 0),
+        'acute_etiology_points': lookup(rules.ACUTE_ETIOLOGY_POINTS, cols['acute_etiology']),
+        'intubation_points': band(cols['intubation_duration'], rules.SAVE_INTUBATION_BANDS),
+        'dbp_points': band(cols['dbp'], rules.SAVE_DBP_BANDS),
+    }
+
+
+def resp_points(cols):
+    return {
+        'age_points': band(cols['age'], rules.RESP_AGE_BANDS),
+        'immuno_points': np.where(cols['immunocompromised'].astype(bool), -2, 0),
+        'vent_points': band(cols['mech_vent_duration'], rules.RESP_VENT_BANDS),
+        'oxy_points': band(cols['resp_pao2_fio2'], rules.RESP_OXY_BANDS),
+        'ph_points': band(cols['ph_value'], rules.RESP_PH_BANDS),
+        'peep_points': band(cols['peep'], rules.RESP_PEEP_BANDS),
+        'plateau_points': band(cols['plateau_pressure'], rules.RESP_PLATEAU_BANDS),
+        'diagnosis_points': lookup(rules.ACUTE_DIAGNOSIS_POINTS, cols['acute_diagnosis']),
+        'cns_points': np.where(cols['cns_dysfunction'].astype(bool), -7, 0),
+    }
+
+
+# --------------------- Step 3 ---------------------
+def sofa_renal_points(creatinine, urine_output):
+    # Same branch order as ECMO_Rules.sofa_renal_points
+    return np.select(
+        [(creatinine < 1.2) & (urine_output >= 500),
+         (creatinine < 2.0) | (urine_output < 500),
+         (creatinine < 3.5) | (urine_output < 200),
+         (creatinine < 5.0) | (urine_output < 200)],
+        [0, 1, 2, 3], default=4)
+
+
+def sofa_points(cols):
+    return {
+        'resp_points': band(cols['pao2_fio2'], rules.SOFA_RESP_BANDS),
+        'coag_points': band(cols['platelets'], rules.SOFA_COAG_BANDS),
+        'liver_points': band(cols['bilirubin'], rules.SOFA_LIVER_BANDS),
+        'cardiovascular_points': lookup(rules.VASOPRESSOR_POINTS, cols['vasopressors']),
+        'cns_points': band(cols['glasgow'], rules.SOFA_CNS_BANDS),
+        'renal_points': sofa_renal_points(cols['creatinine'], cols['urine_output']),
+    }
+
+
+# --------------------- Step 4 ---------------------
+def ecpr_criteria_met(cols):
+    met = (cols['witnessed_arrest'].astype(int) + cols['bystander_cpr'].astype(int) + cols['no_rosc'].astype(int)
+           + (cols['ph_value_ecpr'] >= rules.ECPR_PH_MIN) + (cols['lactate_ecpr'] <= rules.ECPR_LACTATE_MAX))
+    return np.where(cols['ecpr_applicable'].astype(bool), met, 0)
+
+
+def inclusion_score(cols, bmi, criteria=rules.INCLUSION_CRITERIA):
+    age = cols['age']
+    min_age, max_age = criteria['age_range']
+    min_bmi, max_bmi = criteria['bmi_range']
+    return (sum(cols[key].astype(int) for key in criteria['fields'])
+            + ((age >= min_age) & (age <= max_age)) + ((bmi >= min_bmi) & (bmi <= max_bmi)))
+
+
+def exclusion_count(cols, bmi, criteria=rules.EXCLUSION_CRITERIA):
+    min_bmi, max_bmi = criteria['bmi_range']
+    return (sum(cols[key].astype(int) for key in criteria['fields'])
+            + (cols['age'] > criteria['max_age']) + ((bmi < min_bmi) | (bmi > max_bmi)))
+
+
+# --------------------- Step 5 ---------------------
+def candidacy_score(is_va, mode_score, sofa_score, inclusion, exclusion, ecpr_applicable, ecpr_met,
+                    bands=rules.CANDIDACY_BANDS):
+    mode = np.where(is_va, band(mode_score, bands['SAVE']), band(mode_score, bands['RESP']))
+    ecpr = np.where(ecpr_applicable, band(ecpr_met, bands['ECPR']), 0)
+    return (mode + band(sofa_score, bands['SOFA']) + ecpr
+            + band(inclusion, bands['inclusion']) + band(exclusion, bands['exclusion']))
+
+
+# --------------------- Step 7 ---------------------
+def cannula_recommendations(required_flow, bsa, is_va, cannula_database=rules.CANNULA_DATABASE):
+    """Indices into CANNULA_SIZES for drainage/return cannulas, with their max flows"""
+    sizes = list(cannula_database)
+    flows = np.array([cannula_database[size]["max_flow"] for size in sizes])
+    n = len(sizes)
+    safety_flow = required_flow * 1.3
+
+    # Smallest adequate cannula; n means none is adequate ("29+ Fr")
+    first = np.searchsorted(flows, safety_flow, side="left")
+    drainage = first
+    return_cannula = np.where(is_va | (first + 1 >= n), first, first + 1)
+
+    # Patient size adjustments, mirroring the substring checks in ECMO_Rules
+    downsize = np.array(["25" in s or "27" in s or "29" in s for s in sizes] + [False])
+    has_19 = np.array(["19" in s for s in sizes] + [False])
+    has_21 = np.array(["21" in s for s in sizes] + [False])
+    small = bsa < 1.5
+    large = ~small & (bsa > 2.5)
+    drainage = np.where(small & downsize[drainage], sizes.index("23 Fr"), drainage)
+    return_cannula = np.where(small & downsize[return_cannula], sizes.index("21 Fr"), return_cannula)
+    drainage = np.where(large & has_19[drainage], sizes.index("23 Fr"), drainage)
+    return_cannula = np.where(large & has_21[return_cannula], sizes.index("25 Fr"), return_cannula)
+
+    # Report indices into CANNULA_SIZES, whatever subset of it this database holds
+    flows = np.append(flows, np.nan)
+    index = np.array([CANNULA_SIZES.index(size) for size in sizes] + [len(CANNULA_SIZES) - 1])
+    return index[drainage], index[return_cannula], flows[drainage], flows[return_cannula]
+
+
+# --------------------- Full Assessment ---------------------
+def score_batch(columns, site=rules.SITE_DEFAULTS):
+    """Vectorized Steps 1-5 and Step 7 cannula sizing for a cohort, under a site's settings.
+
+    Rows should already be valid (see drop_invalid); unknown category labels
+    raise ValueError naming the bad rows.
+    """
+    cols, n = as_columns(columns)
+    check_choices(cols)
+    is_va = cols['ecmo_mode'] == "VA"
+    is_male = cols['sex'] == "Male"
+    weight = cols['weight'].astype(float)
+    height = cols['height'].astype(float)
+
+    bmi, ideal_weight, bsa = body_metrics(weight, height, is_male)
+    out = {'bmi': bmi, 'ideal_weight': ideal_weight, 'bsa': bsa, 'is_va': is_va}
+
+    save = save_points(cols)
+    resp = resp_points(cols)
+    sofa = sofa_points(cols)
+    out.update({'save_' + k: v for k, v in save.items()})
+    out.update({'resp_' + k: v for k, v in resp.items()})
+    out.update({'sofa_' + k: v for k, v in sofa.items()})
+
+    out['save_score'] = sum(save.values())
+    out['resp_score'] = sum(resp.values())
+    out['mode_score'] = np.where(is_va, out['save_score'], out['resp_score'])
+    out['mode_band'] = np.where(is_va, band(out['save_score'], rules.SAVE_SCORE_BANDS),
+                                band(out['resp_score'], rules.RESP_SCORE_BANDS))
+    out['sofa_score'] = sum(sofa.values())
+    out['sofa_band'] = band(out['sofa_score'], rules.SOFA_SCORE_BANDS)
+
+    ecpr_applicable = cols['ecpr_applicable'].astype(bool)
+    out['ecpr_criteria_met'] = ecpr_criteria_met(cols)
+    out['inclusion_score'] = inclusion_score(cols, bmi, site['inclusion'])
+    out['exclusion_count'] = exclusion_count(cols, bmi, site['exclusion'])
+    out['candidacy_score'] = candidacy_score(is_va, out['mode_score'], out['sofa_score'], out['inclusion_score'],
+                                             out['exclusion_count'], ecpr_applicable, out['ecpr_criteria_met'],
+                                             site['candidacy'])
+    out['tier'] = band(out['candidacy_score'], site['candidacy']['tier'])
+
+    out['required_flow'] = bsa * 2.4
+    (out['drainage'], out['return'], out['max_flow_drainage'],
+     out['max_flow_return']) = cannula_recommendations(out['required_flow'], bsa, is_va, site['cannulas'])
+    return out
+
+
+def score_batch_reference(columns):
+    """Score a cohort row by row through the ECMO_Rules oracle, in score_batch's layout"""
+    cols, n = as_columns(columns)
+    rows = [{key: cols[key][i].item() for key in cols} for i in range(n)]
+    out = {}
+
+    def put(key, i, value):
+        if key not in out:
+            out[key] = [None] * n
+        out[key][i] = value
+
+    for i, inputs in enumerate(rows):
+        result = rules.assess(inputs)
+        for key in ('bmi', 'ideal_weight', 'bsa', 'mode_score', 'sofa_score', 'ecpr_criteria_met',
+                    'inclusion_score', 'exclusion_count', 'candidacy_score', 'tier', 'required_flow'):
+            put(key, i, result[key])
+        put('is_va', i, inputs['ecmo_mode'] == "VA")
+        for key, value in rules.save_points(inputs).items():
+            put('save_' + key, i, value)
+        for key, value in rules.resp_points(inputs).items():
+            put('resp_' + key, i, value)
+        for key, value in result['sofa_points'].items():
+            put('sofa_' + key, i, value)
+        put('save_score', i, sum(rules.save_points(inputs).values()))
+        put('resp_score', i, sum(rules.resp_points(inputs).values()))
+        bands = rules.SAVE_BANDS if result['mode_score_name'] == "SAVE" else rules.RESP_BANDS
+        put('mode_band', i, bands.index((result['mode_risk'], result['mode_survival'])))
+        put('sofa_band', i, rules.SOFA_MORTALITY.index(result['sofa_mortality']))
+        recs = result['cannula_recs']
+        put('drainage', i, CANNULA_SIZES.index(recs['drainage']))
+        put('return', i, CANNULA_SIZES.index(recs['return']))
+        put('max_flow_drainage', i, recs.get('max_flow_drainage', np.nan))
+        put('max_flow_return', i, recs.get('max_flow_return', np.nan))
+
+    return {key: np.array(values) for key, values in out.items()}
+
+
+# --------------------- JIT backend ---------------------
+@functools.lru_cache(maxsize=None)
+def jit_module():
+    """ECMO_Numba, imported on first use (compiling takes a while); None when Numba is missing or fails to import"""
+    try:
+        import ECMO_Numba
+    except ImportError:
+        return None
+    return ECMO_Numba
+
+
+def numeric(values):
+    return values if values.dtype.kind in "iuf" else values.astype(float)
+
+
+def score_batch_jit(columns, site=rules.SITE_DEFAULTS):
+    """score_batch through the fused Numba kernel; the NumPy engine when Numba is not installed"""
+    jit = jit_module()
+    if jit is None:
+        return score_batch(columns, site)
+    cols, n = as_columns(columns)
+    check_choices(cols)
+    flags = tuple(np.asarray(values, dtype=bool) for values in (
+        cols['ecmo_mode'] == "VA", cols['sex'] == "Male", cols['pre_ecmo_cardiac_arrest'],
+        cols['immunocompromised'], cols['cns_dysfunction'], cols['ecpr_applicable'], cols['witnessed_arrest'],
+        cols['bystander_cpr'], cols['no_rosc']))
+    category_points = (lookup(rules.ACUTE_ETIOLOGY_POINTS, cols['acute_etiology']),
+                       lookup(rules.ACUTE_DIAGNOSIS_POINTS, cols['acute_diagnosis']),
+                       lookup(rules.VASOPRESSOR_POINTS, cols['vasopressors']))
+    inclusion, exclusion = site['inclusion'], site['exclusion']
+    included = np.zeros((len(inclusion['fields']), n), dtype=bool)
+    excluded = np.zeros((len(exclusion['fields']), n), dtype=bool)
+    for rows, fields in ((included, inclusion['fields']), (excluded, exclusion['fields'])):
+        for row, key in zip(rows, fields):
+            row[:] = cols[key]
+    criteria = tuple(float(v) for v in (*inclusion['age_range'], *inclusion['bmi_range'], exclusion['max_age'],
+                                        *exclusion['bmi_range']))
+
+    sizes = list(site['cannulas'])
+    cannulas = (np.array([site['cannulas'][size]["max_flow"] for size in sizes], dtype=np.float64),
+                np.array(["25" in s or "27" in s or "29" in s for s in sizes] + [False]),
+                np.array(["19" in s for s in sizes] + [False]),
+                np.array(["21" in s for s in sizes] + [False]),
+                np.array([CANNULA_SIZES.index(size) for size in sizes] + [len(CANNULA_SIZES) - 1], dtype=np.int64),
+                sizes.index("23 Fr"), sizes.index("21 Fr"), sizes.index("25 Fr"))
+
+    numeric_keys = ('age', 'weight', 'height', 'intubation_duration', 'dbp', 'mech_vent_duration', 'resp_pao2_fio2',
+                    'ph_value', 'peep', 'plateau_pressure', 'pao2_fio2', 'platelets', 'bilirubin', 'glasgow',
+                    'creatinine', 'urine_output', 'ph_value_ecpr', 'lactate_ecpr')
+    ints = np.empty((len(jit.INT_OUTPUTS), n), dtype=np.int64)
+    floats = np.empty((len(jit.FLOAT_OUTPUTS), n), dtype=np.float64)
+    jit.score_kernel(tuple(numeric(cols[key]) for key in numeric_keys), flags, category_points, included, excluded,
+                     criteria, *jit.band_tables(site['candidacy']), cannulas, ints, floats)
+    return {**dict(zip(jit.INT_OUTPUTS, ints)), **dict(zip(jit.FLOAT_OUTPUTS, floats)), 'is_va': flags[0]}
+
+
+BACKENDS = {
+    'numpy': score_batch,
+    'numba': score_batch_jit,
+}
+
+
+def batch_scorer(name=None):
+    """The cohort scorer for a backend (default: ECMO_SCORING_BACKEND, else "numpy")"""
+    name = name or os.environ.get('ECMO_SCORING_BACKEND') or 'numpy'
+    if name not in BACKENDS:
+        raise ValueError(f"unknown scoring backend {name!r}; expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+# Engines checked and timed by ECMO_Equivalence_Check.py. The spec check keeps importers from paying for
+# Numba; the check itself skips "numba" when jit_module() cannot load it.
+ENGINES = {
+    'python': score_batch_reference,
+    'numpy': score_batch,
+}
+if importlib.util.find_spec("numba") is not None:
+    ENGINES['numba'] = score_batch_jit
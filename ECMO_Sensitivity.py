@@ -0,0 +1,206 @@
+"""Cohort sensitivity analysis of the Step 5 candidacy cut-offs.
+
+Scores a cohort once with ECMO_Scoring, collapses it to the distinct
+(mode score, SOFA, inclusion, exclusion, ECPR) combinations it contains, and
+evaluates every threshold variant in a grid by broadcasting variants ×
+combinations, reporting NOT RECOMMENDED / CONSIDER / RECOMMENDED counts per
+variant.
+
+Thresholds are named as the workflow states them: save_good=5 means
+"SAVE ≥ 5 scores +2", sofa_good=9 means "SOFA ≤ 9 scores +2",
+exclusion_good=0 means "0 exclusions scores +2".
+
+    python ECMO_Sensitivity.py --cohort registry.csv --vary sofa_good=8:11 recommended=3:6 --out sweep.csv
+    python ECMO_Sensitivity.py --patients 50000   # default ~1,000-variant grid on a generated cohort
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+import ECMO_Rules as rules
+import ECMO_Scoring as scoring
+from ECMO_Sites import DEFAULT_SITE, load_site, score_cohort
+
+# name -> (CANDIDACY_BANDS entry, edge index, offset); "<= n" cut-offs are stored as edge n + 1
+THRESHOLDS = {
+    'save_moderate': ('SAVE', 0, 0),
+    'save_good': ('SAVE', 1, 0),
+    'resp_moderate': ('RESP', 0, 0),
+    'resp_good': ('RESP', 1, 0),
+    'sofa_good': ('SOFA', 0, 1),
+    'sofa_moderate': ('SOFA', 1, 1),
+    'ecpr_criteria': ('ECPR', 0, 0),
+    'inclusion_moderate': ('inclusion', 0, 0),
+    'inclusion_good': ('inclusion', 1, 0),
+    'exclusion_good': ('exclusion', 0, 1),
+    'exclusion_moderate': ('exclusion', 1, 1),
+    'consider': ('tier', 0, 0),
+    'recommended': ('tier', 1, 0),
+}
+
+# Roughly 1,000 variants around the current cut-offs
+DEFAULT_GRID = {
+    'save_good': range(4, 7),
+    'resp_good': range(2, 5),
+    'sofa_good': range(8, 11),
+    'sofa_moderate': range(11, 14),
+    'consider': range(0, 3),
+    'recommended': range(3, 7),
+}
+
+PROFILE_FIELDS = ['is_va', 'mode_score', 'sofa_score', 'inclusion_score', 'exclusion_count',
+                  'ecpr_applicable', 'ecpr_criteria_met']
+
+
+def current_thresholds(bands=rules.CANDIDACY_BANDS):
+    return {name: bands[band][0][i] - offset for name, (band, i, offset) in THRESHOLDS.items()}
+
+
+def threshold_grid(vary, base=None):
+    """Cartesian product of the varied thresholds; columns of length n_variants.
+
+    Variants whose cut-offs are out of order (e.g. sofa_good above
+    sofa_moderate) are dropped.
+    """
+    base = base or current_thresholds()
+    unknown = set(vary) - set(THRESHOLDS)
+    if unknown:
+        raise ValueError(f"unknown thresholds: {', '.join(sorted(unknown))}")
+    names = list(vary)
+    combos = np.array(list(itertools.product(*(vary[name] for name in names))), dtype=np.int32)
+    n = len(combos)
+    grid = {name: np.full(n, value, dtype=np.int32) for name, value in base.items()}
+    for j, name in enumerate(names):
+        grid[name] = combos[:, j]
+
+    edges = variant_edges(grid)
+    ordered = np.all([np.all(np.diff(e, axis=1) >= 0, axis=1) for e in edges.values()], axis=0)
+    return {name: values[ordered] for name, values in grid.items()}
+
+
+def variant_edges(grid):
+    """CANDIDACY_BANDS entry -> (n_variants, n_edges) edge array"""
+    columns = {band: [None] * len(table[0]) for band, table in rules.CANDIDACY_BANDS.items()}
+    for name, (band, i, offset) in THRESHOLDS.items():
+        columns[band][i] = grid[name] + offset
+    return {band: np.stack(cols, axis=1) for band, cols in columns.items()}
+
+
+def band_points(values, edges, points):
+    """Band points of values (n,) or (v, n) under each variant's edges (v, k); returns (v, n)"""
+    out = np.full((edges.shape[0], np.shape(values)[-1]), points[0], dtype=np.int8)
+    for k in range(edges.shape[1]):
+        out += (values >= edges[:, k, None]) * np.int8(points[k + 1] - points[k])
+    return out
+
+
+def cohort_profile(scores):
+    """Distinct candidacy inputs in a scored cohort and how many patients share each"""
+    keys = np.stack([np.asarray(scores[field], dtype=np.int32) for field in PROFILE_FIELDS], axis=1)
+    unique, counts = np.unique(keys, axis=0, return_counts=True)
+    return dict(zip(PROFILE_FIELDS, unique.T)), counts
+
+
+def sweep(profile, counts, grid, chunk=256):
+    """Tier counts (n_variants, 3) for every variant in grid"""
+    edges = variant_edges(grid)
+    points = {band: table[1] for band, table in rules.CANDIDACY_BANDS.items()}
+    is_va = profile['is_va'].astype(bool)
+    ecpr_applicable = profile['ecpr_applicable'].astype(bool)
+    n_variants = len(next(iter(grid.values())))
+    tiers = np.empty((n_variants, len(rules.TIER_NAMES)), dtype=np.int64)
+
+    for start in range(0, n_variants, chunk):
+        e = {band: values[start:start + chunk] for band, values in edges.items()}
+        mode = np.where(is_va, band_points(profile['mode_score'], e['SAVE'], points['SAVE']),
+                        band_points(profile['mode_score'], e['RESP'], points['RESP']))
+        ecpr = np.where(ecpr_applicable, band_points(profile['ecpr_criteria_met'], e['ECPR'], points['ECPR']), 0)
+        score = (mode + ecpr
+                 + band_points(profile['sofa_score'], e['SOFA'], points['SOFA'])
+                 + band_points(profile['inclusion_score'], e['inclusion'], points['inclusion'])
+                 + band_points(profile['exclusion_count'], e['exclusion'], points['exclusion']))
+        tier = band_points(score, e['tier'], points['tier'])
+        for t in range(len(rules.TIER_NAMES)):
+            tiers[start:start + chunk, t] = (tier == t) @ counts
+    return tiers
+
+
+def sensitivity(columns, vary, chunk=256):
+    """Per-variant thresholds and tier counts as a DataFrame, current cut-offs first"""
+    scores = score_cohort(load_site(DEFAULT_SITE), columns)  # the cut-offs varied are ECMO_Rules'
+    scores['ecpr_applicable'] = scoring.as_columns(columns)[0]['ecpr_applicable']
+    profile, counts = cohort_profile(scores)
+
+    current = current_thresholds()
+    grid = threshold_grid({name: [value] for name, value in current.items()})
+    varied = threshold_grid(vary)
+    grid = {name: np.concatenate([grid[name], varied[name]]) for name in THRESHOLDS}
+
+    tiers = sweep(profile, counts, grid, chunk)
+    table = pd.DataFrame(grid)
+    for t, name in enumerate(rules.TIER_NAMES):
+        table[name] = tiers[:, t]
+    table['recommended_rate'] = tiers[:, 2] / counts.sum()
+    return table, len(counts)
+
+
+def parse_vary(specs):
+    """["sofa_good=8:11", "recommended=3,4,5"] -> {name: [values]} (ranges are inclusive)"""
+    vary = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if ":" in values:
+            low, high = values.split(":")
+            vary[name] = list(range(int(low), int(high) + 1))
+        else:
+            vary[name] = [int(v) for v in values.split(",")]
+    return vary
+
+
+def load_cohort(path):
+    """Patient columns from a CSV with ECMO_Rules.DEFAULT_INPUTS column names, without its invalid rows"""
+    frame = pd.read_csv(path)
+    columns = {key: frame[key].to_numpy() for key in rules.SCORING_FIELDS if key in frame}
+    valid = scoring.drop_invalid(columns)
+    return {key: values[valid] for key, values in columns.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sensitivity of candidacy tiers to the Step 5 cut-offs")
+    parser.add_argument("--cohort", help="CSV of patients (columns as in ECMO_Rules.DEFAULT_INPUTS)")
+    parser.add_argument("--patients", type=int, default=50_000, help="generated cohort size without --cohort")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vary", nargs="*", help=f"name=low:high or name=a,b,c; names: {', '.join(THRESHOLDS)}")
+    parser.add_argument("--out", help="write every variant's thresholds and tier counts to this CSV")
+    args = parser.parse_args(argv)
+
+    if args.cohort:
+        columns = load_cohort(args.cohort)
+    else:
+        from ECMO_Equivalence_Check import generate_patients
+        columns = generate_patients(args.patients, args.seed)
+    vary = parse_vary(args.vary) if args.vary else {name: list(values) for name, values in DEFAULT_GRID.items()}
+
+    started = time.perf_counter()
+    table, n_profiles = sensitivity(columns, vary)
+    elapsed = time.perf_counter() - started
+    n_patients = int(table.loc[0, rules.TIER_NAMES].sum())
+
+    print(f"{len(table) - 1:,} variants × {n_patients:,} patients ({n_profiles:,} distinct profiles) in {elapsed:.2f} s")
+    shown = list(vary) + rules.TIER_NAMES + ['recommended_rate']
+    print("Current cut-offs:")
+    print(table.loc[[0], shown].to_string(index=False))
+    ranked = table.iloc[1:].sort_values('recommended_rate')
+    print("Lowest and highest recommendation rates:")
+    print(pd.concat([ranked.head(5), ranked.tail(5)])[shown].to_string(index=False))
+    if args.out:
+        table.iloc[1:].to_csv(args.out, index=False)
+        print(f"Wrote {len(table) - 1:,} variants to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Deterministic ECMO circuit telemetry simulator and session replay.
+
+Generates flow/RPM/ΔP/SvO₂/lactate/ACT streams for VV and VA runs in the
+JSON-line format ECMO_Monitoring.py consumes. Each circuit is seeded from
+the patient's BSA and the Step 7 required_flow (BSA × 2.4 L/min/m²), and the
+same seed always produces the same session.
+
+    python ECMO_Simulator.py generate --circuits 12 --duration 3600 --out session.jsonl
+    python ECMO_Simulator.py replay session.jsonl --speed 100 --socket 127.0.0.1:9700
+    python ECMO_Simulator.py replay session.jsonl --speed 1000 --out telemetry.jsonl
+"""
+
+import argparse
+import socket
+import sys
+import time
+
+import numpy as np
+
+from ECMO_Rules import calc_required_flow
+
+# Pump and circuit characteristics per mode: RPM = rpm_base + rpm_per_flow * flow,
+# ΔP = dp_linear * flow + dp_quadratic * flow². The slopes keep the target flow
+# at the largest simulated BSA (2.3 m², 5.5 L/min) about 200 RPM under max_rpm.
+MODE_PARAMS = {
+    'VV': {'rpm_base': 1000, 'rpm_per_flow': 400, 'dp_linear': 22, 'dp_quadratic': 5.5, 'svo2': 72},
+    'VA': {'rpm_base': 1200, 'rpm_per_flow': 380, 'dp_linear': 26, 'dp_quadratic': 6.5, 'svo2': 68},
+}
+
+
+def simulate_circuit(circuit, bsa, ecmo_mode="VV", duration=600.0, hz=10.0, seed=0,
+                     act_interval=60.0, target_interval=10.0, events=True):
+    """Telemetry arrays for one circuit; deterministic for a given seed"""
+    rng = np.random.default_rng(seed)
+    params = MODE_PARAMS[ecmo_mode]
+    target_flow = calc_required_flow(bsa)
+    n = int(duration * hz)
+    t = np.arange(n) / hz
+
+    # Slow physiological drift plus sensor noise
+    def drift(scale, periods=(300.0, 1100.0)):
+        phases = rng.uniform(0, 2 * np.pi, len(periods))
+        return scale * sum(np.sin(2 * np.pi * t / p + ph) for p, ph in zip(periods, phases)) / len(periods)
+
+    flow = target_flow + drift(0.25) + rng.normal(0, 0.05, n)
+    dp_extra = np.zeros(n)
+
+    if events:
+        # Suction events: brief drops in flow at constant RPM
+        for start in rng.uniform(0, duration, rng.poisson(duration / 900)):
+            hit = (t >= start) & (t < start + rng.uniform(3, 12))
+            flow[hit] -= rng.uniform(0.8, 1.8)
+        # Oxygenator clot: ΔP creeps up over the remainder of the run
+        if rng.random() < 0.25:
+            start = rng.uniform(0.3, 0.8) * duration
+            dp_extra = np.clip(t - start, 0, None) / max(duration - start, 1.0) * rng.uniform(120, 260)
+
+    flow = np.clip(flow, 0, None)
+    rpm = params['rpm_base'] + params['rpm_per_flow'] * (target_flow + drift(0.1)) + rng.normal(0, 15, n)
+    dp = params['dp_linear'] * flow + params['dp_quadratic'] * flow ** 2 + dp_extra + rng.normal(0, 6, n)
+    svo2 = params['svo2'] + 6 * (flow - target_flow) + drift(2.0) + rng.normal(0, 0.5, n)
+    lactate = np.clip(rng.uniform(3, 9) * np.exp(-t / rng.uniform(4000, 12000)) + rng.normal(0, 0.05, n), 0.5, None)
+
+    # ACT is a point-of-care test, so it only arrives every act_interval seconds
+    act = np.full(n, np.nan)
+    act_every = max(int(act_interval * hz), 1)
+    act[::act_every] = 200 + drift(12.0)[::act_every] + rng.normal(0, 5, len(act[::act_every]))
+
+    return {
+        'circuit': circuit, 'ecmo_mode': ecmo_mode, 'bsa': bsa, 'target_flow': target_flow,
+        't': t, 'flow': flow, 'rpm': rpm, 'dp': dp, 'svo2': svo2, 'lactate': lactate, 'act': act,
+        'target_every': max(int(target_interval * hz), 1),
+    }
+
+
+def format_lines(sim):
+    """(t, JSON line) pairs for one simulated circuit"""
+    circuit, target, target_every = sim['circuit'], sim['target_flow'], sim['target_every']
+    lines = []
+    for i, (t, flow, rpm, dp, svo2, lactate, act) in enumerate(zip(
+            sim['t'].tolist(), sim['flow'].tolist(), sim['rpm'].tolist(), sim['dp'].tolist(),
+            sim['svo2'].tolist(), sim['lactate'].tolist(), sim['act'].tolist())):
+        extra = ""
+        if act == act:  # not NaN
+            extra += f', "act": {act:.0f}'
+        if i % target_every == 0:
+            extra += f', "target_flow": {target:.2f}'
+        lines.append((t, f'{{"circuit": "{circuit}", "t": {t:.2f}, "flow": {flow:.2f}, "rpm": {rpm:.0f}, '
+                         f'"dp": {dp:.0f}, "svo2": {svo2:.1f}, "lactate": {lactate:.2f}{extra}}}\n'))
+    return lines
+
+
+def generate_session(circuits=12, duration=600.0, hz=10.0, seed=0, ecmo_mode=None, bsa=None):
+    """Interleaved, time-ordered telemetry lines for several circuits"""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for c in range(circuits):
+        mode = ecmo_mode or ("VA" if rng.random() < 0.4 else "VV")
+        circuit_bsa = bsa if bsa is not None else round(float(rng.uniform(1.5, 2.3)), 2)
+        sim = simulate_circuit(f"C{c + 1:02d}", circuit_bsa, mode, duration, hz, seed=seed * 1000 + c)
+        lines.extend(format_lines(sim))
+    lines.sort(key=lambda pair: pair[0])
+    return lines
+
+
+# --------------------- Replay ---------------------
+def read_session(path):
+    """(t, line) pairs from a recorded session file"""
+    lines = []
+    with open(path) as f:
+        for line in f:
+            start = line.find('"t": ')
+            if start < 0:
+                continue
+            end = line.find(",", start)
+            lines.append((float(line[start + 5:end]), line if line.endswith("\n") else line + "\n"))
+    return lines
+
+
+def replay(lines, write, speed=1.0, tick=0.005):
+    """Write lines paced at `speed` × real time (speed <= 0 means as fast as possible)"""
+    if not lines:
+        return {'records': 0, 'elapsed': 0.0, 'records_per_sec': 0.0, 'max_lag': 0.0}
+    t0 = lines[0][0]
+    started = time.perf_counter()
+    sent = 0
+    max_lag = 0.0
+    while sent < len(lines):
+        now = time.perf_counter() - started
+        if speed > 0:
+            horizon = t0 + now * speed
+            end = sent
+            while end < len(lines) and lines[end][0] <= horizon:
+                end += 1
+        else:
+            end = min(sent + 5000, len(lines))
+        if end > sent:
+            write("".join(line for _, line in lines[sent:end]))
+            if speed > 0:
+                max_lag = max(max_lag, now - (lines[end - 1][0] - t0) / speed)
+            sent = end
+        elif speed > 0:
+            time.sleep(min(tick, (lines[sent][0] - t0) / speed - now))
+    elapsed = time.perf_counter() - started
+    return {
+        'records': sent,
+        'elapsed': elapsed,
+        'records_per_sec': sent / elapsed if elapsed else float("inf"),
+        'session_seconds': lines[-1][0] - t0,
+        'max_lag': max_lag,
+    }
+
+
+def open_sink(args):
+    """A write(str) callable for --socket host:port or --out path (stdout otherwise)"""
+    if args.socket:
+        host, port = args.socket.rsplit(":", 1)
+        conn = socket.create_connection((host, int(port)))
+        return lambda text: conn.sendall(text.encode()), conn.close
+    if args.out:
+        f = open(args.out, "a" if getattr(args, 'append', False) else "w")
+        def write(text):
+            f.write(text)
+            f.flush()
+        return write, f.close
+    return sys.stdout.write, sys.stdout.flush
+
+
+def print_report(stats, speed):
+    sys.stderr.write(
+        f"Sent {stats['records']:,} records in {stats['elapsed']:.2f} s "
+        f"({stats['records_per_sec']:,.0f} records/s"
+        + (f", {speed:g}x requested, {stats['session_seconds'] / stats['elapsed']:.0f}x achieved"
+           if speed > 0 and stats['elapsed'] else "")
+        + f", max lag {stats['max_lag'] * 1000:.1f} ms)\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO circuit telemetry simulator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="simulate a session and write it out")
+    gen.add_argument("--circuits", type=int, default=12)
+    gen.add_argument("--duration", type=float, default=600.0, help="simulated seconds")
+    gen.add_argument("--hz", type=float, default=10.0)
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--mode", choices=["VV", "VA"], help="ECMO mode for every circuit (mixed otherwise)")
+    gen.add_argument("--bsa", type=float, help="BSA (m²) for every circuit (random 1.5-2.3 otherwise)")
+    gen.add_argument("--speed", type=float, default=0, help="pace output at this multiple of real time")
+
+    rep = sub.add_parser("replay", help="replay a recorded session")
+    rep.add_argument("session")
+    rep.add_argument("--speed", type=float, default=1.0, help="1-1000x real time, 0 for unthrottled")
+
+    for p in (gen, rep):
+        p.add_argument("--socket", help="host:port to stream to (e.g. ECMO_Monitoring.py --listen)")
+        p.add_argument("--out", help="file to write to")
+        p.add_argument("--append", action="store_true", help="append to --out instead of truncating")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        lines = generate_session(args.circuits, args.duration, args.hz, args.seed, args.mode, args.bsa)
+    else:
+        lines = read_session(args.session)
+
+    write, close = open_sink(args)
+    try:
+        stats = replay(lines, write, args.speed)
+    finally:
+        close()
+    print_report(stats, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Per-site rule configuration for a multi-hospital deployment.
+
+One app process serves every site. A site is a JSON file in sites/ (or the
+directory named by ECMO_SITES_DIR) that overrides some of
+ECMO_Rules.SITE_DEFAULTS:
+
+    {"title": "Northside Hospital",
+     "inclusion": {"age_range": [18, 70]},
+     "exclusion": {"max_age": 70},
+     "candidacy": {"SOFA": [11, 14], "tier": [2, 4]},
+     "cannulas": ["17 Fr", "19 Fr", "21 Fr", "23 Fr", "25 Fr"],
+     "timeout_checklist": "northside_timeout.json"}
+
+Candidacy overrides move band edges only; the points per band stay those of
+ECMO_Rules.CANDIDACY_BANDS. "cannulas" is the site's stocked subset of
+ECMO_Rules.CANNULA_DATABASE. Each site is compiled once per process and
+shared by all of its sessions; the built-in "default" site is the plain
+ECMO_Rules oracle. Cohort scoring for every site runs on one shared process
+pool:
+
+    python ECMO_Sites.py check
+"""
+
+import argparse
+import bisect
+import functools
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import ECMO_Rules as rules
+from ECMO_Scoring import as_columns, batch_scorer
+
+DEFAULT_SITE = "default"
+DEFAULT_SITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sites")
+SITE_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+CONFIG_KEYS = {'title', 'inclusion', 'exclusion', 'candidacy', 'cannulas', 'timeout_checklist'}
+# Sizes ECMO_Rules' patient-size adjustments substitute, so every inventory needs them
+REQUIRED_CANNULAS = ("21 Fr", "23 Fr", "25 Fr")
+
+# Step 5 reasons for each candidacy band, ordered like CANDIDACY_BANDS' points
+CANDIDACY_REASONS = {
+    'SAVE': ("❌ Poor SAVE score (high risk)", "⚠️ Moderate SAVE score", "✅ Good SAVE score (low risk)"),
+    'RESP': ("❌ Poor RESP score (high risk)", "⚠️ Moderate RESP score", "✅ Good RESP score (low risk)"),
+    'SOFA': ("✅ Acceptable SOFA score", "⚠️ Elevated SOFA score", "❌ High SOFA score"),
+    'ECPR': ("❌ ECPR criteria not met", "✅ ECPR criteria met"),
+    'inclusion': ("❌ Few inclusion criteria met", "⚠️ Some inclusion criteria met", "✅ Most inclusion criteria met"),
+    'exclusion': ("✅ No exclusion criteria", "⚠️ Minor exclusion criteria", "❌ Multiple exclusion criteria"),
+}
+BOOL_FIELDS = {key for key, default in rules.DEFAULT_INPUTS.items() if isinstance(default, bool)}
+
+
+# --------------------- Compilation ---------------------
+def compile_criteria(overrides, defaults, label):
+    criteria = dict(defaults)
+    for key, value in overrides.items():
+        if key not in defaults:
+            raise ValueError(f"{label}: unknown setting {key!r}")
+        if key == 'fields':
+            unknown = [field for field in value if field not in BOOL_FIELDS]
+            if unknown:
+                raise ValueError(f"{label}.fields: {', '.join(unknown)} are not checkbox inputs")
+            value = list(value)
+        elif isinstance(defaults[key], tuple):
+            if len(value) != 2 or not value[0] <= value[1]:
+                raise ValueError(f"{label}.{key} must be [low, high]")
+            value = tuple(value)
+        criteria[key] = value
+    return criteria
+
+
+def compile_candidacy(overrides):
+    bands = dict(rules.CANDIDACY_BANDS)
+    for key, edges in overrides.items():
+        if key not in bands:
+            raise ValueError(f"candidacy: unknown band {key!r}")
+        default_edges, points = bands[key]
+        if len(edges) != len(default_edges) or list(edges) != sorted(edges):
+            raise ValueError(f"candidacy.{key} needs {len(default_edges)} ascending edges")
+        bands[key] = (tuple(edges), points)
+    return bands
+
+
+def compile_cannulas(sizes):
+    unknown = [size for size in sizes if size not in rules.CANNULA_DATABASE]
+    if unknown:
+        raise ValueError(f"cannulas: {', '.join(unknown)} not in ECMO_Rules.CANNULA_DATABASE")
+    missing = [size for size in REQUIRED_CANNULAS if size not in sizes]
+    if missing:
+        raise ValueError(f"cannulas: the inventory must include {', '.join(missing)}")
+    # Keep CANNULA_DATABASE's smallest-first order
+    return {size: specs for size, specs in rules.CANNULA_DATABASE.items() if size in sizes}
+
+
+class SiteRules:
+    """One site's compiled settings, in the shape of ECMO_Rules.SITE_DEFAULTS"""
+
+    def __init__(self, name, config=None, base_dir=DEFAULT_SITES_DIR):
+        config = config or {}
+        unknown = set(config) - CONFIG_KEYS
+        if unknown:
+            raise ValueError(f"site {name}: unknown setting(s) {', '.join(sorted(unknown))}")
+        self.name = name
+        self.title = config.get('title', name)
+        if set(config) - {'title', 'timeout_checklist'}:
+            self.settings = {
+                'inclusion': compile_criteria(config.get('inclusion', {}), rules.INCLUSION_CRITERIA, "inclusion"),
+                'exclusion': compile_criteria(config.get('exclusion', {}), rules.EXCLUSION_CRITERIA, "exclusion"),
+                'candidacy': compile_candidacy(config.get('candidacy', {})),
+                'cannulas': compile_cannulas(config.get('cannulas', list(rules.CANNULA_DATABASE))),
+            }
+        else:
+            self.settings = rules.SITE_DEFAULTS
+        checklist = config.get('timeout_checklist')
+        self.checklist_path = os.path.join(base_dir, checklist) if checklist else None
+        # (size, max_flow) pairs, hashable for ECMO_Tables.cannula_reference
+        self.inventory = tuple((size, specs['max_flow']) for size, specs in self.settings['cannulas'].items())
+
+    @property
+    def is_default(self):
+        return self.settings is rules.SITE_DEFAULTS
+
+    def candidacy(self, mode_score_name, mode_score, sofa_score, inclusion_score, exclusion_count,
+                  ecpr_applicable=False, ecpr_criteria_met=0):
+        """ECMO_Rules.candidacy under this site's band edges"""
+        bands = self.settings['candidacy']
+        parts = [(mode_score_name, mode_score), ('SOFA', sofa_score)]
+        if ecpr_applicable:
+            parts.append(('ECPR', ecpr_criteria_met))
+        parts += [('inclusion', inclusion_score), ('exclusion', exclusion_count)]
+
+        candidacy_score = 0
+        candidacy_reasons = []
+        for key, value in parts:
+            edges, points = bands[key]
+            index = bisect.bisect_right(edges, value)
+            candidacy_score += points[index]
+            candidacy_reasons.append(CANDIDACY_REASONS[key][index])
+        edges, tiers = bands['tier']
+        return candidacy_score, candidacy_reasons, tiers[bisect.bisect_right(edges, candidacy_score)]
+
+    def assess(self, inputs):
+        """ECMO_Rules.assess with this site's Step 4, Step 5 and cannula settings"""
+        result = rules.assess(inputs)
+        if self.is_default:
+            return result
+        inputs = {**rules.DEFAULT_INPUTS, **inputs}
+        bmi = result['bmi']
+        inclusion = rules.inclusion_score(inputs, bmi, self.settings['inclusion'])
+        exclusion = rules.exclusion_count(inputs, bmi, self.settings['exclusion'])
+        candidacy_score, candidacy_reasons, tier = self.candidacy(
+            result['mode_score_name'], result['mode_score'], result['sofa_score'], inclusion, exclusion,
+            inputs['ecpr_applicable'], result['ecpr_criteria_met'])
+        recommendation, recommendation_color, is_candidate = rules.TIERS[tier]
+        return {
+            **result,
+            'inclusion_score': inclusion, 'exclusion_count': exclusion,
+            'candidacy_score': candidacy_score, 'candidacy_reasons': candidacy_reasons, 'tier': tier,
+            'recommendation': recommendation, 'recommendation_color': recommendation_color,
+            'is_candidate': is_candidate,
+            'cannula_recs': rules.get_specific_cannula_recommendations(
+                result['required_flow'], result['bsa'], inputs['ecmo_mode'], self.settings['cannulas']),
+        }
+
+    def score_batch(self, columns):
+        return batch_scorer()(columns, self.settings)
+
+
+def sites_dir():
+    return os.environ.get('ECMO_SITES_DIR') or DEFAULT_SITES_DIR
+
+
+@functools.lru_cache(maxsize=None)
+def load_site(name=None, directory=None):
+    """Compiled rules for a site (ECMO_SITE or "default"), built once per process"""
+    name = name or os.environ.get('ECMO_SITE') or DEFAULT_SITE
+    directory = directory or sites_dir()
+    if not SITE_NAME.match(name):
+        raise ValueError(f"invalid site name {name!r}")
+    path = os.path.join(directory, f"{name}.json")
+    if not os.path.exists(path):
+        if name == DEFAULT_SITE:
+            return SiteRules(DEFAULT_SITE, {'title': "Default"})
+        raise KeyError(f"unknown site {name!r}")
+    with open(path) as f:
+        return SiteRules(name, json.load(f), directory)
+
+
+def list_sites(directory=None):
+    directory = directory or sites_dir()
+    names = {DEFAULT_SITE}
+    if os.path.isdir(directory):
+        names.update(entry[:-5] for entry in os.listdir(directory) if entry.endswith(".json"))
+    return sorted(names)
+
+
+# --------------------- Shared process pool ---------------------
+pool_lock = threading.Lock()
+pool = None
+
+
+def shared_pool(workers=None):
+    """The one process pool that cohort scoring for every site runs on"""
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        return pool
+
+
+def score_chunk(name, directory, columns):
+    # Runs in a worker: load_site compiles each site once per worker process
+    return load_site(name, directory).score_batch(columns)
+
+
+def score_cohort(site, columns, chunk_size=50_000, directory=None):
+    """site.score_batch(columns), split across the shared pool for large cohorts"""
+    cols, n = as_columns(columns)
+    if n <= chunk_size:
+        return site.score_batch(cols)
+    directory = directory or sites_dir()
+    futures = [shared_pool().submit(score_chunk, site.name, directory,
+                                    {key: values[start:start + chunk_size] for key, values in cols.items()})
+               for start in range(0, n, chunk_size)]
+    parts = [future.result() for future in futures]
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+# --------------------- Check ---------------------
+def check(directory=None, patients=0):
+    """Compile every site and report how its settings differ from the defaults"""
+    failed = False
+    if patients:
+        from ECMO_Equivalence_Check import generate_patients
+        columns = generate_patients(patients, 0)
+    for name in list_sites(directory):
+        try:
+            site = load_site(name, directory)
+        except (ValueError, KeyError, OSError) as e:
+            print(f"{name}: ERROR {e}")
+            failed = True
+            continue
+        changed = [key for key, value in site.settings.items() if value != rules.SITE_DEFAULTS[key]]
+        print(f"{name} ({site.title}): {'overrides ' + ', '.join(changed) if changed else 'defaults'}"
+              f"{', own timeout checklist' if site.checklist_path else ''}")
+        if patients:
+            tiers = np.bincount(score_cohort(site, columns, directory=directory)['tier'], minlength=len(rules.TIERS))
+            print("  " + ", ".join(f"{tier_name} {count / patients:.1%}"
+                                   for tier_name, count in zip(rules.TIER_NAMES, tiers)))
+    return not failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO per-site rule configuration")
+    sub = parser.add_subparsers(dest="command", required=True)
+    check_cmd = sub.add_parser("check", help="compile every site config and summarize its overrides")
+    check_cmd.add_argument("--dir", help="sites directory (default: ECMO_SITES_DIR or sites/)")
+    check_cmd.add_argument("--patients", type=int, default=0, help="also score this many random patients per site")
+    args = parser.parse_args(argv)
+    raise SystemExit(0 if check(args.dir, args.patients) else 1)
+
+
+if __name__ == "__main__":
+    main()
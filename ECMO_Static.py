@@ -0,0 +1,298 @@
+"""Static, client-side build of the ECMO scoring for low-connectivity sites.
+
+Packages ECMO_Rules (standard library only) with the workflow's input
+labels and limits into a single index.html that runs the rules in the
+browser under Pyodide. Every input change is evaluated locally, with no
+round trip to a server. For fully offline use, copy a Pyodide release next
+to the bundle and point --pyodide-url at it.
+
+    python ECMO_Static.py build --out dist
+    python ECMO_Static.py build --out dist --pyodide-url ./pyodide/
+    python -m http.server -d dist 8000
+    python ECMO_Static.py bench --interactions 50 --rtt-ms 40
+
+The benchmark compares a server-backed interaction (a full Streamlit rerun
+of the workflow script, plus --rtt-ms of network) with one client-side
+evaluation of the rules; the page itself shows the in-browser time of each
+evaluation.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+
+import ECMO_Rules as rules
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKFLOW = os.path.join(HERE, "ECMO_Complete_Workflow.py")
+PYODIDE_URL = "https://cdn.jsdelivr.net/pyodide/v0.27.2/full/"
+
+# First input of each section, in DEFAULT_INPUTS order
+SECTION_STARTS = {
+    'name': ("Step 1: Patient Information", None),
+    'pre_ecmo_cardiac_arrest': ("Step 2: SAVE Score", "VA"),
+    'immunocompromised': ("Step 2: RESP Score", "VV"),
+    'pao2_fio2': ("Step 3: SOFA Score", None),
+    'ecpr_applicable': ("Step 4: ECPR", None),
+    'reversible_condition': ("Step 4: Candidacy Criteria", None),
+}
+
+WIDGET_PATTERN = re.compile(r"""inputs\['(\w+)'\] = st\.(\w+)\("([^"]+)"(.*)""")
+KWARG_PATTERN = re.compile(r"(step)=([-\d.]+)")
+
+EVALUATE_SOURCE = """
+import json
+import ECMO_Rules as rules
+
+def evaluate(payload):
+    try:
+        result = rules.assess(rules.normalize_inputs(json.loads(payload)))
+    except Exception as e:
+        return json.dumps({'error': str(e) or type(e).__name__})
+    return json.dumps(result)
+"""
+
+
+def widget_specs(workflow_path=WORKFLOW):
+    """Label and step of each input widget, read from the workflow source"""
+    specs = {}
+    with open(workflow_path, encoding="utf-8") as f:
+        for line in f:
+            match = WIDGET_PATTERN.search(line)
+            if match:
+                key, _, label, rest = match.groups()
+                specs[key] = {'label': label, **{k: float(v) for k, v in KWARG_PATTERN.findall(rest)}}
+    return specs
+
+
+def field_sections(specs):
+    """[{'title', 'mode', 'fields': [{key, type, label, default, ...}]}] in DEFAULT_INPUTS order"""
+    sections = []
+    for key, default in rules.DEFAULT_INPUTS.items():
+        if key in SECTION_STARTS:
+            title, mode = SECTION_STARTS[key]
+            sections.append({'title': title, 'mode': mode, 'fields': []})
+        spec = specs.get(key, {'label': key.replace("_", " ").capitalize()})
+        field = {'key': key, 'default': default, **spec}
+        if isinstance(default, bool):
+            field['type'] = "checkbox"
+        elif key in rules.CHOICES:
+            field['type'] = "select"
+            field['options'] = rules.CHOICES[key]
+        elif isinstance(default, (int, float)):
+            field['type'] = "int" if isinstance(default, int) else "float"
+            field.update(rules.widget_limits(key))
+            field.setdefault('step', 1 if isinstance(default, int) else 0.1)
+        else:
+            field['type'] = "text"
+        sections[-1]['fields'].append(field)
+    return sections
+
+
+def build(out_dir, pyodide_url=PYODIDE_URL):
+    with open(os.path.join(HERE, "ECMO_Rules.py"), encoding="utf-8") as f:
+        rules_source = f.read()
+    page = PAGE_TEMPLATE
+    for name, value in {
+        '__PYODIDE_URL__': json.dumps(pyodide_url),
+        '__RULES_SOURCE__': json.dumps(rules_source),
+        '__EVALUATE_SOURCE__': json.dumps(EVALUATE_SOURCE),
+        '__SECTIONS__': json.dumps(field_sections(widget_specs()), ensure_ascii=False),
+    }.items():
+        page = page.replace(name, value)
+    page = page.replace('__PYODIDE_SCRIPT__', pyodide_url + "pyodide.js")
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return path
+
+
+# --------------------- Benchmark ---------------------
+def percentiles(samples):
+    samples = sorted(samples)
+    return {'p50': statistics.median(samples), 'p95': samples[min(int(0.95 * len(samples)), len(samples) - 1)]}
+
+
+def bench_server(interactions):
+    """Seconds per Streamlit rerun of the workflow after a single input change"""
+    import logging
+    from streamlit.testing.v1 import AppTest
+
+    logging.disable(logging.WARNING)
+    app = AppTest.from_file(WORKFLOW, default_timeout=60)
+    app.run()
+    age = next(w for w in app.number_input if w.label == "Age")
+    samples = []
+    for i in range(interactions):
+        age.set_value(40 + i % 30)
+        started = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - started)
+        age = next(w for w in app.number_input if w.label == "Age")
+    return samples
+
+
+def bench_client(interactions):
+    """Seconds per evaluation of the bundled rules (CPython; Pyodide is typically 1.5-3x slower)"""
+    from ECMO_Equivalence_Check import generate_patients
+
+    namespace = {}
+    exec(EVALUATE_SOURCE, namespace)
+    columns = generate_patients(interactions, seed=1)
+    payloads = [json.dumps({key: values[i].item() for key, values in columns.items()}) for i in range(interactions)]
+    samples = []
+    for payload in payloads:
+        started = time.perf_counter()
+        namespace['evaluate'](payload)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Static client-side ECMO scoring bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="write index.html for static hosting")
+    build_cmd.add_argument("--out", default="dist")
+    build_cmd.add_argument("--pyodide-url", default=PYODIDE_URL, help="Pyodide release URL or local path ending in /")
+    bench = sub.add_parser("bench", help="server rerun vs client-side evaluation latency")
+    bench.add_argument("--interactions", type=int, default=50)
+    bench.add_argument("--rtt-ms", type=float, default=0.0, help="network round trip added to each server rerun")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        path = build(args.out, args.pyodide_url)
+        print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+        return
+
+    server = percentiles([s * 1000 + args.rtt_ms for s in bench_server(args.interactions)])
+    client = percentiles([s * 1000 for s in bench_client(args.interactions)])
+    print(f"{'interaction':<34}{'p50 ms':>10}{'p95 ms':>10}")
+    print(f"{'server rerun + ' + f'{args.rtt_ms:g} ms RTT':<34}{server['p50']:>10.2f}{server['p95']:>10.2f}")
+    print(f"{'client-side evaluation':<34}{client['p50']:>10.3f}{client['p95']:>10.3f}")
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>ECMO Candidacy (offline)</title>
+<script src="__PYODIDE_SCRIPT__"></script>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 0 auto; max-width: 1100px; padding: 1rem; }
+  .layout { display: grid; grid-template-columns: 1fr 1fr; gap: 2rem; }
+  fieldset { border: 1px solid #ddd; border-radius: 6px; margin-bottom: 1rem; }
+  label { display: block; margin: 0.35rem 0; }
+  input[type=number], select, input[type=text] { width: 12rem; }
+  .result { position: sticky; top: 1rem; }
+  .success { color: #1b7a2f; } .warning { color: #9a6b00; } .error { color: #b3261e; }
+  #status { color: #666; font-size: 0.9rem; }
+  table { border-collapse: collapse; } td { padding: 0.15rem 0.75rem 0.15rem 0; }
+</style>
+</head>
+<body>
+<h1>🫀 ECMO Candidacy Assessment</h1>
+<p id="status">Loading the scoring engine…</p>
+<div class="layout">
+  <form id="inputs"></form>
+  <div class="result" id="result"></div>
+</div>
+<script>
+const PYODIDE_URL = __PYODIDE_URL__;
+const RULES_SOURCE = __RULES_SOURCE__;
+const EVALUATE_SOURCE = __EVALUATE_SOURCE__;
+const SECTIONS = __SECTIONS__;
+
+const form = document.getElementById("inputs");
+for (const section of SECTIONS) {
+  const fieldset = document.createElement("fieldset");
+  if (section.mode) fieldset.dataset.mode = section.mode;
+  fieldset.innerHTML = `<legend>${section.title}</legend>`;
+  for (const field of section.fields) {
+    const label = document.createElement("label");
+    let input;
+    if (field.type === "select") {
+      input = document.createElement("select");
+      for (const option of field.options) input.add(new Option(option, option));
+    } else {
+      input = document.createElement("input");
+      input.type = field.type === "checkbox" ? "checkbox" : field.type === "text" ? "text" : "number";
+      for (const attr of ["min_value", "max_value", "step"]) {
+        if (attr in field) input.setAttribute(attr.replace("_value", ""), field[attr]);
+      }
+    }
+    input.name = field.key;
+    input.dataset.type = field.type;
+    if (field.type === "checkbox") input.checked = field.default; else input.value = field.default;
+    if (field.type === "checkbox") { label.append(input, " " + field.label); }
+    else { label.append(field.label + " ", input); }
+    fieldset.append(label);
+  }
+  form.append(fieldset);
+}
+
+function readInputs() {
+  const values = {};
+  for (const input of form.elements) {
+    if (!input.name) continue;
+    const type = input.dataset.type;
+    values[input.name] = type === "checkbox" ? input.checked
+      : type === "int" ? parseInt(input.value || "0", 10)
+      : type === "float" ? parseFloat(input.value || "0") : input.value;
+  }
+  return values;
+}
+
+function render(result, ms) {
+  const out = document.getElementById("result");
+  if (result.error) { out.innerHTML = `<p class="error">${result.error}</p>`; return; }
+  const recs = result.cannula_recs;
+  const flow = (key) => key in recs ? ` (max ${recs[key]} L/min)` : "";
+  out.innerHTML = `
+    <h2 class="${result.recommendation_color}">${result.recommendation.replaceAll("**", "")}</h2>
+    <p><b>Candidacy Score:</b> ${result.candidacy_score}/8</p>
+    <ul>${result.candidacy_reasons.map((r) => `<li>${r}</li>`).join("")}</ul>
+    <table>
+      <tr><td>${result.mode_score_name} Score</td><td>${result.mode_score} (${result.mode_risk}, survival ${result.mode_survival})</td></tr>
+      <tr><td>SOFA Score</td><td>${result.sofa_score} (${result.sofa_mortality} mortality)</td></tr>
+      <tr><td>BMI / BSA</td><td>${result.bmi.toFixed(1)} kg/m² / ${result.bsa.toFixed(2)} m²</td></tr>
+      <tr><td>Ideal Weight</td><td>${result.ideal_weight.toFixed(1)} kg</td></tr>
+      <tr><td>Target Flow</td><td>${result.required_flow.toFixed(1)} L/min</td></tr>
+      <tr><td>Drainage Cannula</td><td>${recs.drainage}${flow("max_flow_drainage")}</td></tr>
+      <tr><td>Return Cannula</td><td>${recs.return}${flow("max_flow_return")}</td></tr>
+    </table>`;
+  document.getElementById("status").textContent =
+    `Scoring runs offline in this browser; last evaluation took ${ms.toFixed(2)} ms.`;
+}
+
+async function main() {
+  const pyodide = await loadPyodide({ indexURL: PYODIDE_URL });
+  pyodide.FS.writeFile("ECMO_Rules.py", RULES_SOURCE);
+  pyodide.runPython(EVALUATE_SOURCE);
+  const evaluate = pyodide.globals.get("evaluate");
+
+  const update = () => {
+    const values = readInputs();
+    for (const fieldset of form.querySelectorAll("fieldset[data-mode]")) {
+      fieldset.hidden = fieldset.dataset.mode !== values.ecmo_mode;
+    }
+    const started = performance.now();
+    const result = JSON.parse(evaluate(JSON.stringify(values)));
+    render(result, performance.now() - started);
+  };
+  form.addEventListener("input", update);
+  update();
+}
+main();
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Arrow tables behind the workflow's st.dataframe displays and exports.
+
+Each table is built once as a pyarrow Table. st.dataframe renders it
+directly, and the CSV and Parquet downloads serialize the same table, so no
+pandas DataFrame is built in between.
+"""
+
+import csv
+import functools
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import ECMO_Rules as rules
+
+CANNULA_TYPICAL_USE = {
+    "15 Fr": "Pediatric", "17 Fr": "Small Adult", "19 Fr": "Adult Drainage", "21 Fr": "Adult Return",
+    "23 Fr": "Large Adult", "25 Fr": "High Flow", "27 Fr": "Very Large", "29 Fr": "Mega",
+}
+
+
+def text_table(columns):
+    """String table from a dict of equal-length columns (mixed values are formatted with str)"""
+    return pa.table({name: pa.array([str(v) for v in values], type=pa.string())
+                     for name, values in columns.items()})
+
+
+@functools.lru_cache(maxsize=None)
+def cannula_reference(inventory=None):
+    """Step 7 cannula flow reference table for (size, max_flow) pairs, built once per process and inventory"""
+    inventory = inventory or tuple((size, specs["max_flow"]) for size, specs in rules.CANNULA_DATABASE.items())
+    sizes = [size for size, _ in inventory]
+    return pa.table({
+        "Size": pa.array(sizes, type=pa.string()),
+        "Max Flow (L/min)": pa.array([max_flow for _, max_flow in inventory], type=pa.float64()),
+        "Typical Use": pa.array([CANNULA_TYPICAL_USE[s] for s in sizes], type=pa.string()),
+    })
+
+
+# --------------------- Exporters ---------------------
+def to_csv(table):
+    """CSV bytes in the layout pandas' to_csv(index=False) wrote: values quoted only when they need it.
+
+    (pyarrow's CSV writer quotes every string value.)
+    """
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(table.column_names)
+    writer.writerows(zip(*(column.to_pylist() for column in table.columns)))
+    return out.getvalue().encode()
+
+
+def to_parquet(table):
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,215 @@
+"""Simulation-training scenario engine.
+
+Runs a library of scripted cases through the workflow's scoring (Steps 1-5
+under a site's rules) and Step 6 timeout checklist headlessly, in parallel,
+and grades each case against its expected SAVE/RESP, SOFA, candidacy tier
+and timeout outcome. The site and checklist are the ones the app would use
+(--site, else ECMO_SITE; the site's checklist, else ECMO_TIMEOUT_CHECKLIST).
+A case looks like:
+
+    {"id": "va-01", "title": "Post-MI cardiogenic shock",
+     "inputs": {"ecmo_mode": "VA", "age": 58, ...},
+     "timeout": {"team": 5, "patient": 4, "circuit": 3, ...},
+     "expected": {"mode_score": 19, "sofa_score": 6, "tier": "RECOMMENDED", "timeout": "PASSED"}}
+
+Missing inputs take the workflow defaults; timeout counts are per checklist
+group, and missing groups count as the app's starting state (only selectbox
+items checked). A count the app cannot reach, such as 0 for a group with a
+selectbox, is rejected when the library is loaded. "timeout" is PASSED (the
+checklist's pass_fraction reached), FAILED or N/A (not a candidate).
+
+    python ECMO_Training.py grade training_cases.json --site example
+    python ECMO_Training.py generate 5000 --out curriculum.json
+    python ECMO_Training.py snapshot curriculum.json --out curriculum.json
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ECMO_Rules as rules
+from ECMO_Checklist import load_checklist
+from ECMO_Sites import load_site
+
+GRADED_FIELDS = ['mode_score_name', 'mode_score', 'sofa_score', 'candidacy_score', 'tier', 'timeout']
+
+
+def load_cases(path):
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def save_cases(cases, path):
+    with open(path, "w") as f:
+        if path.endswith(".jsonl"):
+            f.writelines(json.dumps(case) + "\n" for case in cases)
+        else:
+            json.dump(cases, f, indent=1, ensure_ascii=False)
+
+
+def checklist_groups(checklist):
+    """Group key -> (fewest, most) items checked, for the timeout counts a case may give"""
+    return {group['key']: (low, high)
+            for group, low, high in zip(checklist.groups, checklist.group_minimums, checklist.group_sizes)}
+
+
+def timeout_counts(case, checklist):
+    """A case's checked count per group, missing groups at their minimum; ValueError for counts the app cannot reach"""
+    groups = checklist_groups(checklist)
+    counts = {group: low for group, (low, _) in groups.items()}
+    for group, checked in case.get('timeout', {}).items():
+        low, high = groups.get(group, (0, '?'))
+        if group not in groups or not low <= checked <= high:
+            raise ValueError(f"timeout.{group} must be {low}-{high} for checklist {checklist.name!r}")
+        counts[group] = checked
+    return counts
+
+
+def check_library(cases, site_name=None):
+    """Reject a library with timeout counts the app cannot produce, before any case is graded"""
+    checklist = load_checklist(load_site(site_name).checklist_path)
+    for case in cases:
+        try:
+            timeout_counts(case, checklist)
+        except ValueError as e:
+            raise ValueError(f"case {case.get('id')}: {e}") from None
+
+
+def run_case(case, site_name=None):
+    """Outcome of one case through the workflow's scoring and timeout checklist"""
+    site = load_site(site_name)
+    result = site.assess(rules.normalize_inputs(case.get('inputs', {})))
+    outcome = {
+        'mode_score_name': result['mode_score_name'],
+        'mode_score': result['mode_score'],
+        'sofa_score': result['sofa_score'],
+        'candidacy_score': result['candidacy_score'],
+        'tier': rules.TIER_NAMES[result['tier']],
+        'timeout': "N/A",
+    }
+    # Step 6 only runs for candidates
+    if result['is_candidate']:
+        checklist = load_checklist(site.checklist_path)
+        checked = sum(timeout_counts(case, checklist).values())
+        outcome['timeout'] = "PASSED" if checked >= checklist.required else "FAILED"
+    return outcome
+
+
+def grade_case(case, site_name=None):
+    """(case id, outcome, [(field, expected, actual), ...]) for one case"""
+    try:
+        outcome = run_case(case, site_name)
+    except (ValueError, KeyError) as e:
+        return case.get('id'), None, [('error', None, str(e))]
+    mismatches = [(field, want, outcome.get(field))
+                  for field, want in case.get('expected', {}).items() if outcome.get(field) != want]
+    return case.get('id'), outcome, mismatches
+
+
+def grade_chunk(cases, site_name=None):
+    return [grade_case(case, site_name) for case in cases]
+
+
+def grade_all(cases, workers=None, site_name=None):
+    """Grade every case, spreading chunks over worker processes"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(cases) < 500:
+        return grade_chunk(cases, site_name)
+    size = -(-len(cases) // (workers * 4))
+    chunks = [cases[i:i + size] for i in range(0, len(cases), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        grade = functools.partial(grade_chunk, site_name=site_name)
+        return [graded for chunk in pool.map(grade, chunks) for graded in chunk]
+
+
+def generate_cases(n, seed=0, site_name=None):
+    """Random valid cases (boundary-heavy inputs, random timeout completeness) without expectations"""
+    import numpy as np
+    from ECMO_Equivalence_Check import generate_patients
+    from ECMO_Scoring import validate_columns
+
+    # Oversample and keep the rows inside INPUT_RANGES
+    size = n
+    while True:
+        columns = generate_patients(size, seed)
+        rows = np.flatnonzero(validate_columns(columns)[1])
+        if len(rows) >= n or size > 100 * max(n, 1):
+            break
+        size *= 2
+    rng = np.random.default_rng(seed + 1)
+    groups = checklist_groups(load_checklist(load_site(site_name).checklist_path))
+    cases = []
+    for i, row in enumerate(rows[:n]):
+        inputs = {key: values[row].item() for key, values in columns.items()}
+        # Mostly-complete timeouts, so both outcomes are common
+        timeout = {group: low + int(rng.binomial(high - low, 0.85)) for group, (low, high) in groups.items()}
+        cases.append({'id': f"gen-{seed}-{i:05d}", 'inputs': inputs, 'timeout': timeout})
+    return cases
+
+
+def snapshot(cases, workers=None, site_name=None):
+    """Fill in each case's expected outcome from the current release"""
+    for case, (_, outcome, mismatches) in zip(cases, grade_all(cases, workers, site_name)):
+        if outcome is None:
+            raise ValueError(f"case {case.get('id')}: {mismatches[0][2]}")
+        case['expected'] = {field: outcome[field] for field in GRADED_FIELDS}
+    return cases
+
+
+def print_report(graded, elapsed, verbose=False):
+    failures = [(case_id, mismatches) for case_id, _, mismatches in graded if mismatches]
+    for case_id, mismatches in failures if verbose else failures[:20]:
+        details = "; ".join(f"{field}: expected {want!r}, got {got!r}" for field, want, got in mismatches)
+        print(f"FAIL {case_id}: {details}")
+    if len(failures) > 20 and not verbose:
+        print(f"... {len(failures) - 20} more failures (--verbose to list all)")
+    passed = len(graded) - len(failures)
+    print(f"{passed}/{len(graded)} cases passed in {elapsed:.2f} s ({len(graded) / max(elapsed, 1e-9):,.0f} cases/s)")
+    return not failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECMO simulation-training case runner")
+    sub = parser.add_subparsers(dest="command", required=True)
+    grade = sub.add_parser("grade", help="grade a case library against the current release")
+    grade.add_argument("library")
+    grade.add_argument("--verbose", action="store_true")
+    gen = sub.add_parser("generate", help="generate a random curriculum with expectations from this release")
+    gen.add_argument("count", type=int)
+    gen.add_argument("--seed", type=int, default=0)
+    snap = sub.add_parser("snapshot", help="record this release's outcomes as a library's expectations")
+    snap.add_argument("library")
+    for p in (gen, snap):
+        p.add_argument("--out", required=True)
+    for p in (grade, gen, snap):
+        p.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+        p.add_argument("--site", help="site whose rules and timeout checklist grade the cases (default: ECMO_SITE)")
+    args = parser.parse_args(argv)
+
+    if args.command != "generate":
+        cases = load_cases(args.library)
+        try:
+            check_library(cases, args.site)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.command == "grade":
+        started = time.perf_counter()
+        graded = grade_all(cases, args.workers, args.site)
+        return 0 if print_report(graded, time.perf_counter() - started, args.verbose) else 1
+
+    if args.command == "generate":
+        cases = generate_cases(args.count, args.seed, args.site)
+    save_cases(snapshot(cases, args.workers, args.site), args.out)
+    print(f"Wrote {len(cases)} cases to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import streamlit as st
+import pandas as pd
+import time
+
+import ECMO_Rules as rules
+from ECMO_Census import Census
+from ECMO_Sites import load_site
+
+st.set_page_config(page_title="ECMO Census", layout="wide")
+
+st.title("🗂️ ECMO Unit Census")
+
+# Same site as the workflow session (?site=<name>, else ECMO_SITE)
+if 'site' not in st.session_state:
+    st.session_state.site = st.query_params.get('site')
+try:
+    site = load_site(st.session_state.site)
+except (KeyError, ValueError) as e:
+    st.error(f"❌ {e.args[0]}")
+    st.stop()
+if not site.is_default:
+    st.caption(f"🏥 {site.title}")
+
+# One columnar census per coordinator session
+if 'census' not in st.session_state or st.session_state.census.site is not site:
+    st.session_state.census = Census(site)
+census = st.session_state.census
+
+# --------------------- Admit / Discharge ---------------------
+admit_col, discharge_col = st.columns(2)
+
+with admit_col:
+    with st.form("admit", clear_on_submit=True):
+        st.markdown("**➕ Admit Patient**")
+        admit_name = st.text_input("Patient Name", "")
+        admit_mode = st.selectbox("ECMO Mode", rules.CHOICES['ecmo_mode'])
+        if st.form_submit_button("Admit"):
+            census.add({'name': admit_name, 'ecmo_mode': admit_mode})
+
+with discharge_col:
+    st.markdown("**➖ Discharge**")
+    labels = {patient_id: f"{patient_id}: {name or 'unnamed'}"
+              for patient_id, name in zip(census.ids, census.column('name'))}
+    discharged = st.multiselect("Patients", list(labels), format_func=labels.get)
+    if st.button("Discharge", disabled=not discharged):
+        census.remove(discharged)
+        st.rerun()
+
+# --------------------- Inputs ---------------------
+st.header("✏️ Patient Inputs")
+st.caption("Edit any cell; only the rows that change are re-scored")
+
+column_config = {key: st.column_config.SelectboxColumn(key, options=options, required=True)
+                 for key, options in rules.CHOICES.items()}
+column_config.update({key: st.column_config.NumberColumn(key, **rules.widget_limits(key))
+                      for key in rules.INPUT_RANGES})
+# The editor key changes when patients are admitted or discharged, so stale edits never land on other rows
+edited = st.data_editor(
+    pd.DataFrame({key: census.column(key) for key in rules.DEFAULT_INPUTS}, index=census.ids),
+    column_config=column_config, width="stretch", key=f"census_editor_{census.next_id}_{len(census)}",
+)
+
+started = time.perf_counter()
+changed, errors = census.apply({key: edited[key].to_numpy() for key in rules.DEFAULT_INPUTS})
+census.rescore()
+elapsed = time.perf_counter() - started
+for row, key, value, message in errors:
+    st.error(f"❌ Patient {census.ids[row]}: {message} (got {value}); the row keeps its previous inputs")
+
+# --------------------- Board ---------------------
+st.header("📋 Census Board")
+board = pd.DataFrame(census.board())
+tiers = board['Tier'].value_counts() if len(board) else {}
+
+metric_cols = st.columns(len(rules.TIER_NAMES) + 2)
+metric_cols[0].metric("Patients", len(census))
+for column, tier_name in zip(metric_cols[1:], reversed(rules.TIER_NAMES)):
+    column.metric(tier_name.title(), int(tiers.get(tier_name, 0)))
+metric_cols[-1].metric("Re-scored", f"{census.rescored} rows", help=f"{elapsed * 1e3:.1f} ms")
+
+tier_order = {tier_name: i for i, tier_name in enumerate(rules.TIER_NAMES)}
+board = board.sort_values("Tier", key=lambda column: column.map(tier_order), ascending=False, kind="stable")
+st.dataframe(board, width="stretch", hide_index=True)
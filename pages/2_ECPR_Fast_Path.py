@@ -0,0 +1,64 @@
+import streamlit as st
+import time
+
+# Kept to stdlib-only modules so the page renders fast during an activation
+import ECMO_ECPR as ecpr
+import ECMO_Rules as rules
+
+st.set_page_config(page_title="ECPR Fast Path", layout="centered")
+
+st.title("🚨 ECPR Fast Path")
+
+# Milestone times (epoch seconds) for this activation
+if 'ecpr' not in st.session_state:
+    st.session_state.ecpr = {}
+milestones = st.session_state.ecpr
+
+# --------------------- Arrest-to-Flow Timer ---------------------
+st.iframe(ecpr.timer_html(milestones), height=110)
+
+if 'arrest' not in milestones:
+    minutes_ago = st.number_input("Arrest time (minutes ago)", min_value=0, max_value=180, value=0)
+    if st.button("⏱️ Start clock", type="primary"):
+        now = time.time()
+        milestones.update(arrest=now - 60 * minutes_ago, activation=now)
+        st.rerun()
+else:
+    steps = [key for key, _ in ecpr.MILESTONES if key not in milestones]
+    if steps:
+        label = dict(ecpr.MILESTONES)[steps[0]]
+        if st.button(f"Mark: {label}", type="primary"):
+            milestones[steps[0]] = time.time()
+            st.rerun()
+    st.caption(" · ".join(f"{label} {time.strftime('%H:%M', time.localtime(milestones[key]))}"
+                          for key, label in ecpr.MILESTONES if key in milestones))
+
+# --------------------- ECPR Criteria ---------------------
+st.header("✅ ECPR Criteria")
+st.caption("Evaluated as values arrive; anything not yet known is pending")
+
+values = {}
+for key, label in ecpr.CRITERIA[:3]:
+    answer = st.segmented_control(label, ["Yes", "No"])
+    values[key] = None if answer is None else answer == "Yes"
+ph_col, lactate_col = st.columns(2)
+values['ph_value_ecpr'] = ph_col.number_input("pH", **rules.widget_limits('ph_value_ecpr'), value=None, step=0.01)
+values['lactate_ecpr'] = lactate_col.number_input("Lactate (mmol/L)", **rules.widget_limits('lactate_ecpr'),
+                                                value=None)
+
+status, met, pending, verdict = ecpr.evaluate(values)
+st.markdown("\n".join(f"- {'⏳' if status[key] is None else '✅' if status[key] else '❌'} {label}"
+                      for key, label in ecpr.CRITERIA))
+summary = f"{met}/{len(ecpr.CRITERIA)} criteria met, {pending} pending (need {ecpr.THRESHOLD})"
+if verdict == "met":
+    st.success(f"**ECPR criteria met**: {summary}")
+elif verdict == "not met":
+    st.error(f"**ECPR criteria cannot be met**: {summary}")
+else:
+    st.warning(f"**Open**: {summary}")
+
+# --------------------- Handoff ---------------------
+# The full assessment (scores, cannulas, anticoagulation) waits until flow is established
+if st.button("➡️ Continue to full workflow", disabled='flow' not in milestones):
+    st.session_state.ecpr_handoff = ecpr.handoff(values)
+    st.switch_page("ECMO_Complete_Workflow.py")